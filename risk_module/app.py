@@ -3,13 +3,28 @@
 # Flask REST API — exposes zone detection and rule evaluation endpoints.
 # =============================================================================
 
+import gzip
+import json
 import logging
+import math
 import threading
-from flask import Flask, request, jsonify, send_from_directory
+import time
+from datetime import datetime
+from flask import Flask, Response, g, request, send_from_directory
 
-from config import APP_NAME, APP_VERSION, DEBUG, HOST, PORT
-from zone_engine import load_zones, evaluate_driver
-from risk_engine import get_time_risk
+from config import (
+    APP_NAME, APP_VERSION, DEBUG, HOST, PORT, BATCH_MAX_POINTS, FLEET_INGEST_CHUNK,
+    ZONE_BUDGET_MS, ZONE_BUDGET_MAX_MS, ZONE_MAX_IN_FLIGHT,
+)
+from zone_engine import load_zones, evaluate_driver, evaluate_batch
+from session_store import SessionStore, evaluate_fix
+from fleet_tracker import FleetTracker
+from prefetch import PREFETCHER
+from zone_stats import ZONE_STATS, SORT_KEYS
+import risk_engine
+from risk_engine import get_time_risk, OSM_CACHE, OSM_BREAKER, OSM_SINGLE_FLIGHT
+from metrics import REGISTRY, Gauge, HTTP_LATENCY, HTTP_REQUESTS, FLEET_UPDATES
+from json_codec import JSON_BACKEND, dumps, loads, parse_fields, project
 
 # ---------------------------------------------------------------------------
 # Logging Configuration
@@ -39,25 +54,163 @@ except Exception as e:
     ZONES_CACHE = []
     logger.critical(f"Failed to load zone database on startup: {e}")
 
+# Shared zone version (multiprocessing.Value) attached by server.py before it
+# forks workers. A reload in any worker bumps it; every other worker sees the
+# newer value on its next request and re-maps the recompiled zones.bin.
+ZONES_VERSION = None
+_zones_version_seen = 0
+
+# Open trip sessions (POST /session)
+SESSIONS = SessionStore()
+
+# Fleet vehicle state (POST /fleet/positions)
+FLEET = FleetTracker()
+
+
+class InFlight:
+    """Requests in progress in this process — the load-shedding signal for /zone."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> int:
+        with self._lock:
+            self.count += 1
+            return self.count
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.count -= 1
+
+
+ZONE_IN_FLIGHT = InFlight()
+
+
+def attach_zones_version(counter):
+    """Share `counter` (a multiprocessing.Value) as the cross-worker zone version."""
+    global ZONES_VERSION, _zones_version_seen
+    ZONES_VERSION = counter
+    _zones_version_seen = counter.value
+
+
+def _bump_zones_version():
+    """Record a completed reload so the other workers pick it up."""
+    global _zones_version_seen
+    if ZONES_VERSION is None:
+        return
+    with ZONES_VERSION.get_lock():
+        ZONES_VERSION.value += 1
+        _zones_version_seen = ZONES_VERSION.value
+
+
+@app.before_request
+def _sync_zones():
+    """Reload zones if another worker (or the master) reloaded them."""
+    global ZONES_CACHE, _zones_version_seen
+    if ZONES_VERSION is None or ZONES_VERSION.value == _zones_version_seen:
+        return
+    # One thread reloads; concurrent requests keep serving the current index.
+    if not _zones_lock.acquire(blocking=False):
+        return
+    try:
+        version = ZONES_VERSION.value
+        if version == _zones_version_seen:
+            return
+        try:
+            ZONES_CACHE = load_zones()
+            risk_engine.load_hotspots()
+            logger.info(f"Zone database v{version} picked up — {len(ZONES_CACHE)} zones loaded.")
+        except Exception as e:
+            logger.error(f"Failed to pick up zone database v{version}: {e} — keeping current zones.")
+        _zones_version_seen = version
+    finally:
+        _zones_lock.release()
+
+
+# ---------------------------------------------------------------------------
+# Metrics (GET /metrics)
+# ---------------------------------------------------------------------------
+
+Gauge("zeropenalty_zones_loaded", "Static zones in the zone cache.", lambda: len(ZONES_CACHE))
+Gauge("zeropenalty_trip_sessions_active", "Open trip sessions.", lambda: len(SESSIONS))
+Gauge("zeropenalty_fleet_vehicles_tracked", "Vehicles with state in the fleet tracker.", lambda: len(FLEET))
+Gauge("zeropenalty_zone_in_flight", "GET /zone and session fix requests in progress in this process.", lambda: ZONE_IN_FLIGHT.count)
+Gauge("zeropenalty_osm_cache_entries", "Entries in the in-memory OSM tile cache.",
+      lambda: OSM_CACHE.stats()["entries"] if OSM_CACHE is not None else None)
+Gauge("zeropenalty_osm_circuit_open", "1 while the Overpass circuit breaker is open.",
+      lambda: int(OSM_BREAKER.state == "open"))
+
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        HTTP_LATENCY.observe(time.perf_counter() - started, endpoint, request.method)
+        HTTP_REQUESTS.inc(endpoint, request.method, str(response.status_code))
+    return response
+
 
 # ---------------------------------------------------------------------------
 # Helper: Unified JSON Response Builder
 # ---------------------------------------------------------------------------
 
+def json_response(payload: dict, status: int = 200) -> Response:
+    """Serialize with json_codec (orjson when installed) instead of jsonify."""
+    return Response(dumps(payload), status=status, mimetype="application/json")
+
+
 def success_response(data: dict, status: int = 200):
     """Wrap a successful response in a standard envelope."""
-    return jsonify({
+    return json_response({
         "status": "success",
         "data": data
-    }), status
+    }, status)
 
 
 def error_response(message: str, status: int = 400):
     """Wrap an error response in a standard envelope."""
-    return jsonify({
+    return json_response({
         "status": "error",
         "message": message
-    }), status
+    }, status)
+
+
+def requested_fields() -> tuple:
+    """
+    Response projection from ?fields=speed_limit_kmh,overspeed,... and
+    ?compact=true (speed limit / overspeed / penalty only).
+
+    Returns:
+        (fields_or_None, None) on success, (None, error_message) on failure
+    """
+    compact = request.args.get("compact", "false").lower() in ("true", "1", "yes")
+    return parse_fields(request.args.get("fields"), compact=compact)
+
+
+def request_deadline() -> tuple:
+    """
+    time.monotonic() deadline from ?budget_ms= (default ZONE_BUDGET_MS,
+    none when that is 0), counted from when the request reached Flask.
+
+    Returns:
+        (deadline_or_None, None) on success, (None, error_message) on failure
+    """
+    budget_ms = ZONE_BUDGET_MS or None
+    raw_budget = request.args.get("budget_ms")
+    if raw_budget is not None:
+        budget_ms, err = parse_float_param("budget_ms", raw_budget, min_val=1.0, max_val=ZONE_BUDGET_MAX_MS)
+        if err:
+            return None, err
+    if budget_ms is None:
+        return None, None
+    return time.monotonic() - (time.perf_counter() - g.request_started) + budget_ms / 1000, None
 
 
 # ---------------------------------------------------------------------------
@@ -76,6 +229,8 @@ def parse_float_param(name: str, value: str, min_val: float = None, max_val: flo
         parsed = float(value)
     except (TypeError, ValueError):
         return None, f"Parameter '{name}' must be a valid number. Got: '{value}'"
+    if not math.isfinite(parsed):
+        return None, f"Parameter '{name}' must be a finite number. Got: '{value}'"
 
     if min_val is not None and parsed < min_val:
         return None, f"Parameter '{name}' must be >= {min_val}. Got: {parsed}"
@@ -86,6 +241,167 @@ def parse_float_param(name: str, value: str, min_val: float = None, max_val: flo
     return parsed, None
 
 
+def parse_timestamp(value) -> tuple:
+    """
+    Parse an optional fix timestamp: Unix seconds or an ISO 8601 string.
+
+    Returns:
+        (datetime or None, None) on success
+        (None, error_message) on failure
+    """
+    if value is None:
+        return None, None
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return datetime.fromtimestamp(value), None
+        return datetime.fromisoformat(str(value)), None
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None, f"Parameter 'ts' must be Unix seconds or an ISO 8601 string. Got: '{value}'"
+
+
+def parse_point(item) -> tuple:
+    """
+    Validate one {lat, lng, speed, ts} GPS fix object.
+
+    Returns:
+        ((lat, lng, speed, ts), None) on success
+        (None, error_message) on failure
+    """
+    if not isinstance(item, dict):
+        return None, "each point must be an object with lat, lng, speed."
+    if any(item.get(k) is None for k in ("lat", "lng", "speed")):
+        return None, "missing required fields. Provide: lat, lng, speed."
+
+    lat, err = parse_float_param("lat", item["lat"], min_val=-90.0, max_val=90.0)
+    if not err:
+        lng, err = parse_float_param("lng", item["lng"], min_val=-180.0, max_val=180.0)
+    if not err:
+        speed, err = parse_float_param("speed", item["speed"], min_val=0.0, max_val=500.0)
+    if not err:
+        ts, err = parse_timestamp(item.get("ts"))
+    if err:
+        return None, err
+    return (lat, lng, speed, ts), None
+
+
+def parse_vehicle_id(value) -> tuple:
+    """
+    Validate an optional vehicle_id (string or integer).
+
+    Returns:
+        (vehicle_id as str, or None when absent, None) on success
+        (None, error_message) on failure
+    """
+    if value is None:
+        return None, None
+    if not isinstance(value, (str, int)) or isinstance(value, bool) or value == "":
+        return None, f"Parameter 'vehicle_id' must be a non-empty string or integer. Got: '{value}'"
+    return str(value), None
+
+
+def _parse_ndjson(body: str) -> list:
+    return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+
+def parse_batch_points(raw_body: str, content_type: str) -> tuple:
+    """
+    Parse a POST /zone/batch body — a JSON array (or {"points": [...]})
+    or NDJSON (one point object per line).
+
+    The Content-Type decides: *ndjson / *jsonlines → NDJSON, *json → JSON.
+    Any other (or no) type is parsed as JSON first, then as NDJSON.
+
+    Points may carry an optional "vehicle_id" (unique-vehicle counts in
+    GET /zones/stats).
+
+    Returns:
+        (list of (lat, lng, speed, ts) tuples, vehicle_ids, None) on success —
+            vehicle_ids is a parallel list, or None when no point has one
+        (None, None, error_message) on failure
+    """
+    body = raw_body.strip()
+    mimetype = content_type.split(";")[0].strip().lower()
+    try:
+        if mimetype.endswith(("ndjson", "jsonlines")):
+            items = _parse_ndjson(body)
+        elif mimetype.endswith("json"):
+            items = json.loads(body) if body else []
+            if isinstance(items, dict):
+                items = items.get("points")
+        else:
+            try:
+                items = json.loads(body) if body else []
+            except json.JSONDecodeError:
+                items = _parse_ndjson(body)
+            if isinstance(items, dict):
+                # {"points": [...]}, else a one-line NDJSON body
+                items = items["points"] if "points" in items else [items]
+    except json.JSONDecodeError as e:
+        return None, None, f"Request body is not valid JSON/NDJSON: {e}"
+
+    if not isinstance(items, list) or not items:
+        return None, None, "Request body must be a non-empty array of {lat, lng, speed, ts} points."
+    if len(items) > BATCH_MAX_POINTS:
+        return None, None, f"Too many points in batch: {len(items)} (max {BATCH_MAX_POINTS})."
+
+    points, vehicle_ids = [], []
+    for i, item in enumerate(items):
+        point, err = parse_point(item)
+        if not err:
+            vehicle_id, err = parse_vehicle_id(item.get("vehicle_id"))
+        if err:
+            return None, None, f"points[{i}]: {err}"
+        points.append(point)
+        vehicle_ids.append(vehicle_id)
+
+    return points, (vehicle_ids if any(v is not None for v in vehicle_ids) else None), None
+
+
+# Invalid fleet lines reported back individually; the rest are only counted.
+_MAX_REPORTED_ERRORS = 20
+
+
+def iter_body_lines(stream, block_size: int = 1 << 20):
+    """Yield the non-empty lines of a request body as it streams in."""
+    pending = b""
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        lines = (pending + block).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
+def parse_fleet_position(line: bytes, received_at: float) -> tuple:
+    """
+    Validate one NDJSON {vehicle_id, lat, lng, speed, ts} fleet position.
+
+    Returns:
+        ((vehicle_id, lat, lng, speed, unix_ts), None) on success
+        (None, error_message) on failure
+    """
+    try:
+        item = loads(line)
+    except ValueError as e:
+        return None, f"not valid JSON: {e}"
+    if not isinstance(item, dict):
+        return None, "each line must be an object with vehicle_id, lat, lng, speed."
+    vehicle_id = item.get("vehicle_id")
+    if not isinstance(vehicle_id, (str, int)) or isinstance(vehicle_id, bool) or vehicle_id == "":
+        return None, "missing or invalid 'vehicle_id' (string or integer)."
+
+    point, err = parse_point(item)
+    if err:
+        return None, err
+    lat, lng, speed, ts = point
+    return (str(vehicle_id), lat, lng, speed, ts.timestamp() if ts is not None else received_at), None
+
+
 # ---------------------------------------------------------------------------
 # Routes
 # ---------------------------------------------------------------------------
@@ -103,11 +419,29 @@ def health_check():
         "status": "operational",
         "zones_loaded": len(ZONES_CACHE),
         "database_healthy": len(ZONES_CACHE) > 0,
+        "zone_storage": getattr(ZONES_CACHE, "storage", None),
+        "json_backend": JSON_BACKEND,
+        "osm_cache": OSM_CACHE.stats() if OSM_CACHE is not None else None,
+        "osm_circuit_breaker": OSM_BREAKER.snapshot(),
+        "overpass_mirrors": risk_engine.OVERPASS_CLIENT.snapshot(),
+        "osm_single_flight": OSM_SINGLE_FLIGHT.stats(),
+        "fleet": FLEET.stats(),
+        "prefetch": PREFETCHER.stats(),
+        "risk_tiles": risk_engine.RISK_TILES.info() if risk_engine.RISK_TILES is not None else None,
+        "hotspots": risk_engine.HOTSPOTS.info() if risk_engine.HOTSPOTS is not None else None,
         "endpoints": {
             "health": "GET /",
             "dashboard": "GET /dashboard",
-            "zone_check": "GET /zone?lat=<latitude>&lng=<longitude>&speed=<speed_kmh>",
-            "reload_zones": "POST /reload-zones"
+            "zone_check": "GET /zone?lat=<latitude>&lng=<longitude>&speed=<speed_kmh>[&fields=...|&compact=true][&budget_ms=][&vehicle_id=]",
+            "zone_batch": "POST /zone/batch  (JSON array or NDJSON of {lat, lng, speed, ts})",
+            "session_open": "POST /session",
+            "session_fix": "POST /session/<id>/fix  ({lat, lng, speed, ts})",
+            "fleet_positions": "POST /fleet/positions  (NDJSON of {vehicle_id, lat, lng, speed, ts})",
+            "fleet_vehicle": "GET /fleet/vehicles/<vehicle_id>",
+            "zone_stats": "GET /zones/stats[?sort=overspeed|evaluations|penalty|vehicles|overspeed_rate][&limit=]",
+            "risk_tiles": "GET /tiles/<z>/<x>/<y>",
+            "reload_zones": "POST /reload-zones",
+            "metrics": "GET /metrics"
         }
     })
 
@@ -131,12 +465,22 @@ def get_zone():
     the driver's speed against the zone's rules.
 
     Query Parameters:
-        lat   (required) — Latitude in decimal degrees  [-90, 90]
-        lng   (required) — Longitude in decimal degrees [-180, 180]
-        speed (required) — Current speed in km/h        [0, 500]
+        lat     (required) — Latitude in decimal degrees  [-90, 90]
+        lng     (required) — Longitude in decimal degrees [-180, 180]
+        speed   (required) — Current speed in km/h        [0, 500]
+        fields  (optional) — Comma-separated fields to return, dotted for
+                             nested ones (e.g. speed_limit_kmh,overspeed,time_factors.is_night)
+        compact (optional) — true → only zone_id, risk_level, speed_limit_kmh,
+                             overspeed, overspeed_by_kmh, alert_strength, penalty_inr,
+                             validity, tier
+        budget_ms (optional) — latency budget in ms (default ZONE_BUDGET_MS, max
+                             ZONE_BUDGET_MAX_MS); the answer degrades dynamic →
+                             cached → static → default to meet it
+        vehicle_id (optional) — counted in the zone's unique vehicles (GET /zones/stats)
 
     Returns:
-        JSON object with zone metadata, rule evaluation, and penalty details.
+        JSON object with zone metadata, rule evaluation, and penalty details;
+        "tier" says which tier answered.
 
     Example:
         GET /zone?lat=18.5284&lng=73.8742&speed=35
@@ -192,18 +536,34 @@ def get_zone():
     if err:
         return error_response(err)
 
+    fields, err = requested_fields()
+    if err:
+        return error_response(err)
+
+    vehicle_id, err = parse_vehicle_id(request.args.get("vehicle_id"))
+    if err:
+        return error_response(err)
+
+    deadline, err = request_deadline()
+    if err:
+        return error_response(err)
+
     # --- Run zone evaluation pipeline ---
     # ?dynamic=false → use only static zones.json (faster, offline)
     use_dynamic = request.args.get("dynamic", "true").lower() != "false"
 
     try:
-        result = evaluate_driver(
-            user_lat=lat,
-            user_lng=lng,
-            speed=speed,
-            zones=ZONES_CACHE,
-            use_dynamic=use_dynamic
-        )
+        with ZONE_IN_FLIGHT as in_flight:
+            result = evaluate_driver(
+                user_lat=lat,
+                user_lng=lng,
+                speed=speed,
+                zones=ZONES_CACHE,
+                use_dynamic=use_dynamic,
+                deadline=deadline,
+                overloaded=in_flight > ZONE_MAX_IN_FLIGHT,
+                vehicle_id=vehicle_id,
+            )
     except Exception as e:
         logger.exception(f"Unexpected error during zone evaluation: {e}")
         return error_response(
@@ -211,7 +571,249 @@ def get_zone():
             status=500
         )
 
-    return success_response(result)
+    return success_response(project(result, fields))
+
+
+@app.route("/zone/batch", methods=["POST"])
+def get_zone_batch():
+    """
+    POST /zone/batch[?dynamic=false][&fields=...|&compact=true]
+
+    Evaluates many GPS fixes in one request — buffered fixes from the mobile
+    app or positions forwarded by fleet gateways. Zone lookups and time-risk
+    computation are shared across the batch.
+
+    Body (application/json or application/x-ndjson):
+        [{"lat": 18.5284, "lng": 73.8742, "speed": 35, "ts": 1700000000}, ...]
+
+        ts (optional) — Unix seconds or ISO 8601; defaults to server time.
+        vehicle_id (optional) — counted in the zone's unique vehicles.
+
+    Returns:
+        {"count": N, "results": [...]} — one /zone result per point, in input order,
+        projected like GET /zone when fields / compact are given.
+    """
+    if not ZONES_CACHE:
+        logger.error("Zone database is unavailable. Cannot process request.")
+        return error_response(
+            "Zone database is currently unavailable. Please try again later.",
+            status=503
+        )
+
+    points, vehicle_ids, err = parse_batch_points(request.get_data(as_text=True), request.content_type or "")
+    if err:
+        return error_response(err)
+
+    fields, err = requested_fields()
+    if err:
+        return error_response(err)
+
+    use_dynamic = request.args.get("dynamic", "true").lower() != "false"
+
+    try:
+        results = evaluate_batch(points, zones=ZONES_CACHE, use_dynamic=use_dynamic, vehicle_ids=vehicle_ids)
+    except Exception as e:
+        logger.exception(f"Unexpected error during batch zone evaluation: {e}")
+        return error_response(
+            "An internal error occurred while evaluating the batch.",
+            status=500
+        )
+
+    if fields is not None:
+        results = [project(r, fields) for r in results]
+    return success_response({"count": len(results), "results": results})
+
+
+@app.route("/session", methods=["POST"])
+def open_session():
+    """
+    POST /session
+
+    Opens a trip session. The server remembers the last resolved zone for
+    the session and skips zone detection on fixes that cannot have changed it.
+
+    Body (optional JSON):
+        {"dynamic": false}  — static zones.json only (default: true)
+        {"vehicle_id": "MH12AB1234"}  — counted in the zones' unique vehicles
+
+    Returns:
+        201 with {"session_id": "...", "idle_ttl_seconds": ...}
+    """
+    body = request.get_json(silent=True) or {}
+    use_dynamic = str(body.get("dynamic", "true")).lower() != "false"
+    vehicle_id, err = parse_vehicle_id(body.get("vehicle_id"))
+    if err:
+        return error_response(err)
+    try:
+        session = SESSIONS.create(use_dynamic=use_dynamic, vehicle_id=vehicle_id)
+    except RuntimeError as e:
+        return error_response(str(e), status=503)
+
+    logger.info(f"Trip session opened: {session.id} (dynamic={use_dynamic})")
+    return success_response({**session.summary(), "idle_ttl_seconds": SESSIONS.idle_ttl}, status=201)
+
+
+@app.route("/session/<session_id>/fix", methods=["POST"])
+def session_fix(session_id: str):
+    """
+    POST /session/<id>/fix[?fields=...|?compact=true|?budget_ms=...]
+
+    Evaluates one GPS fix inside a trip session. Returns the same fields as
+    GET /zone plus a "session" object telling whether zone detection re-ran
+    (and why: first_fix / left_zone / entered_zone / distance / time_boundary
+    / degraded). fields / compact project the result like GET /zone
+    ("session" can be listed); budget_ms bounds zone detection as on GET /zone.
+
+    Body (JSON):
+        {"lat": 18.5284, "lng": 73.8742, "speed": 35, "ts": 1700000000}
+    """
+    session = SESSIONS.get(session_id)
+    if session is None:
+        return error_response("Unknown or expired session. Open a new one with POST /session.", status=404)
+
+    point, err = parse_point(request.get_json(silent=True))
+    if err:
+        return error_response(err)
+    lat, lng, speed, ts = point
+
+    fields, err = requested_fields()
+    if err:
+        return error_response(err)
+
+    deadline, err = request_deadline()
+    if err:
+        return error_response(err)
+
+    try:
+        with ZONE_IN_FLIGHT as in_flight:
+            result = evaluate_fix(session, lat, lng, speed, zones=ZONES_CACHE, now=ts, deadline=deadline,
+                                  overloaded=in_flight > ZONE_MAX_IN_FLIGHT)
+    except Exception as e:
+        logger.exception(f"Unexpected error during session fix evaluation: {e}")
+        return error_response(
+            "An internal error occurred while evaluating the zone.",
+            status=500
+        )
+
+    return success_response(project(result, fields))
+
+
+@app.route("/session/<session_id>", methods=["DELETE"])
+def close_session(session_id: str):
+    """DELETE /session/<id> — ends a trip session and returns its counters."""
+    session = SESSIONS.close(session_id)
+    if session is None:
+        return error_response("Unknown or expired session.", status=404)
+    return success_response(session.summary())
+
+
+@app.route("/fleet/positions", methods=["POST"])
+def fleet_positions():
+    """
+    POST /fleet/positions
+
+    Bulk position ingest for fleet gateways. The body is NDJSON, one position
+    per line, and is processed in chunks of FLEET_INGEST_CHUNK lines while it
+    streams in. Only state changes come back — no per-position rule results.
+
+    Body (application/x-ndjson):
+        {"vehicle_id": "MH12AB1234", "lat": 18.5284, "lng": 73.8742, "speed": 35, "ts": 1700000000}
+
+        ts (optional) — Unix seconds or ISO 8601; defaults to arrival time.
+
+    Returns:
+        {"received", "applied", "stale", "dropped", "invalid", "errors", "events"}
+        events — zone_enter / zone_exit / overspeed_start / overspeed_stop, in
+        input order. stale positions are older than the vehicle's last one;
+        dropped ones arrived for new vehicles while the tracker was full.
+        Invalid lines are skipped (the first few are listed in errors).
+    """
+    if not ZONES_CACHE:
+        logger.error("Zone database is unavailable. Cannot process request.")
+        return error_response(
+            "Zone database is currently unavailable. Please try again later.",
+            status=503
+        )
+
+    received_at = time.time()
+    zones = ZONES_CACHE
+    totals = {"received": 0, "applied": 0, "stale": 0, "dropped": 0, "invalid": 0}
+    errors, events = [], []
+    columns = ([], [], [], [], [])
+
+    def flush():
+        outcome = FLEET.ingest(*columns, zones=zones)
+        events.extend(outcome.pop("events"))
+        for name, count in outcome.items():
+            totals[name] += count
+        for column in columns:
+            column.clear()
+
+    try:
+        for line_no, line in enumerate(iter_body_lines(request.stream), start=1):
+            totals["received"] += 1
+            position, err = parse_fleet_position(line, received_at)
+            if err:
+                totals["invalid"] += 1
+                if len(errors) < _MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_no, "error": err})
+                continue
+            for column, value in zip(columns, position):
+                column.append(value)
+            if len(columns[0]) >= FLEET_INGEST_CHUNK:
+                flush()
+        if columns[0]:
+            flush()
+    except Exception as e:
+        logger.exception(f"Unexpected error during fleet ingest: {e}")
+        return error_response(
+            "An internal error occurred while ingesting positions.",
+            status=500
+        )
+
+    if totals["invalid"]:
+        FLEET_UPDATES.inc("invalid", amount=totals["invalid"])
+    if not totals["received"]:
+        return error_response("Request body must be NDJSON with one {vehicle_id, lat, lng, speed, ts} per line.")
+
+    logger.info(f"Fleet ingest: {totals['applied']}/{totals['received']} position(s) applied, "
+                f"{len(events)} event(s)")
+    return success_response({**totals, "errors": errors, "events": events})
+
+
+@app.route("/fleet/vehicles/<vehicle_id>", methods=["GET"])
+def fleet_vehicle(vehicle_id: str):
+    """GET /fleet/vehicles/<id> — last position, zone and overspeed state of a tracked vehicle."""
+    state = FLEET.vehicle(vehicle_id)
+    if state is None:
+        return error_response("Unknown vehicle (never reported, or evicted after going idle).", status=404)
+    return success_response(state)
+
+
+@app.route("/zones/stats", methods=["GET"])
+def zone_stats():
+    """
+    GET /zones/stats[?sort=overspeed][&limit=20]
+
+    Per-zone counters since the server started: evaluations, overspeed
+    events, overspeed rate, penalties (INR) and approximate unique vehicles.
+    Zones are ranked by `sort` (overspeed, evaluations, penalty, vehicles,
+    overspeed_rate), highest first. Under server.py the other workers'
+    counters come from their last snapshot (ZONE_STATS_FLUSH_INTERVAL).
+    """
+    sort = request.args.get("sort", "overspeed")
+    if sort not in SORT_KEYS:
+        return error_response(f"Parameter 'sort' must be one of: {', '.join(SORT_KEYS)}. Got: '{sort}'")
+
+    limit = None
+    raw_limit = request.args.get("limit")
+    if raw_limit is not None:
+        limit, err = parse_float_param("limit", raw_limit, min_val=1.0, max_val=100_000.0)
+        if err:
+            return error_response(err)
+        limit = int(limit)
+
+    return success_response(ZONE_STATS.report(sort=sort, limit=limit))
 
 
 @app.route("/time-risk", methods=["GET"])
@@ -228,6 +830,53 @@ def time_risk():
         return error_response(f"Time risk calculation failed: {e}", status=500)
 
 
+@app.route("/tiles/<int:z>/<int:x>/<int:y>", methods=["GET"])
+def get_tile(z: int, x: int, y: int):
+    """
+    GET /tiles/<z>/<x>/<y>
+
+    One tile of the precomputed dynamic risk pyramid (XYZ scheme, as in
+    OSM / Leaflet URLs): a size×size grid of road type, amenities, hotspot
+    count and base speed limit / risk / multiplier — no time component, so
+    clients combine it with GET /time-risk. Built by `python risk_tiles.py build`.
+
+    The tile JSON is returned as-is (no status envelope), gzip-encoded when
+    the client accepts it, with an ETag for conditional re-downloads.
+    """
+    tiles = risk_engine.RISK_TILES
+    if tiles is None:
+        return error_response("Risk tiles are not available. Build them with risk_tiles.py.", status=503)
+    if not (tiles.min_zoom <= z <= tiles.max_zoom and 0 <= x < (1 << z) and 0 <= y < (1 << z)):
+        return error_response(f"Tile {z}/{x}/{y} is outside the pyramid (zoom {tiles.min_zoom}–{tiles.max_zoom}).",
+                              status=404)
+
+    data = tiles.tile_bytes(z, x, y)
+    if data is None:
+        return error_response(f"Tile {z}/{x}/{y} is outside the built area.", status=404)
+
+    response = Response(mimetype="application/json")
+    if "gzip" in request.accept_encodings:
+        response.set_data(data)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response.set_data(gzip.decompress(data))
+    response.headers["Vary"] = "Accept-Encoding"
+    response.cache_control.public = True
+    response.cache_control.max_age = 86400
+    response.set_etag(f"{tiles.metadata.get('built_at', '0')}-{z}-{x}-{y}")
+    return response.make_conditional(request)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    GET /metrics
+    Prometheus text-format metrics: per-stage latency histograms, data-source
+    and fallback counters, zone/session/cache gauges and Flask request latency.
+    """
+    return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.route("/reload-zones", methods=["POST"])
 def reload_zones():
     """
@@ -235,6 +884,12 @@ def reload_zones():
 
     Hot-reloads zones.json without restarting the server.
     Call this after manually editing zones.json to apply changes immediately.
+    The local accident-hotspot dataset (HOTSPOTS_PATH) is reloaded with it.
+    The spatial index is rebuilt off-lock and swapped in with the zone list,
+    so in-flight requests never see a half-built index. The compiled
+    zones.bin is replaced by rename, so requests still holding the previous
+    mapping keep reading the old file until they finish. Under server.py the
+    other workers follow through the shared zone version.
 
     Returns:
         JSON with updated zone count on success, or error on failure.
@@ -245,12 +900,15 @@ def reload_zones():
     global ZONES_CACHE
     try:
         new_zones = load_zones()
+        hotspots = risk_engine.load_hotspots()
         with _zones_lock:
             ZONES_CACHE = new_zones
+            _bump_zones_version()
         logger.info(f"Zone database hot-reloaded successfully — {len(ZONES_CACHE)} zones loaded.")
         return success_response({
             "message": "Zone database reloaded successfully.",
-            "zones_loaded": len(ZONES_CACHE)
+            "zones_loaded": len(ZONES_CACHE),
+            "hotspots_loaded": len(hotspots) if hotspots is not None else 0,
         })
     except FileNotFoundError:
         logger.error("zones.json not found during hot-reload.")
@@ -288,5 +946,6 @@ def internal_server_error(e):
 # ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
+    # Development server (single process). For production use server.py.
     logger.info(f"Starting {APP_NAME} v{APP_VERSION} on {HOST}:{PORT}")
     app.run(host=HOST, port=PORT, debug=DEBUG)
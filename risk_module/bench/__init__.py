@@ -0,0 +1,4 @@
+# =============================================================================
+# bench — ZeroPenalty Risk Zone Intelligence Module
+# Benchmark / load-test suite (run from risk_module/: python -m bench.run).
+# =============================================================================
@@ -0,0 +1,233 @@
+# =============================================================================
+# bench/fake_overpass.py — ZeroPenalty Risk Zone Intelligence Module
+# Local stand-in for the Overpass API, so benchmarks and load tests run with
+# no network. Answers the queries risk_engine builds with deterministic
+# synthetic elements, with configurable latency, failure injection and an
+# optional per-second quota (HTTP 429 beyond it, like the public servers).
+#
+# Usage:
+#   python -m bench.fake_overpass --port 8765 --latency-ms 80 --failure-rate 0.05
+#   OVERPASS_URL=http://127.0.0.1:8765/api/interpreter python app.py
+# =============================================================================
+
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+ROAD_TYPES = ("primary", "secondary", "tertiary", "residential", "residential",
+              "living_street", "service", "trunk", "unclassified")
+AMENITIES = ("school", "hospital", "marketplace", "bus_station", "place_of_worship", "bank")
+
+_AROUND = re.compile(r"around:\d+,(-?[\d.]+),(-?[\d.]+)")
+
+# Degrees per metre, near enough for placing synthetic geometry
+_DEG_PER_M = 1 / 111_000
+
+
+def _point_elements(lat: float, lng: float, query: str, geometry: bool) -> list:
+    """
+    Elements around one coordinate. With `geometry` (batched `out tags geom`
+    queries) they carry coordinates — a short road through the point,
+    amenities within 60 m, hazard nodes in place of the count — drawn from
+    the same random sequence, so a point gets the same answer either way.
+    """
+    rng = random.Random(zlib.crc32(f"{lat:.4f},{lng:.4f}".encode()))
+
+    elements, amenity_nodes, total = [], [], 0
+    if "[highway];" in query:
+        way = {"type": "way", "id": rng.randrange(1, 10**9), "tags": {"highway": rng.choice(ROAD_TYPES)}}
+        if geometry:
+            way["geometry"] = [{"lat": lat, "lon": lng - 10 * _DEG_PER_M}, {"lat": lat, "lon": lng + 10 * _DEG_PER_M}]
+        elements.append(way)
+    if "[amenity];" in query:
+        for amenity in rng.sample(AMENITIES, rng.choice((0, 0, 1, 2))):
+            amenity_nodes.append({"type": "node", "id": rng.randrange(1, 10**9), "tags": {"amenity": amenity}})
+        elements.extend(amenity_nodes)
+    if "out count" in query or (geometry and "[hazard];" in query):
+        total = rng.choice((0, 0, 0, 1, 2, 4))
+        if not geometry:
+            elements.append({"type": "count", "id": 0,
+                             "tags": {"nodes": str(total), "ways": "0", "relations": "0", "total": str(total)}})
+
+    if geometry:
+        for node in amenity_nodes:
+            node.update(lat=lat + rng.uniform(-40, 40) * _DEG_PER_M, lon=lng + rng.uniform(-40, 40) * _DEG_PER_M)
+        for _ in range(total):
+            elements.append({"type": "node", "id": rng.randrange(1, 10**9), "tags": {"hazard": "yes"},
+                             "lat": lat + rng.uniform(-150, 150) * _DEG_PER_M,
+                             "lon": lng + rng.uniform(-150, 150) * _DEG_PER_M})
+    return elements
+
+
+def synthetic_answer(query: str) -> list:
+    """
+    Overpass `elements` for a query, derived from its first coordinate so
+    the same location always gets the same road type / amenities / count.
+    Batched queries (`out tags geom`) get the elements of every distinct
+    coordinate in their union, with geometry.
+    """
+    if "geom" not in query:
+        match = _AROUND.search(query)
+        lat, lng = (float(match.group(1)), float(match.group(2))) if match else (0.0, 0.0)
+        return _point_elements(lat, lng, query, geometry=False)
+
+    elements = {}
+    for lat, lng in dict.fromkeys(_AROUND.findall(query)):
+        for element in _point_elements(float(lat), float(lng), query, geometry=True):
+            elements[(element["type"], element["id"])] = element
+    # Overpass prints a set nodes first, then ways, each by id.
+    return sorted(elements.values(), key=lambda e: (e["type"] != "node", e["id"]))
+
+
+class FakeOverpass:
+    """
+    Threaded HTTP server answering POST /api/interpreter.
+
+    latency_ms / jitter_ms: added delay per request (uniform jitter).
+    failure_rate: share of requests answered with HTTP 500.
+    timeout_rate: share of requests that stall for hang_s (past the client timeout).
+    quota_per_s: requests accepted per wall-clock second, HTTP 429 beyond (0 = no quota).
+
+    Connections are kept alive (HTTP/1.1); `connections` in stats() counts
+    the TCP connections accepted, so connection reuse can be checked.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, failure_rate: float = 0.0, timeout_rate: float = 0.0,
+                 hang_s: float = 10.0, seed: int = 0, quota_per_s: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.timeout_rate = timeout_rate
+        self.hang_s = hang_s
+        self.quota_per_s = quota_per_s
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._quota_window = (0, 0)     # (second, requests in it)
+        self.requests = 0
+        self.failures = 0
+        self.stalls = 0
+        self.throttled = 0
+        self.connections = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+            def log_message(self, fmt, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+                query = parse_qs(body).get("data", [""])[0]
+                status, payload = server._respond(query)
+                data = json.dumps(payload).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    if status == 429:
+                        self.send_header("Retry-After", "1")
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass    # client gave up (timeout injection)
+
+            def do_GET(self):
+                data = json.dumps(server.stats()).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/interpreter"
+
+    def _respond(self, query: str) -> tuple:
+        with self._lock:
+            self.requests += 1
+            if self.quota_per_s:
+                second = int(time.time())
+                window, used = self._quota_window
+                used = used + 1 if window == second else 1
+                self._quota_window = (second, used)
+                if used > self.quota_per_s:
+                    self.throttled += 1
+                    return 429, {"remark": "rate_limited"}
+            roll = self._rng.random()
+            delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            stall = roll < self.timeout_rate
+            fail = not stall and roll < self.timeout_rate + self.failure_rate
+            self.stalls += stall
+            self.failures += fail
+
+        time.sleep(self.hang_s if stall else max(0.0, delay) / 1000)
+        if fail:
+            return 500, {"remark": "injected failure"}
+        return 200, {"version": 0.6, "generator": "fake_overpass", "elements": synthetic_answer(query)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "failures": self.failures, "stalls": self.stalls,
+                    "throttled": self.throttled, "connections": self.connections}
+
+    def start(self) -> "FakeOverpass":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-overpass", daemon=True)
+        self._thread.start()
+        logger.info(f"Fake Overpass listening on {self.url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local fake Overpass API for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--hang-s", type=float, default=10.0)
+    parser.add_argument("--quota-per-s", type=int, default=0, help="Answer 429 beyond this many requests/s")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s — %(message)s")
+    server = FakeOverpass(args.host, args.port, args.latency_ms, args.jitter_ms,
+                          args.failure_rate, args.timeout_rate, args.hang_s, quota_per_s=args.quota_per_s)
+    print(f"OVERPASS_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+# =============================================================================
+# bench/run.py — ZeroPenalty Risk Zone Intelligence Module
+# Microbenchmarks and load tests for the zone evaluation pipeline. Dynamic
+# lookups hit a local fake Overpass server, so no network is needed.
+# Results (throughput + latency percentiles) are written as JSON so runs can
+# be compared across releases.
+#
+# Usage (from risk_module/):
+#   python -m bench.run
+#   python -m bench.run --zones 10,1000,100000 --points 1,1000000,10000000
+#   python -m bench.run --suites dynamic,http --overpass-latency-ms 120 --overpass-failure-rate 0.05
+# =============================================================================
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from bench.fake_overpass import FakeOverpass
+from bench.synthetic import make_points, make_timestamps, make_zones
+
+logger = logging.getLogger("bench")
+
+SUITES = ("static", "batch", "rules", "time", "fleet", "dynamic", "http")
+
+# detect_zones_batch() input is fed in slices of this many points.
+_BATCH_SLICE = 1_000_000
+
+
+# ---------------------------------------------------------------------------
+# Measurement Helpers
+# ---------------------------------------------------------------------------
+
+def _percentiles(durations_ns) -> dict:
+    """Latency summary in milliseconds."""
+    if len(durations_ns) == 0:
+        return {}
+    ms = np.asarray(durations_ns, dtype=np.float64) / 1e6
+    p50, p90, p99, p999 = np.percentile(ms, [50, 90, 99, 99.9])
+    return {
+        "mean": round(float(ms.mean()), 6), "p50": round(float(p50), 6), "p90": round(float(p90), 6),
+        "p99": round(float(p99), 6), "p999": round(float(p999), 6), "max": round(float(ms.max()), 6),
+    }
+
+
+def _time_calls(fn, arg_tuples) -> tuple:
+    """Call fn(*args) for each tuple; (per-call durations in ns, wall seconds)."""
+    durations = np.empty(len(arg_tuples), dtype=np.int64)
+    clock = time.perf_counter_ns
+    start = clock()
+    for i, args in enumerate(arg_tuples):
+        t0 = clock()
+        fn(*args)
+        durations[i] = clock() - t0
+    return durations, (clock() - start) / 1e9
+
+
+def _time_concurrent(fn, arg_tuples, concurrency: int) -> tuple:
+    """Like _time_calls, spread over `concurrency` threads; also collects fn's return values."""
+    durations = np.empty(len(arg_tuples), dtype=np.int64)
+    outputs = [None] * len(arg_tuples)
+    clock = time.perf_counter_ns
+
+    def worker(offset: int):
+        for i in range(offset, len(arg_tuples), concurrency):
+            t0 = clock()
+            outputs[i] = fn(*arg_tuples[i])
+            durations[i] = clock() - t0
+
+    start = clock()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return durations, (clock() - start) / 1e9, outputs
+
+
+class Report:
+    """Accumulates result rows and prints a one-line summary per row."""
+
+    def __init__(self):
+        self.results = []
+
+    def add(self, suite: str, case: str, n: int, seconds: float, durations_ns=None, **params):
+        row = {
+            "suite": suite,
+            "case": case,
+            **params,
+            "n": int(n),
+            "seconds": round(seconds, 6),
+            "throughput_per_s": round(n / seconds, 2) if seconds > 0 else None,
+        }
+        if durations_ns is not None:
+            row["latency_ms"] = _percentiles(durations_ns)
+        self.results.append(row)
+
+        latency = row.get("latency_ms", {})
+        extra = f" p50={latency['p50']:.4f}ms p99={latency['p99']:.4f}ms" if latency else ""
+        label = " ".join(f"{k}={v}" for k, v in params.items() if not isinstance(v, dict))
+        print(f"[{suite}] {case:<22} {label:<30} n={n:<9} {row['throughput_per_s'] or 0:>14,.1f}/s{extra}",
+              file=sys.stderr)
+
+
+# ---------------------------------------------------------------------------
+# Suites
+# ---------------------------------------------------------------------------
+
+def _zone_index(zone_count: int, shaped_share: float, cache: dict):
+    """Synthetic ZoneIndex per zone count (built once per run)."""
+    from zone_engine import ZoneIndex
+    if zone_count not in cache:
+        cache[zone_count] = ZoneIndex(make_zones(zone_count, shaped_share=shaped_share))
+    return cache[zone_count]
+
+
+def bench_static(report: Report, args, indexes: dict):
+    """detect_zone_static per call, plus index build / compiled-open cost."""
+    from zone_engine import ZoneIndex, detect_zone_static
+    from zone_db import CompiledZoneIndex, write_compiled
+
+    for zone_count in args.zones:
+        zones = make_zones(zone_count, shaped_share=args.shaped_share)
+        t0 = time.perf_counter()
+        index = indexes[zone_count] = ZoneIndex(zones)
+        report.add("static", "index_build", zone_count, time.perf_counter() - t0, zones=zone_count)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "zones.bin")
+            t0 = time.perf_counter()
+            write_compiled(index, path)
+            report.add("static", "compile", zone_count, time.perf_counter() - t0, zones=zone_count)
+            t0 = time.perf_counter()
+            compiled = CompiledZoneIndex(path)
+            report.add("static", "compiled_open", zone_count, time.perf_counter() - t0, zones=zone_count)
+
+            for point_count in args.points:
+                n = min(point_count, args.max_timed_calls)
+                lats, lngs = make_points(n, zone_count)
+                calls = list(zip(lats.tolist(), lngs.tolist(), [index] * n))
+                durations, seconds = _time_calls(detect_zone_static, calls)
+                report.add("static", "detect_zone_static", n, seconds, durations,
+                           zones=zone_count, points=point_count)
+                calls = [(lat, lng, compiled) for lat, lng, _ in calls]
+                durations, seconds = _time_calls(detect_zone_static, calls)
+                report.add("static", "detect_zone_static_mmap", n, seconds, durations,
+                           zones=zone_count, points=point_count)
+            del compiled
+
+
+def bench_batch(report: Report, args, indexes: dict):
+    """detect_zones_batch over the full point sets (up to 10M+)."""
+    from zone_engine import detect_zones_batch
+
+    for zone_count in args.zones:
+        index = _zone_index(zone_count, args.shaped_share, indexes)
+        for point_count in args.points:
+            lats, lngs = make_points(point_count, zone_count)
+            matched = 0
+            t0 = time.perf_counter()
+            for s in range(0, point_count, _BATCH_SLICE):
+                matched += int((detect_zones_batch(lats[s:s + _BATCH_SLICE], lngs[s:s + _BATCH_SLICE], index) >= 0).sum())
+            report.add("batch", "detect_zones_batch", point_count, time.perf_counter() - t0,
+                       zones=zone_count, points=point_count, matched=matched)
+
+
+def bench_rules(report: Report, args, indexes: dict):
+    """apply_rules with and without a precomputed time_info."""
+    from zone_engine import apply_rules
+    from risk_engine import get_time_risk
+
+    index = _zone_index(min(args.zones), args.shaped_share, indexes)
+    n = args.max_timed_calls
+    rng = np.random.default_rng(3)
+    zones = [index[int(i)] for i in rng.integers(0, len(index), n)]
+    speeds = rng.uniform(0, 90, n).tolist()
+    time_info = get_time_risk()
+
+    durations, seconds = _time_calls(apply_rules, list(zip(zones, speeds, [time_info] * n)))
+    report.add("rules", "apply_rules", n, seconds, durations)
+    durations, seconds = _time_calls(apply_rules, list(zip(zones, speeds)))
+    report.add("rules", "apply_rules_now", n, seconds, durations)
+
+
+def bench_time(report: Report, args, indexes: dict):
+    """get_time_risk per call and get_time_risk_batch over the point sets."""
+    from risk_engine import get_time_risk, get_time_risk_batch
+
+    n = args.max_timed_calls
+    stamps = make_timestamps(n)
+    durations, seconds = _time_calls(get_time_risk, [(ts,) for ts in stamps])
+    report.add("time", "get_time_risk", n, seconds, durations)
+
+    base = np.datetime64("2024-01-01T00:00:00")
+    for point_count in args.points:
+        offsets = np.random.default_rng(4).integers(0, 7 * 86400, point_count).astype("timedelta64[s]")
+        t0 = time.perf_counter()
+        get_time_risk_batch(base + offsets)
+        report.add("time", "get_time_risk_batch", point_count, time.perf_counter() - t0, points=point_count)
+
+
+def bench_fleet(report: Report, args, indexes: dict):
+    """FleetTracker.ingest over the point sets, fed in FLEET_INGEST_CHUNK-sized chunks."""
+    from config import FLEET_INGEST_CHUNK
+    from fleet_tracker import FleetTracker
+
+    rng = np.random.default_rng(4)
+    for zone_count in args.zones:
+        index = _zone_index(zone_count, args.shaped_share, indexes)
+        for point_count in args.points:
+            lats, lngs = make_points(point_count, zone_count)
+            speeds = rng.uniform(0, 90, point_count)
+            stamps = 1_700_000_000 + np.arange(point_count, dtype=np.float64)
+            vehicle_ids = [f"veh{i % args.fleet_vehicles}" for i in range(point_count)]
+            tracker = FleetTracker(max_vehicles=args.fleet_vehicles)
+            events = 0
+            t0 = time.perf_counter()
+            for s in range(0, point_count, FLEET_INGEST_CHUNK):
+                e = s + FLEET_INGEST_CHUNK
+                events += len(tracker.ingest(vehicle_ids[s:e], lats[s:e], lngs[s:e], speeds[s:e],
+                                             stamps[s:e], index)["events"])
+            report.add("fleet", "fleet_ingest", point_count, time.perf_counter() - t0,
+                       zones=zone_count, points=point_count, vehicles=min(point_count, args.fleet_vehicles),
+                       events=events)
+
+
+def bench_dynamic(report: Report, args, indexes: dict, overpass: FakeOverpass):
+    """
+    calculate_dynamic_risk against the fake Overpass: cold tiles, then warm;
+    then a recorded trip through evaluate_batch (batched Overpass queries).
+    """
+    import risk_engine
+    from risk_engine import calculate_dynamic_risk
+    from zone_engine import evaluate_batch
+
+    n = args.dynamic_calls
+    lats, lngs = make_points(n, 1000, seed=5)
+    calls = list(zip(lats.tolist(), lngs.tolist()))
+    if risk_engine.OSM_CACHE is not None:
+        risk_engine.OSM_CACHE.clear()
+
+    for case in ("cold", "warm"):
+        before = overpass.stats()
+        durations, seconds, outputs = _time_concurrent(calculate_dynamic_risk, calls, args.concurrency)
+        after = overpass.stats()
+        sources = Counter(zone["data_source"] for zone in outputs)
+        report.add("dynamic", f"calculate_dynamic_risk_{case}", n, seconds, durations,
+                   concurrency=args.concurrency, overpass_requests=after["requests"] - before["requests"],
+                   overpass_connections=after["connections"] - before["connections"],
+                   data_sources=dict(sources))
+
+    # 2,000 fixes ≈10 m apart (a ~20 km trip), cold tiles.
+    lat0, lng0 = float(lats[0]), float(lngs[0])
+    trip = [(lat0 + i * 6e-5, lng0 + i * 6e-5, 40.0, None) for i in range(2000)]
+    if risk_engine.OSM_CACHE is not None:
+        risk_engine.OSM_CACHE.clear()
+    before = overpass.stats()
+    t0 = time.perf_counter()
+    results = evaluate_batch(trip, _zone_index(1000, args.shaped_share, indexes))
+    after = overpass.stats()
+    report.add("dynamic", "evaluate_batch_trip", len(trip), time.perf_counter() - t0,
+               overpass_requests=after["requests"] - before["requests"],
+               data_sources=dict(Counter(zone.get("data_source", "static") for zone in results)))
+
+
+def bench_http(report: Report, args, indexes: dict):
+    """GET /zone over real HTTP (werkzeug threaded server), static and dynamic."""
+    import requests
+    from werkzeug.serving import make_server
+    import app as app_module
+    import risk_engine
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)   # no per-request access log
+    app_module.ZONES_CACHE = _zone_index(args.http_zones, args.shaped_share, indexes)
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}/zone"
+
+    local = threading.local()
+
+    def get(url: str) -> int:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        return session.get(url, timeout=30).status_code
+
+    try:
+        for dynamic in ("false", "true"):
+            if risk_engine.OSM_CACHE is not None:
+                risk_engine.OSM_CACHE.clear()
+            n = args.http_requests
+            lats, lngs = make_points(n, args.http_zones, seed=6)
+            speeds = np.random.default_rng(7).uniform(0, 90, n)
+            urls = [(f"{base}?lat={a:.6f}&lng={b:.6f}&speed={s:.1f}&dynamic={dynamic}",)
+                    for a, b, s in zip(lats, lngs, speeds)]
+            durations, seconds, statuses = _time_concurrent(get, urls, args.concurrency)
+            report.add("http", f"GET /zone dynamic={dynamic}", n, seconds, durations,
+                       zones=args.http_zones, concurrency=args.concurrency,
+                       status_codes={str(k): v for k, v in Counter(statuses).items()})
+    finally:
+        server.shutdown()
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _int_list(value: str) -> list:
+    return [int(v.replace("_", "")) for v in value.split(",") if v]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ZeroPenalty zone evaluation pipeline.")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"Comma list of: {', '.join(SUITES)}")
+    parser.add_argument("--zones", type=_int_list, default=[10, 1000, 100_000], help="Zone counts")
+    parser.add_argument("--points", type=_int_list, default=[1, 10_000, 1_000_000], help="Point counts")
+    parser.add_argument("--shaped-share", type=float, default=0.0,
+                        help="Fraction of synthetic zones that are polygons/corridors")
+    parser.add_argument("--max-timed-calls", type=int, default=20_000,
+                        help="Cap on individually timed calls per case (large point sets use the batch suite)")
+    parser.add_argument("--fleet-vehicles", type=int, default=10_000, help="Distinct vehicles in the fleet suite")
+    parser.add_argument("--dynamic-calls", type=int, default=500)
+    parser.add_argument("--http-requests", type=int, default=2_000)
+    parser.add_argument("--http-zones", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--overpass-latency-ms", type=float, default=50.0)
+    parser.add_argument("--overpass-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--overpass-failure-rate", type=float, default=0.0)
+    parser.add_argument("--overpass-timeout-rate", type=float, default=0.0)
+    parser.add_argument("--osm-timeout", type=float, default=2.0, help="Client timeout used for the run (s)")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+    suites = [s for s in args.suites.split(",") if s]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(name)s — %(message)s")
+
+    overpass = FakeOverpass(
+        latency_ms=args.overpass_latency_ms, jitter_ms=args.overpass_jitter_ms,
+        failure_rate=args.overpass_failure_rate, timeout_rate=args.overpass_timeout_rate,
+        hang_s=args.osm_timeout + 1.0,
+    ).start()
+
+    # Must be set before risk_engine is first imported.
+    os.environ["OVERPASS_URL"] = overpass.url
+    os.environ.pop("OVERPASS_MIRRORS", None)
+    os.environ["OVERPASS_RATE_LIMIT"] = "0"     # measure the pipeline, not the quota
+    os.environ["OSM_TIMEOUT"] = str(args.osm_timeout)
+    os.environ["OSM_LOCAL_INDEX_PATH"] = ""
+    os.environ["RISK_TILES_PATH"] = ""
+    os.environ.pop("OSM_CACHE_DB_PATH", None)
+    os.environ["ZONE_STATS_DIR"] = ""           # apply_rules() must not write zone_stats/ snapshots
+    import risk_engine  # noqa: F401
+
+    report, indexes = Report(), {}
+    started = datetime.now(timezone.utc)
+    try:
+        for suite in suites:
+            if suite == "dynamic":
+                bench_dynamic(report, args, indexes, overpass)
+            else:
+                globals()[f"bench_{suite}"](report, args, indexes)
+    finally:
+        overpass.stop()
+
+    output = {
+        "meta": {
+            "started_at": started.isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+            "fake_overpass": {**overpass.stats(), "latency_ms": args.overpass_latency_ms,
+                              "jitter_ms": args.overpass_jitter_ms,
+                              "failure_rate": args.overpass_failure_rate,
+                              "timeout_rate": args.overpass_timeout_rate},
+        },
+        "results": report.results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"Wrote {len(report.results)} result(s) to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# =============================================================================
+# bench/synthetic.py — ZeroPenalty Risk Zone Intelligence Module
+# Deterministic synthetic zone and GPS point sets for the benchmark suite.
+# =============================================================================
+
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Synthetic data is centred on Pune, like zones.json.
+CENTER_LAT = 18.52
+CENTER_LNG = 73.85
+
+RISK_LEVELS = ("LOW", "MEDIUM", "HIGH")
+ALERTS = {"LOW": "NORMAL", "MEDIUM": "MODERATE", "HIGH": "STRONG"}
+
+
+def area_side_deg(zone_count: int) -> float:
+    """Side of the square the zones are spread over — keeps density roughly constant."""
+    return max(0.05, 0.02 * math.sqrt(zone_count))
+
+
+def make_zones(count: int, seed: int = 0, shaped_share: float = 0.0) -> list:
+    """
+    `count` zones over a square around Pune: circles of 50–1500 m, plus
+    `shaped_share` of polygons (8–64 vertices) and corridors (2–20 points).
+    """
+    rng = np.random.default_rng(seed)
+    side = area_side_deg(count)
+    lats = CENTER_LAT - side / 2 + rng.random(count) * side
+    lngs = CENTER_LNG - side / 2 + rng.random(count) * side
+    radii = rng.uniform(50, 1500, count)
+    kinds = rng.random(count)
+
+    zones = []
+    for i in range(count):
+        risk = RISK_LEVELS[i % 3]
+        zone = {
+            "id": f"bench_{i:06d}",
+            "name": f"Bench Zone {i}",
+            "risk_level": risk,
+            "speed_limit": int(rng.choice((15, 20, 30, 40, 50))),
+            "penalty_multiplier": float(round(rng.uniform(1.0, 3.5), 1)),
+            "alert_strength": ALERTS[risk],
+            "description": "Synthetic benchmark zone",
+        }
+        lat, lng, radius = float(lats[i]), float(lngs[i]), float(radii[i])
+        if kinds[i] < shaped_share / 2:
+            n = int(rng.integers(8, 65))
+            angles = np.sort(rng.random(n)) * 2 * math.pi
+            dist = radius * rng.uniform(0.4, 1.0, n)
+            zone["polygon"] = [
+                [lat + d * math.sin(a) / 111_000, lng + d * math.cos(a) / (111_000 * math.cos(math.radians(lat)))]
+                for a, d in zip(angles.tolist(), dist.tolist())
+            ]
+        elif kinds[i] < shaped_share:
+            steps = rng.normal(0, 0.002, (int(rng.integers(2, 21)), 2))
+            zone["corridor"] = (np.array([lat, lng]) + np.cumsum(steps, axis=0)).tolist()
+            zone["buffer_m"] = float(rng.uniform(15, 60))
+        else:
+            zone.update(latitude=lat, longitude=lng, radius=radius)
+        zones.append(zone)
+    return zones
+
+
+def make_points(count: int, zone_count: int, seed: int = 1) -> tuple:
+    """(lats, lngs) float64 arrays uniformly covering the zones' area."""
+    rng = np.random.default_rng(seed)
+    side = area_side_deg(zone_count)
+    lats = CENTER_LAT - side / 2 + rng.random(count) * side
+    lngs = CENTER_LNG - side / 2 + rng.random(count) * side
+    return lats, lngs
+
+
+def make_timestamps(count: int, seed: int = 2) -> list:
+    """Random datetimes across one week (every time-risk window is hit)."""
+    rng = np.random.default_rng(seed)
+    base = datetime(2024, 1, 1)
+    return [base + timedelta(seconds=float(s)) for s in rng.uniform(0, 7 * 86400, count)]
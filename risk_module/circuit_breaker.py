@@ -0,0 +1,109 @@
+# =============================================================================
+# circuit_breaker.py — ZeroPenalty Risk Zone Intelligence Module
+# Closed / open / half-open circuit breaker for upstream calls (Overpass).
+# =============================================================================
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated upstream failures.
+
+    closed    → calls pass; `failure_threshold` consecutive failures open it.
+    open      → calls are rejected until `reset_timeout` seconds have passed.
+    half_open → up to `half_open_max_calls` trial calls pass; a success
+                closes the breaker, a failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def _maybe_half_open(self, now: float):
+        """Move open → half_open once the reset timeout has elapsed (lock held)."""
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+            logger.info(f"Circuit '{self.name}' half-open — allowing trial request.")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def allow_request(self) -> bool:
+        """True if a call may go upstream now."""
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """Give back a half-open trial slot taken by allow_request() but never used."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"Circuit '{self.name}' closed — upstream recovered.")
+            self._state = CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"Circuit '{self.name}' OPEN after {self._failures} failure(s) — "
+                                   f"failing fast for {self.reset_timeout:.0f}s.")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        """State and counters for the health endpoint."""
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+            retry_in = max(0.0, self.reset_timeout - (now - self._opened_at)) if self._state == OPEN else 0.0
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_seconds": self.reset_timeout,
+                "retry_in_seconds": round(retry_in, 1),
+                "times_opened": self.times_opened,
+                "rejected_calls": self.rejected,
+            }
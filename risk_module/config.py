@@ -15,9 +15,229 @@ DEBUG = os.getenv("FLASK_DEBUG", "false").lower() == "true"
 PORT = int(os.getenv("PORT", 5000))
 HOST = os.getenv("HOST", "0.0.0.0")
 
+# Worker processes forked by server.py (production mode). Defaults to one per core.
+WORKERS = int(os.getenv("WORKERS", os.cpu_count() or 1))
+
 # Path to the zones database (relative to project root)
 ZONES_DB_PATH = os.path.join(os.path.dirname(__file__), "zones.json")
 
+# Compiled, memory-mapped copy of zones.json (see zone_db.py). Rebuilt by
+# load_zones() whenever zones.json changes; set to "" to keep zones in memory.
+ZONES_BIN_PATH = os.getenv("ZONES_BIN_PATH", os.path.join(os.path.dirname(__file__), "zones.bin"))
+
+# ---------------------------------------------------------------------------
+# Spatial Index Settings
+# ---------------------------------------------------------------------------
+
+# Grid cell size (degrees) for the zone bucket map built by load_zones().
+# 0.01° ≈ 1.1 km — a request only runs geodesic() on zones whose bounding
+# circle overlaps its cell.
+ZONE_GRID_CELL_DEG = float(os.getenv("ZONE_GRID_CELL_DEG", 0.01))
+
+# Relative accuracy band for detect_zones_batch(). Haversine differs from the
+# WGS84 geodesic by < 0.6%, so points within this fraction of a zone boundary
+# (or of a competing zone) are re-checked with geodesic(). Lower values trade
+# exactness for speed.
+ZONE_BATCH_TOLERANCE = float(os.getenv("ZONE_BATCH_TOLERANCE", 0.006))
+
+# Upper bound on (points × zones) distance pairs held in memory per chunk.
+ZONE_BATCH_MAX_PAIRS = int(os.getenv("ZONE_BATCH_MAX_PAIRS", 4_000_000))
+
+# Maximum number of GPS fixes accepted by POST /zone/batch in one request.
+BATCH_MAX_POINTS = int(os.getenv("BATCH_MAX_POINTS", 10_000))
+
+# Validity envelope in /zone responses: clients may reuse a result while they
+# stay within "distance_m" of the request point and "ttl_s" seconds of it.
+# Both are capped here (distance also bounds the zone search radius).
+VALIDITY_MAX_DISTANCE_M = float(os.getenv("VALIDITY_MAX_DISTANCE_M", 2000))
+VALIDITY_MAX_TTL = float(os.getenv("VALIDITY_MAX_TTL", 300))
+
+# ---------------------------------------------------------------------------
+# Latency Budget / Load Shedding
+# Each GET /zone has a budget (override per request with ?budget_ms=).
+# evaluate_driver() degrades dynamic → cached → static → default zone when
+# the budget left, or the load, does not allow the better tier.
+# ---------------------------------------------------------------------------
+
+# Default budget (ms) per /zone request; 0 = none (Overpass gets OSM_TIMEOUT).
+ZONE_BUDGET_MS = float(os.getenv("ZONE_BUDGET_MS", 2000))
+
+# Largest ?budget_ms= a client may ask for.
+ZONE_BUDGET_MAX_MS = float(os.getenv("ZONE_BUDGET_MAX_MS", 10_000))
+
+# No Overpass call is started with less budget left than this (ms) — only
+# tiles / offline index / cached lookups. It also keeps tiny client budgets
+# from timing out healthy Overpass calls and tripping the circuit breaker.
+ZONE_DYNAMIC_MIN_MS = float(os.getenv("ZONE_DYNAMIC_MIN_MS", 1000))
+
+# With less than this left (ms), even static detection is skipped.
+ZONE_STATIC_MIN_MS = float(os.getenv("ZONE_STATIC_MIN_MS", 2))
+
+# /zone requests in progress per process beyond which new ones skip Overpass.
+ZONE_MAX_IN_FLIGHT = int(os.getenv("ZONE_MAX_IN_FLIGHT", 32))
+
+# Threads per process running budgeted Overpass lookups, which carry on past
+# their request's deadline. When all are busy, further cache misses are
+# answered from the static tier instead of starting more lookups.
+ZONE_LOOKUP_WORKERS = int(os.getenv("ZONE_LOOKUP_WORKERS", 16))
+
+# ---------------------------------------------------------------------------
+# Overpass API
+# ---------------------------------------------------------------------------
+
+# Point at a private Overpass instance (or bench/fake_overpass.py) to keep
+# dynamic lookups off the public server.
+OVERPASS_URL = os.getenv("OVERPASS_URL", "https://overpass-api.de/api/interpreter")
+
+# Per-request timeout (seconds) for Overpass calls.
+OSM_TIMEOUT = float(os.getenv("OSM_TIMEOUT", 5))
+
+# Several Overpass endpoints, comma-separated "url[|weight[|rate_per_s]]",
+# e.g. "http://localhost:12345/api/interpreter|5|0,https://overpass-api.de/api/interpreter|1".
+# Replaces OVERPASS_URL when set. Higher weight → more traffic; routing also
+# favours mirrors that have recently been fast and error-free.
+OVERPASS_MIRRORS = [m.strip() for m in os.getenv("OVERPASS_MIRRORS", "").split(",") if m.strip()]
+
+# Per-mirror quota (requests/second, bursts of OVERPASS_RATE_BURST) unless a
+# mirror sets its own; 0 = unlimited (private instances). The public servers
+# allow a couple of concurrent slots per client.
+OVERPASS_RATE_LIMIT = float(os.getenv("OVERPASS_RATE_LIMIT", 2))
+OVERPASS_RATE_BURST = float(os.getenv("OVERPASS_RATE_BURST", 4))
+
+# Mirrors tried per lookup (failover on timeout / 429 / 5xx), all within OSM_TIMEOUT.
+OVERPASS_MAX_ATTEMPTS = int(os.getenv("OVERPASS_MAX_ATTEMPTS", 2))
+
+# Keep-alive connections pooled per mirror.
+OVERPASS_POOL_SIZE = int(os.getenv("OVERPASS_POOL_SIZE", 16))
+
+# Batch evaluation (POST /zone/batch): geotiles per union query, and the
+# timeout (seconds) of such a query — it does the work of that many lookups.
+OSM_BATCH_MAX_POINTS = int(os.getenv("OSM_BATCH_MAX_POINTS", 50))
+OSM_BATCH_TIMEOUT = float(os.getenv("OSM_BATCH_TIMEOUT", 25))
+
+# ---------------------------------------------------------------------------
+# OSM Lookup Cache
+# Overpass results (road type, amenities, hotspot counts) are cached per
+# geohash tile so a car driving along a street reuses one lookup.
+# ---------------------------------------------------------------------------
+
+OSM_CACHE_ENABLED = os.getenv("OSM_CACHE_ENABLED", "true").lower() == "true"
+OSM_CACHE_GEOHASH_PRECISION = int(os.getenv("OSM_CACHE_GEOHASH_PRECISION", 7))  # ≈153 m tiles
+OSM_CACHE_TTL = float(os.getenv("OSM_CACHE_TTL", 6 * 3600))                     # seconds
+OSM_CACHE_MAX_ENTRIES = int(os.getenv("OSM_CACHE_MAX_ENTRIES", 50_000))
+
+# Optional SQLite file for a persistent tier shared across worker processes.
+# Unset → memory-only cache.
+OSM_CACHE_DB_PATH = os.getenv("OSM_CACHE_DB_PATH") or None
+
+# Row cap of that file; expired rows are purged too, then the soonest-expiring
+# ones beyond the cap (0 = expiry only).
+OSM_CACHE_DB_MAX_ROWS = int(os.getenv("OSM_CACHE_DB_MAX_ROWS", 500_000))
+
+# Failed lookups (timeout/error) are memoized per tile for this long so
+# repeated requests on the same street fall back immediately.
+OSM_FAILURE_TTL = float(os.getenv("OSM_FAILURE_TTL", 30))
+
+# Offline OSM index built with `python osm_index.py build <extract>`.
+# When the file exists, road type / amenity / hotspot lookups are answered
+# locally and Overpass is not called.
+OSM_LOCAL_INDEX_PATH = os.getenv(
+    "OSM_LOCAL_INDEX_PATH", os.path.join(os.path.dirname(__file__), "osm_index.npz")
+)
+
+# Precomputed dynamic risk tile pyramid built with `python risk_tiles.py build`.
+# When the file exists, fetch_location_risk() answers points inside the built
+# area from it (before the offline index or Overpass), and GET /tiles serves it.
+RISK_TILES_PATH = os.getenv(
+    "RISK_TILES_PATH", os.path.join(os.path.dirname(__file__), "risk_tiles.mbtiles")
+)
+
+# Decoded max-zoom tiles kept in memory per process for point lookups.
+RISK_TILES_CACHE_SIZE = int(os.getenv("RISK_TILES_CACHE_SIZE", 1024))
+
+# Local accident-hotspot dataset: CSV / GeoJSON files, or directories of
+# them (comma-separated). When any exist, hotspot counts are answered from
+# them and Overpass is asked for road type / amenities only. Reloaded with
+# the zones (POST /reload-zones, SIGHUP).
+HOTSPOTS_PATH = os.getenv("HOTSPOTS_PATH", os.path.join(os.path.dirname(__file__), "hotspots"))
+
+# ---------------------------------------------------------------------------
+# Overpass Circuit Breaker
+# After N consecutive failures Overpass is skipped (static/offline path) for
+# RESET_TIMEOUT seconds, then HALF_OPEN_MAX_CALLS trial requests probe it.
+# ---------------------------------------------------------------------------
+
+OSM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("OSM_BREAKER_FAILURE_THRESHOLD", 3))
+OSM_BREAKER_RESET_TIMEOUT = float(os.getenv("OSM_BREAKER_RESET_TIMEOUT", 30))
+OSM_BREAKER_HALF_OPEN_MAX_CALLS = int(os.getenv("OSM_BREAKER_HALF_OPEN_MAX_CALLS", 1))
+
+# ---------------------------------------------------------------------------
+# Trip Sessions (POST /session, POST /session/<id>/fix)
+# ---------------------------------------------------------------------------
+
+# Full zone detection is re-run once the vehicle is this far from the point
+# of the last detection, even if it is still inside the same zone.
+SESSION_REEVAL_DISTANCE_M = float(os.getenv("SESSION_REEVAL_DISTANCE_M", 250))
+
+# Idle sessions are dropped after this many seconds without a fix.
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", 1800))
+
+# Upper bound on concurrently open sessions.
+SESSION_MAX_ACTIVE = int(os.getenv("SESSION_MAX_ACTIVE", 100_000))
+
+# ---------------------------------------------------------------------------
+# Corridor Prefetch (trip sessions)
+# Heading and speed from a session's recent fixes → the geotiles ahead are
+# looked up in the background before the vehicle gets there.
+# ---------------------------------------------------------------------------
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+
+# Look this many seconds ahead at the current speed, up to PREFETCH_MAX_DISTANCE_M.
+PREFETCH_HORIZON_S = float(os.getenv("PREFETCH_HORIZON_S", 30))
+PREFETCH_MAX_DISTANCE_M = float(os.getenv("PREFETCH_MAX_DISTANCE_M", 1500))
+
+# Slower vehicles (walking pace, traffic jams) are not prefetched for.
+PREFETCH_MIN_SPEED_KMH = float(os.getenv("PREFETCH_MIN_SPEED_KMH", 10))
+
+# Background threads per process, and tiles queued or in flight beyond which
+# further corridor tiles are dropped.
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", 2))
+PREFETCH_MAX_PENDING = int(os.getenv("PREFETCH_MAX_PENDING", 256))
+
+# Quota tokens per Overpass mirror kept for live lookups: prefetch queries only
+# take a token from a mirror left with at least this many (of OVERPASS_RATE_BURST).
+PREFETCH_RESERVE_TOKENS = float(os.getenv("PREFETCH_RESERVE_TOKENS", 2))
+
+# ---------------------------------------------------------------------------
+# Fleet Tracking (POST /fleet/positions)
+# ---------------------------------------------------------------------------
+
+# Upper bound on tracked vehicles; positions for new vehicles are dropped
+# beyond it (after idle vehicles have been evicted).
+FLEET_MAX_VEHICLES = int(os.getenv("FLEET_MAX_VEHICLES", 500_000))
+
+# Vehicles are forgotten after this many seconds without a position.
+FLEET_IDLE_TTL = float(os.getenv("FLEET_IDLE_TTL", 3600))
+
+# Positions are matched and applied in chunks of this many NDJSON lines,
+# so large uploads are processed while they stream in.
+FLEET_INGEST_CHUNK = int(os.getenv("FLEET_INGEST_CHUNK", 10_000))
+
+# ---------------------------------------------------------------------------
+# Zone Statistics (GET /zones/stats)
+# ---------------------------------------------------------------------------
+
+# Lock shards for the per-zone counters; request threads are spread over them.
+ZONE_STATS_SHARDS = int(os.getenv("ZONE_STATS_SHARDS", 8))
+
+# Directory for per-worker JSON snapshots (worker-<pid>.json); "" = no snapshots.
+# GET /zones/stats merges the other workers' snapshots with its own counters.
+ZONE_STATS_DIR = os.getenv("ZONE_STATS_DIR", os.path.join(os.path.dirname(__file__), "zone_stats"))
+
+# Seconds between snapshot writes.
+ZONE_STATS_FLUSH_INTERVAL = float(os.getenv("ZONE_STATS_FLUSH_INTERVAL", 60))
+
 # ---------------------------------------------------------------------------
 # Penalty Settings
 # ---------------------------------------------------------------------------
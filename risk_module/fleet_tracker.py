@@ -0,0 +1,326 @@
+# =============================================================================
+# fleet_tracker.py — ZeroPenalty Risk Zone Intelligence Module
+# Fleet-scale geofencing: bulk vehicle positions in, zone enter/exit and
+# overspeed start/stop events out. Per-vehicle state lives in parallel numpy
+# arrays (one row per vehicle) and every chunk of positions is matched with
+# one detect_zones_batch() call, so the per-position cost stays in numpy.
+# =============================================================================
+
+import logging
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from config import DEFAULT_ZONE, FLEET_MAX_VEHICLES, FLEET_IDLE_TTL
+from zone_engine import detect_zones_batch, zone_speed_limit, overspeed_penalty
+from metrics import FLEET_UPDATES, FLEET_EVENTS
+
+logger = logging.getLogger(__name__)
+
+# Idle vehicles are swept at most this often (seconds) unless the tracker is full.
+_EXPIRE_INTERVAL = 60.0
+
+# Rows allocated up front; arrays double when they fill up.
+_INITIAL_CAPACITY = 1024
+
+
+# ---------------------------------------------------------------------------
+# Tracker
+# ---------------------------------------------------------------------------
+
+class FleetTracker:
+    """
+    Last position, zone and overspeed state of every tracked vehicle.
+
+    Vehicle ids map to rows of parallel arrays; rows of evicted vehicles are
+    reused. Zones are the static zone database only — the dynamic (Overpass)
+    path cannot keep up with fleet-scale position rates.
+
+    Event semantics follow apply_rules(): a vehicle is overspeeding while its
+    speed exceeds the speed limit of the zone it is in (the default zone's
+    limit outside every zone). An overspeed episode belongs to one zone, so
+    crossing into another zone while overspeeding ends the episode and starts
+    a new one with the new zone's limit and penalty.
+    """
+
+    def __init__(self, max_vehicles: int = FLEET_MAX_VEHICLES, idle_ttl: float = FLEET_IDLE_TTL):
+        self.max_vehicles = max_vehicles
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+
+        self._rows = {}             # vehicle_id -> row
+        self._ids = []              # row -> vehicle_id (None when free)
+        self._free = []             # rows of evicted vehicles
+        self._allocate(_INITIAL_CAPACITY)
+        self._last_expire = time.time()
+
+        self._zones = None          # zone database the `zone` column indexes into
+        self._zone_rules = {}       # zone index -> (zone_id, speed_limit, penalty_inr, alert_strength)
+        self._limits = np.empty(0)  # zone index -> speed limit, NaN until seen; [-1] = default zone
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # --- Storage -----------------------------------------------------------
+
+    def _allocate(self, capacity: int):
+        """Create (or grow) the per-vehicle columns to `capacity` rows."""
+        old = len(self._ids)
+        columns = {
+            "lat": (np.float64, np.nan),
+            "lng": (np.float64, np.nan),
+            "speed": (np.float32, np.nan),
+            "ts": (np.float64, -np.inf),        # fix time of the last applied position
+            "seen": (np.float64, 0.0),          # server time it arrived (idle expiry), 0 = free row
+            "zone": (np.int64, -1),             # index into the zone database, -1 = default zone
+            "overspeed": (np.bool_, False),
+        }
+        for name, (dtype, fill) in columns.items():
+            column = np.full(capacity, fill, dtype=dtype)
+            if old:
+                column[:old] = getattr(self, name)
+            setattr(self, name, column)
+        self._ids.extend([None] * (capacity - old))
+        self._free.extend(range(capacity - 1, old - 1, -1))
+
+    def _reset_rows(self, rows: list):
+        self.lat[rows] = np.nan
+        self.lng[rows] = np.nan
+        self.speed[rows] = np.nan
+        self.ts[rows] = -np.inf
+        self.seen[rows] = 0.0
+        self.zone[rows] = -1
+        self.overspeed[rows] = False
+
+    def _expire(self, now: float):
+        """Evict vehicles idle for longer than idle_ttl (lock held)."""
+        self._last_expire = now
+        idle = np.flatnonzero((self.seen > 0) & (self.seen < now - self.idle_ttl)).tolist()
+        for row in idle:
+            del self._rows[self._ids[row]]
+            self._ids[row] = None
+        if idle:
+            self._reset_rows(idle)
+            self._free.extend(idle)
+            logger.info(f"Evicted {len(idle)} idle fleet vehicle(s).")
+
+    def _rows_for(self, vehicle_ids: list, now: float) -> np.ndarray:
+        """Row of each vehicle, allocating rows for new ones; -1 where the tracker is full."""
+        lookup = self._rows
+        # Make room before any row of the chunk is resolved: sweeping midway
+        # could evict (and free the row of) a vehicle already resolved.
+        if len(lookup) + len(vehicle_ids) > self.max_vehicles and now - self._last_expire >= 1.0:
+            new = {vehicle_id for vehicle_id in vehicle_ids if vehicle_id not in lookup}
+            if len(lookup) + len(new) > self.max_vehicles:
+                self._expire(now)
+
+        rows = np.empty(len(vehicle_ids), dtype=np.int64)
+        for i, vehicle_id in enumerate(vehicle_ids):
+            row = lookup.get(vehicle_id)
+            if row is None:
+                row = self._new_row(vehicle_id)
+            rows[i] = row
+        return rows
+
+    def _new_row(self, vehicle_id: str) -> int:
+        if len(self._rows) >= self.max_vehicles:
+            return -1
+        if not self._free:
+            self._allocate(min(2 * len(self._ids), max(self.max_vehicles, len(self._ids) + 1)))
+        row = self._free.pop()
+        self._rows[vehicle_id] = row
+        self._ids[row] = vehicle_id
+        return row
+
+    # --- Zones -------------------------------------------------------------
+
+    def _bind_zones(self, zones):
+        """Switch to a (re)loaded zone database, carrying vehicles' zones over by id (lock held)."""
+        if zones is self._zones:
+            return
+        previous, previous_rules = self._zones, self._zone_rules
+        self._zones, self._zone_rules = zones, {}
+        self._limits = np.full(len(zones) + 1, np.nan)
+        self._limits[-1] = zone_speed_limit(DEFAULT_ZONE)
+        if previous is None:
+            return
+
+        in_zone = np.unique(self.zone[self.zone >= 0]).tolist()
+        if not in_zone:
+            return
+        new_index = {z.get("id"): i for i, z in enumerate(zones)}
+        remapped = self.zone.copy()
+        for old in in_zone:
+            zone_id = previous_rules[old][0] if old in previous_rules else previous[old].get("id")
+            # Vehicles in a zone that no longer exists are treated as outside
+            # every zone; their next position emits no exit event for it.
+            remapped[self.zone == old] = new_index.get(zone_id, -1)
+        self.zone = remapped
+
+    def _rules(self, index: int) -> tuple:
+        """(zone_id, speed_limit, penalty_inr, alert_strength) of a zone index, -1 = default zone."""
+        rules = self._zone_rules.get(index)
+        if rules is None:
+            zone = self._zone(index)
+            rules = self._zone_rules[index] = (
+                zone.get("id"), zone_speed_limit(zone), overspeed_penalty(zone), zone.get("alert_strength", "NORMAL"),
+            )
+            self._limits[index] = rules[1]
+        return rules
+
+    def _zone(self, index: int) -> dict:
+        return self._zones[index] if index >= 0 else DEFAULT_ZONE
+
+    def _speed_limits(self, matches: np.ndarray) -> np.ndarray:
+        for index in np.unique(matches).tolist():
+            if index >= 0 and index not in self._zone_rules:
+                self._rules(index)
+        return self._limits[matches]
+
+    # --- Ingest ------------------------------------------------------------
+
+    def ingest(self, vehicle_ids: list, lats, lngs, speeds, timestamps, zones) -> dict:
+        """
+        Apply a chunk of positions and return the resulting events.
+
+        vehicle_ids: list of str; lats / lngs / speeds (km/h) / timestamps
+        (Unix seconds): equal-length sequences. Several positions of one
+        vehicle may share a chunk; they are applied in timestamp order.
+        Positions older than the vehicle's last applied one are skipped.
+
+        Returns:
+            {"applied": n, "stale": n, "dropped": n, "events": [...]} — events
+            in input order, each {type, vehicle_id, zone_id, ts, lat, lng,
+            speed_kmh, ...}.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        speeds = np.asarray(speeds, dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        now = time.time()
+
+        with self._lock:
+            if now - self._last_expire > _EXPIRE_INTERVAL:
+                self._expire(now)
+            self._bind_zones(zones)
+
+            rows = self._rows_for(vehicle_ids, now)
+            tracked = rows >= 0
+            fresh = tracked & (timestamps >= self.ts[np.where(tracked, rows, 0)])
+            idx = np.flatnonzero(fresh)
+            order = idx[np.lexsort((timestamps[idx], rows[idx]))]
+            r = rows[order]
+
+            matches = detect_zones_batch(lats[order], lngs[order], zones)
+            over = speeds[order] > self._speed_limits(matches)
+
+            # State before each position: the previous position of the same
+            # vehicle in this chunk, else the stored state.
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = r[1:] != r[:-1]
+            prev_zone = np.where(first, self.zone[r], np.roll(matches, 1))
+            prev_over = np.where(first, self.overspeed[r], np.roll(over, 1))
+
+            zone_changed = matches != prev_zone
+            exits = zone_changed & (prev_zone >= 0)
+            enters = zone_changed & (matches >= 0)
+            stops = prev_over & (~over | zone_changed)
+            starts = over & (~prev_over | zone_changed)
+
+            last = np.ones(len(order), dtype=bool)
+            last[:-1] = r[:-1] != r[1:]
+            final, rows_final = order[last], r[last]
+            self.lat[rows_final] = lats[final]
+            self.lng[rows_final] = lngs[final]
+            self.speed[rows_final] = speeds[final]
+            self.ts[rows_final] = timestamps[final]
+            self.zone[rows_final] = matches[last]
+            self.overspeed[rows_final] = over[last]
+            self.seen[rows[tracked]] = now
+
+            events = self._events(
+                order, vehicle_ids, lats, lngs, speeds, timestamps,
+                matches, prev_zone, exits, enters, stops, starts,
+            )
+
+        stats = {
+            "applied": len(order),
+            "stale": int(tracked.sum()) - len(order),
+            "dropped": len(rows) - int(tracked.sum()),
+        }
+        for outcome, count in stats.items():
+            if count:
+                FLEET_UPDATES.inc(outcome, amount=count)
+        return {**stats, "events": events}
+
+    def _events(self, order, vehicle_ids, lats, lngs, speeds, timestamps,
+                matches, prev_zone, exits, enters, stops, starts) -> list:
+        """Event dicts for the positions that changed state, in input order (lock held)."""
+        changed = np.flatnonzero(exits | enters | stops | starts)
+        changed = changed[np.argsort(order[changed], kind="stable")]
+
+        events = []
+        for k in changed.tolist():
+            i = int(order[k])
+            base = {
+                "vehicle_id": vehicle_ids[i],
+                "ts": float(timestamps[i]),
+                "lat": float(lats[i]),
+                "lng": float(lngs[i]),
+                "speed_kmh": float(speeds[i]),
+            }
+            zone_index, prev_index = int(matches[k]), int(prev_zone[k])
+
+            if stops[k]:
+                events.append({"type": "overspeed_stop", "zone_id": self._rules(prev_index)[0], **base})
+            if exits[k]:
+                events.append({"type": "zone_exit", "zone_id": self._rules(prev_index)[0], **base})
+            if enters[k]:
+                zone = self._zone(zone_index)
+                events.append({"type": "zone_enter", "zone_id": zone.get("id"),
+                               "zone_name": zone.get("name"), "risk_level": zone.get("risk_level", "LOW"),
+                               "speed_limit_kmh": zone_speed_limit(zone), **base})
+            if starts[k]:
+                zone_id, speed_limit, penalty, alert_strength = self._rules(zone_index)
+                events.append({"type": "overspeed_start", "zone_id": zone_id,
+                               "speed_limit_kmh": speed_limit,
+                               "overspeed_by_kmh": round(float(speeds[i]) - speed_limit, 2),
+                               "penalty_inr": penalty, "alert_strength": alert_strength, **base})
+
+        for event_type, count in Counter(e["type"] for e in events).items():
+            FLEET_EVENTS.inc(event_type, amount=count)
+        return events
+
+    # --- Queries -----------------------------------------------------------
+
+    def vehicle(self, vehicle_id: str):
+        """Last known state of a vehicle, or None if it is not tracked."""
+        with self._lock:
+            row = self._rows.get(vehicle_id)
+            if row is None:
+                return None
+            zone_index = int(self.zone[row])
+            zone_id = self._rules(zone_index)[0] if self._zones is not None else DEFAULT_ZONE["id"]
+            return {
+                "vehicle_id": vehicle_id,
+                "lat": float(self.lat[row]),
+                "lng": float(self.lng[row]),
+                "speed_kmh": float(self.speed[row]),
+                "ts": float(self.ts[row]),
+                "zone_id": zone_id,
+                "overspeed": bool(self.overspeed[row]),
+            }
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_zone = int((self.zone >= 0).sum())
+            overspeeding = int(self.overspeed.sum())
+            return {
+                "vehicles": len(self._rows),
+                "in_zone": in_zone,
+                "overspeeding": overspeeding,
+                "capacity": len(self._ids),
+                "max_vehicles": self.max_vehicles,
+            }
@@ -0,0 +1,269 @@
+# =============================================================================
+# hotspot_index.py — ZeroPenalty Risk Zone Intelligence Module
+# Local accident-hotspot dataset: records imported from CSV / GeoJSON files
+# (police blackspot lists, incident logs) into an in-memory grid index, so
+# radius counts run locally instead of as Overpass `out count` queries.
+#
+# Usage:
+#   python hotspot_index.py info hotspots/
+#   python hotspot_index.py query hotspots/blackspots.csv 18.5284 73.8742 --radius 500
+# =============================================================================
+
+import argparse
+import csv
+import json
+import logging
+import math
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Grid cell size (degrees) — ≈550 m, about one default search radius.
+INDEX_CELL_DEG = 0.005
+
+# Keeps packed cell keys monotonic for negative longitudes
+_CELL_KEY_OFFSET = 1 << 31
+
+_METERS_PER_DEG_LAT = 110_574.0
+_METERS_PER_DEG_LNG = 111_320.0
+
+# Accepted CSV column names (case-insensitive).
+_LAT_COLUMNS = ("lat", "latitude", "y")
+_LNG_COLUMNS = ("lng", "lon", "long", "longitude", "x")
+_COUNT_COLUMNS = ("count", "incidents", "weight")
+
+_SUPPORTED_EXTENSIONS = (".csv", ".geojson", ".json")
+
+
+# ---------------------------------------------------------------------------
+# Readers
+# ---------------------------------------------------------------------------
+
+def _pick_column(fieldnames: list, candidates: tuple):
+    lookup = {name.strip().lower(): name for name in fieldnames or ()}
+    for candidate in candidates:
+        if candidate in lookup:
+            return lookup[candidate]
+    return None
+
+
+def _read_csv(path: str, records: list) -> int:
+    """Append (lat, lng, count) rows from a CSV with a header; returns rows skipped."""
+    skipped = 0
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        lat_col = _pick_column(reader.fieldnames, _LAT_COLUMNS)
+        lng_col = _pick_column(reader.fieldnames, _LNG_COLUMNS)
+        count_col = _pick_column(reader.fieldnames, _COUNT_COLUMNS)
+        if lat_col is None or lng_col is None:
+            raise ValueError(f"{path}: CSV needs latitude and longitude columns "
+                             f"({'/'.join(_LAT_COLUMNS)}, {'/'.join(_LNG_COLUMNS)}).")
+        for row in reader:
+            try:
+                count = float(row[count_col]) if count_col and row.get(count_col) not in (None, "") else 1.0
+                records.append((float(row[lat_col]), float(row[lng_col]), count))
+            except (TypeError, ValueError):
+                skipped += 1
+    return skipped
+
+
+def _read_geojson(path: str, records: list) -> int:
+    """Append Point / MultiPoint features; returns features skipped (other geometries, bad data)."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("type") == "FeatureCollection":
+        features = data.get("features", [])
+    elif data.get("type") == "Feature":
+        features = [data]
+    else:
+        features = [{"type": "Feature", "geometry": data, "properties": {}}]
+
+    skipped = 0
+    for feature in features:
+        geometry = feature.get("geometry") or {}
+        properties = feature.get("properties") or {}
+        try:
+            count = next((float(properties[k]) for k in _COUNT_COLUMNS if properties.get(k) is not None), 1.0)
+            if geometry.get("type") == "Point":
+                points = [geometry["coordinates"]]
+            elif geometry.get("type") == "MultiPoint":
+                points = geometry["coordinates"]
+            else:
+                skipped += 1
+                continue
+            for point in points:
+                records.append((float(point[1]), float(point[0]), count))    # GeoJSON is [lng, lat]
+        except (KeyError, IndexError, TypeError, ValueError):
+            skipped += 1
+    return skipped
+
+
+def dataset_files(paths) -> list:
+    """Hotspot files named by `paths` (files or directories, str or list), sorted."""
+    if isinstance(paths, str):
+        paths = [p.strip() for p in paths.split(",") if p.strip()]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(_SUPPORTED_EXTENSIONS)
+            )
+        elif os.path.exists(path):
+            files.append(path)
+    return files
+
+
+def file_signature(files: list) -> tuple:
+    """(path, mtime, size) per file — unchanged signature → no reload needed."""
+    signature = []
+    for path in files:
+        stat = os.stat(path)
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class HotspotIndex:
+    """Radius counts over hotspot records, bucketed in a CSR grid of INDEX_CELL_DEG cells."""
+
+    def __init__(self, lats, lngs, counts=None, files: list = (), signature: tuple = ()):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        self.counts = np.ones(len(self.lats)) if counts is None else np.asarray(counts, dtype=np.float64)
+        self.files = list(files)
+        self.signature = signature
+
+        keys = self._cell_keys(self.lats, self.lngs)
+        order = np.argsort(keys, kind="stable")
+        self._cells, starts = np.unique(keys[order], return_index=True)
+        self._offsets = np.append(starts, len(order)).astype(np.int64)
+        self._order = order.astype(np.int64)
+
+    @classmethod
+    def load(cls, paths) -> "HotspotIndex":
+        """
+        Import every CSV / GeoJSON file named by `paths`.
+
+        Raises FileNotFoundError when no file is found, ValueError for
+        unreadable files; rows with bad coordinates are skipped (logged).
+        """
+        files = dataset_files(paths)
+        if not files:
+            raise FileNotFoundError(f"No hotspot files (.csv, .geojson, .json) at {paths}")
+        signature = file_signature(files)
+
+        records, skipped = [], 0
+        for path in files:
+            try:
+                if path.lower().endswith(".csv"):
+                    skipped += _read_csv(path, records)
+                else:
+                    skipped += _read_geojson(path, records)
+            except (OSError, json.JSONDecodeError, UnicodeDecodeError, csv.Error) as e:
+                raise ValueError(f"Cannot read hotspot file {path}: {e}") from e
+
+        data = np.array(records, dtype=np.float64).reshape(-1, 3)
+        valid = (np.abs(data[:, 0]) <= 90) & (np.abs(data[:, 1]) <= 180) & (data[:, 2] > 0)
+        skipped += int((~valid).sum())
+        data = data[valid]
+        if skipped:
+            logger.warning(f"Skipped {skipped} hotspot record(s) with missing or invalid coordinates/counts.")
+
+        index = cls(data[:, 0], data[:, 1], data[:, 2], files=files, signature=signature)
+        logger.info(f"Loaded {len(index)} accident hotspot record(s) from {len(files)} file(s).")
+        return index
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    @staticmethod
+    def _cell_keys(lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Pack (lat cell, lng cell) into one int64 key, ordered by (i, j)."""
+        i = np.floor(lats / INDEX_CELL_DEG).astype(np.int64)
+        j = np.floor(lngs / INDEX_CELL_DEG).astype(np.int64)
+        return (i << 32) + (j + _CELL_KEY_OFFSET)
+
+    def _nearby(self, lat: float, lng: float, radius_m: float) -> np.ndarray:
+        """Indices of records bucketed in cells overlapping the search box."""
+        dlat = radius_m / _METERS_PER_DEG_LAT
+        dlng = radius_m / (_METERS_PER_DEG_LNG * max(math.cos(math.radians(min(abs(lat) + dlat, 89.9))), 1e-6))
+        i_lo, i_hi = math.floor((lat - dlat) / INDEX_CELL_DEG), math.floor((lat + dlat) / INDEX_CELL_DEG)
+        j_lo, j_hi = math.floor((lng - dlng) / INDEX_CELL_DEG), math.floor((lng + dlng) / INDEX_CELL_DEG)
+
+        found = []
+        for i in range(i_lo, i_hi + 1):
+            a = np.searchsorted(self._cells, (i << 32) + (j_lo + _CELL_KEY_OFFSET), side="left")
+            b = np.searchsorted(self._cells, (i << 32) + (j_hi + _CELL_KEY_OFFSET), side="right")
+            if b > a:
+                found.append(self._order[self._offsets[a]:self._offsets[b]])
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def _distances(self, lat: float, lng: float, idx: np.ndarray) -> np.ndarray:
+        """Equirectangular distances (metres) from (lat, lng) to records idx."""
+        x = (self.lngs[idx] - lng) * _METERS_PER_DEG_LNG * math.cos(math.radians(lat))
+        y = (self.lats[idx] - lat) * _METERS_PER_DEG_LAT
+        return np.hypot(x, y)
+
+    def count(self, lat: float, lng: float, radius_m: float) -> int:
+        """Hotspot records (summed `count` column) within radius_m."""
+        idx = self._nearby(lat, lng, radius_m)
+        if len(idx) == 0:
+            return 0
+        return int(round(self.counts[idx][self._distances(lat, lng, idx) <= radius_m].sum()))
+
+    def stable_distance(self, lat: float, lng: float, radius_m: float, limit_m: float) -> float:
+        """
+        Metres the point can move before count() may change: the distance to
+        the nearest hotspot's radius_m circle, capped at limit_m (with a
+        margin for the local projection).
+        """
+        idx = self._nearby(lat, lng, radius_m + limit_m)
+        if len(idx) == 0:
+            return limit_m
+        gap = float(np.min(np.abs(self._distances(lat, lng, idx) - radius_m)))
+        return max(0.0, min(limit_m, gap * 0.99 - 1.0))
+
+    def info(self) -> dict:
+        return {
+            "records": len(self),
+            "incidents": int(round(float(self.counts.sum()))),
+            "files": self.files,
+        }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or query a local accident-hotspot dataset.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    info = sub.add_parser("info", help="Load the dataset and print a summary")
+    info.add_argument("paths", help="CSV / GeoJSON file(s) or directory, comma-separated")
+
+    query = sub.add_parser("query", help="Count hotspots around a coordinate")
+    query.add_argument("paths")
+    query.add_argument("lat", type=float)
+    query.add_argument("lng", type=float)
+    query.add_argument("--radius", type=float, default=500)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s — %(message)s")
+
+    index = HotspotIndex.load(args.paths)
+    if args.command == "info":
+        print(json.dumps(index.info(), indent=2))
+    else:
+        print(json.dumps({"hotspot_count": index.count(args.lat, args.lng, args.radius),
+                          "radius_m": args.radius}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# =============================================================================
+# json_codec.py — ZeroPenalty Risk Zone Intelligence Module
+# Response serialization and bulk-body parsing: orjson when installed
+# (several times faster than the stdlib codec), json otherwise. Also the
+# `fields=` / compact projection used by /zone, /zone/batch and session fixes.
+# =============================================================================
+
+import json
+
+try:
+    import orjson
+except ImportError:     # optional dependency — pip install orjson
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+# Fields kept by ?compact=true — what the live-trip loop actually reads.
+COMPACT_FIELDS = (
+    "zone_id",
+    "risk_level",
+    "speed_limit_kmh",
+    "overspeed",
+    "overspeed_by_kmh",
+    "alert_strength",
+    "penalty_inr",
+    "validity",
+    "tier",
+)
+
+# Longest accepted ?fields= list (each entry is a field name or a dotted path).
+MAX_FIELDS = 32
+
+
+# ---------------------------------------------------------------------------
+# Serialization
+# ---------------------------------------------------------------------------
+
+def _default(obj):
+    """Fallback for values neither encoder handles natively (numpy scalars, datetimes, ...)."""
+    if hasattr(obj, "item"):
+        return obj.item()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj) -> bytes:
+        """Compact UTF-8 JSON bytes."""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+else:
+    _ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+
+    def dumps(obj) -> bytes:
+        """Compact UTF-8 JSON bytes."""
+        return _ENCODER.encode(obj).encode("utf-8")
+
+    loads = json.loads
+
+
+# ---------------------------------------------------------------------------
+# Field Projection
+# ---------------------------------------------------------------------------
+
+def parse_fields(raw_fields: str, compact: bool = False) -> tuple:
+    """
+    Parse ?fields=a,b,c.d (and ?compact=true) into a projection.
+
+    Returns:
+        (fields, None) on success — fields is None when no projection was asked for
+        (None, error_message) on failure
+    """
+    if raw_fields is None or not raw_fields.strip():
+        return (COMPACT_FIELDS if compact else None), None
+
+    fields = tuple(dict.fromkeys(f.strip() for f in raw_fields.split(",") if f.strip()))
+    if not fields:
+        return None, "Parameter 'fields' must list at least one field name."
+    if len(fields) > MAX_FIELDS:
+        return None, f"Parameter 'fields' accepts at most {MAX_FIELDS} names."
+    if compact:
+        fields = tuple(dict.fromkeys(COMPACT_FIELDS + fields))
+    return fields, None
+
+
+def project(result: dict, fields) -> dict:
+    """
+    Keep only `fields` of a result. Dotted names select inside nested objects
+    ("time_factors.is_night"); names the result does not have are skipped.
+    """
+    if fields is None:
+        return result
+
+    out = {}
+    for name in fields:
+        if name in result:
+            out[name] = result[name]
+            continue
+        head, _, rest = name.partition(".")
+        value = result.get(head) if rest else None
+        if not isinstance(value, dict) or out.get(head) is value:
+            continue    # not an object, or already included whole
+        nested = project(value, (rest,))
+        if nested:
+            out.setdefault(head, {}).update(nested)
+    return out
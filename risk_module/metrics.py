@@ -0,0 +1,268 @@
+# =============================================================================
+# metrics.py — ZeroPenalty Risk Zone Intelligence Module
+# Minimal in-process metrics (counters, gauges, histograms) rendered in the
+# Prometheus text exposition format for GET /metrics. No external client
+# library — the pipeline stages only need cheap, thread-safe counters.
+# =============================================================================
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+# Latency buckets (seconds): sub-ms table lookups up to multi-second Overpass calls.
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+class Registry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ---------------------------------------------------------------------------
+# Metric Types
+# ---------------------------------------------------------------------------
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), registry: Registry = REGISTRY):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge:
+    """
+    Point-in-time value, read from `fn` at render time.
+
+    `fn` returns a number, or (for labelled gauges) a dict mapping
+    label-value tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn, labels: tuple = (), registry: Registry = REGISTRY):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.fn = fn
+        registry.register(self)
+
+    def render(self) -> list:
+        value = self.fn()
+        if value is None:
+            return []
+        if not isinstance(value, dict):
+            return [f"{self.name} {_number(value)}"]
+        return [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in sorted(value.items())]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, optionally split by label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS,
+                 registry: Registry = REGISTRY):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value: float, *label_values):
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *label_values):
+        """Context manager observing the elapsed wall time of its block."""
+        return _Timer(self, label_values)
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((k, [list(v[0]), v[1], v[2]]) for k, v in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram, self.labels = histogram, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Pipeline Metrics
+# ---------------------------------------------------------------------------
+
+STAGE_LATENCY = Histogram(
+    "zeropenalty_stage_latency_seconds",
+    "Latency of each evaluate_driver stage (cache hits included).",
+    labels=("stage",),
+)
+
+DATA_SOURCE = Counter(
+    "zeropenalty_data_source_total",
+    "Dynamic lookups by reported data source (online, local, offline_timeout, offline_error, ...).",
+    labels=("source",),
+)
+
+ZONE_RESOLUTIONS = Counter(
+    "zeropenalty_zone_resolutions_total",
+    "Zone resolutions by path: dynamic, static_fallback (OSM offline), dynamic_error, static (requested).",
+    labels=("path",),
+)
+
+ZONE_TIERS = Counter(
+    "zeropenalty_zone_tier_total",
+    "GET /zone answers by tier (dynamic, cached, static, default) and why a lower tier was used "
+    "(ok, requested, budget, overload, fallback).",
+    labels=("tier", "reason"),
+)
+
+HTTP_LATENCY = Histogram(
+    "zeropenalty_http_request_duration_seconds",
+    "Flask request latency by route.",
+    labels=("endpoint", "method"),
+)
+
+HTTP_REQUESTS = Counter(
+    "zeropenalty_http_requests_total",
+    "Flask requests by route and status code.",
+    labels=("endpoint", "method", "status"),
+)
+
+OVERPASS_REQUESTS = Counter(
+    "zeropenalty_overpass_requests_total",
+    "Overpass requests per mirror by outcome: success, failure, throttled (HTTP 429), rate_limited (local quota).",
+    labels=("mirror", "outcome"),
+)
+
+FLEET_UPDATES = Counter(
+    "zeropenalty_fleet_updates_total",
+    "Fleet position updates by outcome: applied, stale (older than the last fix), dropped (tracker full), invalid.",
+    labels=("outcome",),
+)
+
+FLEET_EVENTS = Counter(
+    "zeropenalty_fleet_events_total",
+    "Fleet events emitted: zone_enter, zone_exit, overspeed_start, overspeed_stop.",
+    labels=("type",),
+)
+
+
+PREFETCH_TILES = Counter(
+    "zeropenalty_prefetch_tiles_total",
+    "Corridor prefetch tiles by outcome: queued, dropped (queue full), cached (already warm), "
+    "fetched, failed, skipped (circuit open or Overpass quota reserved for live lookups).",
+    labels=("outcome",),
+)
+
+
+def static_fallback_ratio() -> float:
+    """Share of dynamic-mode resolutions that ended on static zones."""
+    fallback = ZONE_RESOLUTIONS.value("static_fallback") + ZONE_RESOLUTIONS.value("dynamic_error")
+    total = fallback + ZONE_RESOLUTIONS.value("dynamic")
+    return fallback / total if total else 0.0
+
+
+Gauge(
+    "zeropenalty_static_fallback_ratio",
+    "Share of dynamic-mode resolutions that fell back to static zones (since start).",
+    static_fallback_ratio,
+)
+
+
+def observe_stage(stage: str):
+    """Decorator recording a function's latency under STAGE_LATENCY{stage=...}."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                STAGE_LATENCY.observe(time.perf_counter() - start, stage)
+        return wrapper
+    return decorator
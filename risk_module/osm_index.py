@@ -0,0 +1,376 @@
+# =============================================================================
+# osm_index.py — ZeroPenalty Risk Zone Intelligence Module
+# Offline OSM road/amenity/hazard index built from a local extract, so
+# risk_engine can answer dynamic lookups without calling Overpass.
+#
+# Usage:
+#   python osm_index.py build pune.osm -o osm_index.npz
+#   python osm_index.py build pune.osm.pbf -o osm_index.npz      (needs osmium)
+#   python osm_index.py build overpass_dump.json -o osm_index.npz
+#   python osm_index.py query osm_index.npz 18.5284 73.8742
+# =============================================================================
+
+import argparse
+import json
+import logging
+import math
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Search radii — mirror the Overpass queries in risk_engine
+ROAD_RADIUS_M = 30
+AMENITY_RADIUS_M = 100
+HOTSPOT_RADIUS_M = 500
+
+# Grid cell size (degrees) for the index; ≈550 m
+INDEX_CELL_DEG = 0.005
+
+# Keeps packed cell keys monotonic for negative longitudes
+_CELL_KEY_OFFSET = 1 << 31
+
+_METERS_PER_DEG_LAT = 110_574.0
+_METERS_PER_DEG_LNG = 111_320.0
+
+
+# ---------------------------------------------------------------------------
+# Tag Filters
+# ---------------------------------------------------------------------------
+
+def _is_hazard(tags: dict, is_way: bool) -> bool:
+    """Same hazard definition as risk_engine._hazard_clauses()."""
+    if is_way:
+        return tags.get("accident_prone") == "yes"
+    return (
+        tags.get("highway") == "speed_camera"
+        or tags.get("accident") == "yes"
+        or "hazard" in tags
+        or (tags.get("highway") == "stop" and tags.get("barrier") == "yes")
+    )
+
+
+class _Collector:
+    """Accumulates the features the index needs while a source is parsed."""
+
+    def __init__(self, amenity_types: set):
+        self.amenity_types = amenity_types
+        self.coords = {}        # node id -> (lat, lng), for resolving way refs
+        self.amenities = []     # (lat, lng, amenity)
+        self.hazards = []       # (lat, lng, group)
+        self.ways = []          # (refs or coords, tags)
+        self._next_group = 0
+
+    def node(self, node_id, lat: float, lng: float, tags: dict):
+        self.coords[node_id] = (lat, lng)
+        if not tags:
+            return
+        if tags.get("amenity") in self.amenity_types:
+            self.amenities.append((lat, lng, tags["amenity"]))
+        if _is_hazard(tags, is_way=False):
+            self.hazards.append((lat, lng, self._group()))
+
+    def way(self, refs_or_coords: list, tags: dict):
+        if "highway" in tags or _is_hazard(tags, is_way=True):
+            self.ways.append((refs_or_coords, tags))
+
+    def _group(self) -> int:
+        self._next_group += 1
+        return self._next_group
+
+    def resolve(self) -> dict:
+        """Turn collected ways into segment and hazard arrays."""
+        road_types, type_codes = [], {}
+        segments, seg_types = [], []
+
+        for refs_or_coords, tags in self.ways:
+            coords = [
+                c if isinstance(c, tuple) else self.coords.get(c)
+                for c in refs_or_coords
+            ]
+            coords = [c for c in coords if c is not None]
+            if not coords:
+                continue
+
+            highway = tags.get("highway")
+            if highway:
+                if highway not in type_codes:
+                    type_codes[highway] = len(road_types)
+                    road_types.append(highway)
+                pairs = zip(coords, coords[1:]) if len(coords) > 1 else [(coords[0], coords[0])]
+                for (lat1, lng1), (lat2, lng2) in pairs:
+                    segments.append((lat1, lng1, lat2, lng2))
+                    seg_types.append(type_codes[highway])
+
+            # A hazard way counts once, however many of its vertices are near.
+            if _is_hazard(tags, is_way=True):
+                group = self._group()
+                self.hazards.extend((lat, lng, group) for lat, lng in coords)
+
+        amenity_types = sorted({a for _, _, a in self.amenities})
+        amenity_codes = {a: i for i, a in enumerate(amenity_types)}
+
+        return {
+            "segments": np.array(segments, dtype=np.float64).reshape(-1, 4),
+            "segment_types": np.array(seg_types, dtype=np.int32),
+            "road_types": np.array(road_types, dtype=str),
+            "amenities": np.array([(lat, lng) for lat, lng, _ in self.amenities], dtype=np.float64).reshape(-1, 2),
+            "amenity_codes": np.array([amenity_codes[a] for _, _, a in self.amenities], dtype=np.int32),
+            "amenity_types": np.array(amenity_types, dtype=str),
+            "hazards": np.array([(lat, lng) for lat, lng, _ in self.hazards], dtype=np.float64).reshape(-1, 2),
+            "hazard_groups": np.array([g for _, _, g in self.hazards], dtype=np.int64),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Source Readers (.osm XML, Overpass JSON, .pbf)
+# ---------------------------------------------------------------------------
+
+def _read_osm_xml(path: str, collector: _Collector):
+    """Stream an .osm XML extract."""
+    for _, elem in ET.iterparse(path, events=("end",)):
+        if elem.tag == "node":
+            tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+            collector.node(elem.get("id"), float(elem.get("lat")), float(elem.get("lon")), tags)
+            elem.clear()
+        elif elem.tag == "way":
+            tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+            collector.way([nd.get("ref") for nd in elem.iter("nd")], tags)
+            elem.clear()
+        elif elem.tag == "relation":
+            elem.clear()
+
+
+def _read_overpass_json(path: str, collector: _Collector):
+    """Read an Overpass JSON dump (`out body` + `>;`, or `out geom`)."""
+    with open(path, "r", encoding="utf-8") as f:
+        elements = json.load(f).get("elements", [])
+
+    for el in elements:
+        if el.get("type") == "node" and "lat" in el:
+            collector.node(str(el["id"]), el["lat"], el["lon"], el.get("tags", {}))
+    for el in elements:
+        if el.get("type") != "way":
+            continue
+        if "geometry" in el:
+            points = [(g["lat"], g["lon"]) for g in el["geometry"] if g]
+        else:
+            points = [str(ref) for ref in el.get("nodes", [])]
+        collector.way(points, el.get("tags", {}))
+
+
+def _read_pbf(path: str, collector: _Collector):
+    """Read an .osm.pbf extract (requires the optional `osmium` package)."""
+    try:
+        import osmium
+    except ImportError as e:
+        raise RuntimeError("Reading .pbf extracts requires pyosmium: pip install osmium") from e
+
+    class Handler(osmium.SimpleHandler):
+        def node(self, n):
+            tags = {t.k: t.v for t in n.tags}
+            if tags:
+                collector.node(n.id, n.location.lat, n.location.lon, tags)
+
+        def way(self, w):
+            tags = {t.k: t.v for t in w.tags}
+            if "highway" in tags or "accident_prone" in tags:
+                coords = [(nd.lat, nd.lon) for nd in w.nodes if nd.location.valid()]
+                collector.way(coords, tags)
+
+    Handler().apply_file(path, locations=True)
+
+
+# ---------------------------------------------------------------------------
+# Grid (CSR) Construction
+# ---------------------------------------------------------------------------
+
+def _cell_keys(lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Pack (lat cell, lng cell) into one int64 key, ordered by (i, j)."""
+    i = np.floor(lats / INDEX_CELL_DEG).astype(np.int64)
+    j = np.floor(lngs / INDEX_CELL_DEG).astype(np.int64)
+    return (i << 32) + (j + _CELL_KEY_OFFSET)
+
+
+def _build_grid(lats: np.ndarray, lngs: np.ndarray) -> tuple:
+    """(sorted unique cell keys, offsets, item order) for a point set."""
+    keys = _cell_keys(lats, lngs)
+    order = np.argsort(keys, kind="stable")
+    unique, starts = np.unique(keys[order], return_index=True)
+    offsets = np.append(starts, len(order)).astype(np.int64)
+    return unique, offsets, order.astype(np.int64)
+
+
+def build_index(source_path: str, output_path: str, amenity_types=None) -> dict:
+    """
+    Parse a local OSM extract and write a compact .npz index.
+
+    Returns a summary dict of feature counts.
+    """
+    if amenity_types is None:
+        from risk_engine import AMENITY_RISK_BOOST
+        amenity_types = set(AMENITY_RISK_BOOST)
+
+    collector = _Collector(set(amenity_types))
+    lower = source_path.lower()
+    if lower.endswith(".pbf"):
+        _read_pbf(source_path, collector)
+    elif lower.endswith(".json"):
+        _read_overpass_json(source_path, collector)
+    else:
+        _read_osm_xml(source_path, collector)
+
+    arrays = collector.resolve()
+    seg = arrays["segments"]
+    mid_lat = (seg[:, 0] + seg[:, 2]) / 2
+    mid_lng = (seg[:, 1] + seg[:, 3]) / 2
+    # Half the longest segment, in degrees — pads segment lookups so a
+    # segment bucketed by its midpoint is still found from either end.
+    half_len = float(np.max(np.hypot(seg[:, 2] - seg[:, 0], seg[:, 3] - seg[:, 1])) / 2) if len(seg) else 0.0
+
+    for name, (lats, lngs) in {
+        "segment": (mid_lat, mid_lng),
+        "amenity": (arrays["amenities"][:, 0], arrays["amenities"][:, 1]),
+        "hazard": (arrays["hazards"][:, 0], arrays["hazards"][:, 1]),
+    }.items():
+        keys, offsets, order = _build_grid(lats, lngs)
+        arrays[f"{name}_cells"], arrays[f"{name}_offsets"], arrays[f"{name}_order"] = keys, offsets, order
+
+    arrays["segment_pad_deg"] = np.array(half_len)
+    arrays["cell_deg"] = np.array(INDEX_CELL_DEG)
+
+    tmp_path = output_path + ".tmp.npz"
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, output_path)
+
+    summary = {
+        "segments": int(len(seg)),
+        "road_types": int(len(arrays["road_types"])),
+        "amenities": int(len(arrays["amenities"])),
+        "hazard_points": int(len(arrays["hazards"])),
+        "output": output_path,
+    }
+    logger.info(f"OSM index built: {summary}")
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# Lookup
+# ---------------------------------------------------------------------------
+
+class OsmIndex:
+    """In-memory lookups over an index written by build_index()."""
+
+    def __init__(self, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            self._data = {k: data[k] for k in data.files}
+        self.path = path
+        self.cell_deg = float(self._data["cell_deg"])
+        self.segment_pad_deg = float(self._data["segment_pad_deg"])
+        self.road_types = self._data["road_types"].tolist()
+        self.amenity_types = self._data["amenity_types"].tolist()
+        logger.info(f"Loaded offline OSM index from {path} "
+                    f"({len(self._data['segments'])} road segments, {len(self._data['amenities'])} amenities)")
+
+    def _nearby(self, name: str, lat: float, lng: float, radius_m: float, pad_deg: float = 0.0) -> np.ndarray:
+        """Indices of `name` items bucketed in cells overlapping the search box."""
+        dlat = radius_m / _METERS_PER_DEG_LAT + pad_deg
+        dlng = radius_m / (_METERS_PER_DEG_LNG * max(math.cos(math.radians(lat)), 1e-6)) + pad_deg
+        i_lo, i_hi = math.floor((lat - dlat) / self.cell_deg), math.floor((lat + dlat) / self.cell_deg)
+        j_lo, j_hi = math.floor((lng - dlng) / self.cell_deg), math.floor((lng + dlng) / self.cell_deg)
+
+        cells, offsets, order = (self._data[f"{name}_{k}"] for k in ("cells", "offsets", "order"))
+        found = []
+        for i in range(i_lo, i_hi + 1):
+            lo_key = (i << 32) + (j_lo + _CELL_KEY_OFFSET)
+            hi_key = (i << 32) + (j_hi + _CELL_KEY_OFFSET)
+            a = np.searchsorted(cells, lo_key, side="left")
+            b = np.searchsorted(cells, hi_key, side="right")
+            if b > a:
+                found.append(order[offsets[a]:offsets[b]])
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def _local_xy(self, lat: float, lats: np.ndarray, lngs: np.ndarray, lng: float) -> tuple:
+        """Equirectangular offsets (metres) from (lat, lng)."""
+        x = (lngs - lng) * _METERS_PER_DEG_LNG * math.cos(math.radians(lat))
+        y = (lats - lat) * _METERS_PER_DEG_LAT
+        return x, y
+
+    def road_type(self, lat: float, lng: float, radius_m: float = ROAD_RADIUS_M):
+        """Highway type of the nearest segment within radius_m, or None."""
+        idx = self._nearby("segment", lat, lng, radius_m, self.segment_pad_deg)
+        if len(idx) == 0:
+            return None
+        seg = self._data["segments"][idx]
+        x1, y1 = self._local_xy(lat, seg[:, 0], seg[:, 1], lng)
+        x2, y2 = self._local_xy(lat, seg[:, 2], seg[:, 3], lng)
+        dx, dy = x2 - x1, y2 - y1
+        length_sq = dx * dx + dy * dy
+        t = np.clip(-(x1 * dx + y1 * dy) / np.where(length_sq > 0, length_sq, 1.0), 0.0, 1.0)
+        dist = np.hypot(x1 + t * dx, y1 + t * dy)
+        best = int(np.argmin(dist))
+        if dist[best] > radius_m:
+            return None
+        return self.road_types[int(self._data["segment_types"][idx[best]])]
+
+    def amenities(self, lat: float, lng: float, radius_m: float = AMENITY_RADIUS_M) -> list:
+        """Distinct amenity types within radius_m."""
+        idx = self._nearby("amenity", lat, lng, radius_m)
+        if len(idx) == 0:
+            return []
+        pts = self._data["amenities"][idx]
+        x, y = self._local_xy(lat, pts[:, 0], pts[:, 1], lng)
+        codes = self._data["amenity_codes"][idx][np.hypot(x, y) <= radius_m]
+        return [self.amenity_types[int(c)] for c in np.unique(codes)]
+
+    def hotspot_count(self, lat: float, lng: float, radius_m: float = HOTSPOT_RADIUS_M) -> int:
+        """Distinct hazard markers (nodes or ways) within radius_m."""
+        idx = self._nearby("hazard", lat, lng, radius_m)
+        if len(idx) == 0:
+            return 0
+        pts = self._data["hazards"][idx]
+        x, y = self._local_xy(lat, pts[:, 0], pts[:, 1], lng)
+        return int(len(np.unique(self._data["hazard_groups"][idx][np.hypot(x, y) <= radius_m])))
+
+    def lookup(self, lat: float, lng: float, hotspot_radius_m: float = HOTSPOT_RADIUS_M) -> dict:
+        """Same shape as risk_engine.fetch_location_risk(), source="local"."""
+        count = self.hotspot_count(lat, lng, hotspot_radius_m)
+        return {
+            "road_type": self.road_type(lat, lng) or "unclassified",
+            "amenities": self.amenities(lat, lng),
+            "source": "local",
+            "hotspot_nearby": count > 0,
+            "hotspot_count": count,
+        }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the offline OSM risk index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Build an index from a .osm, .osm.pbf or Overpass .json extract")
+    build.add_argument("source")
+    build.add_argument("-o", "--output", default=os.path.join(os.path.dirname(__file__), "osm_index.npz"))
+
+    query = sub.add_parser("query", help="Look up a coordinate in an existing index")
+    query.add_argument("index")
+    query.add_argument("lat", type=float)
+    query.add_argument("lng", type=float)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s — %(message)s")
+
+    if args.command == "build":
+        print(json.dumps(build_index(args.source, args.output), indent=2))
+    else:
+        print(json.dumps(OsmIndex(args.index).lookup(args.lat, args.lng), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+# =============================================================================
+# overpass_client.py — ZeroPenalty Risk Zone Intelligence Module
+# Overpass transport: one pooled keep-alive HTTP session shared by every
+# lookup, several mirrors (e.g. a local instance plus public servers) picked
+# by health-weighted routing, and a per-mirror token bucket so no mirror is
+# sent more than its quota.
+# =============================================================================
+
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from circuit_breaker import CircuitBreaker
+from metrics import OVERPASS_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Smoothing factor of the per-mirror latency / success moving averages.
+_EWMA_ALPHA = 0.2
+
+# Share of traffic a mirror keeps however badly it has been doing, so its
+# health estimate can recover (its circuit breaker handles hard outages).
+_MIN_SUCCESS_SCORE = 0.05
+
+# Retry-After used for a 429 without one (seconds).
+_DEFAULT_RETRY_AFTER = 10.0
+
+
+class MirrorUnavailableError(Exception):
+    """Raised instead of sending a query when no mirror may take it right now."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"No Overpass mirror available ({reason})")
+        self.reason = reason    # "rate_limited" or "circuit_open"
+
+
+class _RetryableStatus(requests.HTTPError):
+    """429 / 5xx from a mirror — worth trying another one."""
+
+
+# ---------------------------------------------------------------------------
+# Rate Limiting
+# ---------------------------------------------------------------------------
+
+class TokenBucket:
+    """
+    Non-blocking token bucket: `rate` requests per second on average,
+    bursts of up to `burst`. rate <= 0 means unlimited.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, reserve: float = 0.0) -> bool:
+        """Take a token if at least `reserve` tokens are left afterwards."""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1.0 + reserve:
+                return False
+            self._tokens -= 1.0
+            return True
+
+    def refund(self):
+        """Return a token taken by try_acquire() for a request never sent."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1.0)
+
+
+# ---------------------------------------------------------------------------
+# Mirrors
+# ---------------------------------------------------------------------------
+
+class Mirror:
+    """One Overpass endpoint with its quota, breaker and health estimate."""
+
+    def __init__(self, url: str, weight: float = 1.0, rate: float = 0.0, burst: float = 1.0,
+                 failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.url = url
+        self.weight = weight
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(f"overpass:{url}", failure_threshold=failure_threshold,
+                                      reset_timeout=reset_timeout)
+        self.latency = 0.5          # EWMA of successful response time (seconds)
+        self.success = 1.0          # EWMA of the success rate
+        self.throttled_until = 0.0  # monotonic time a 429 asked us to wait for
+        self.requests = 0
+        self.failures = 0
+        self.rate_limited = 0
+
+    def score(self) -> float:
+        """Routing weight: configured weight × recent success rate / recent latency."""
+        return self.weight * max(self.success, _MIN_SUCCESS_SCORE) / max(self.latency, 0.001)
+
+    def available(self, now: float) -> bool:
+        return now >= self.throttled_until and self.breaker.state != "open"
+
+    def acquire(self, reserve: float = 0.0):
+        """
+        Take a quota token, then a breaker slot (a half-open mirror gets
+        limited trials). None on success, else "rate_limited" / "circuit_open".
+        reserve: tokens to leave in the bucket for live lookups; background
+        refusals are not counted as rate limiting.
+        """
+        if not self.bucket.try_acquire(reserve):
+            if reserve > 0:
+                return "rate_limited"
+            self.rate_limited += 1
+            OVERPASS_REQUESTS.inc(self.url, "rate_limited")
+            return "rate_limited"
+        if not self.breaker.allow_request():
+            self.bucket.refund()
+            return "circuit_open"
+        return None
+
+    def release(self):
+        """Give back an acquire() that was not used: the quota token and the breaker slot."""
+        self.bucket.refund()
+        self.breaker.release()
+
+    def record(self, ok: bool, elapsed: float = None):
+        self.success += _EWMA_ALPHA * ((1.0 if ok else 0.0) - self.success)
+        if ok:
+            self.latency += _EWMA_ALPHA * (elapsed - self.latency)
+            self.breaker.record_success()
+        else:
+            self.failures += 1
+            self.breaker.record_failure()
+
+    def snapshot(self) -> dict:
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "state": self.breaker.state,
+            "latency_ms": round(self.latency * 1000, 1),
+            "success_rate": round(self.success, 3),
+            "rate_limit_per_s": self.bucket.rate or None,
+            "throttled_for_seconds": round(max(0.0, self.throttled_until - time.monotonic()), 1),
+            "requests": self.requests,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+        }
+
+
+def parse_mirror_spec(spec: str, default_rate: float, default_burst: float) -> tuple:
+    """
+    "url[|weight[|rate_per_s]]" → (url, weight, rate, burst).
+
+    e.g. "http://localhost:12345/api/interpreter|5|0" (local, unlimited) or
+    "https://overpass-api.de/api/interpreter|1|1".
+    """
+    url, *rest = [part.strip() for part in spec.split("|")]
+    if not url:
+        raise ValueError(f"Overpass mirror without a URL: '{spec}'")
+    weight = float(rest[0]) if len(rest) > 0 and rest[0] else 1.0
+    rate = float(rest[1]) if len(rest) > 1 and rest[1] else default_rate
+    if weight <= 0:
+        raise ValueError(f"Overpass mirror weight must be > 0: '{spec}'")
+    return url, weight, rate, default_burst
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class OverpassClient:
+    """
+    Sends Overpass queries over a pooled requests.Session.
+
+    Each query goes to a mirror drawn with probability proportional to its
+    score() among mirrors that have a token and a closed/half-open breaker.
+    Timeouts, connection errors, 429 and 5xx answers fail over to another
+    mirror, at most `max_attempts` in total and within one `timeout` budget.
+    """
+
+    def __init__(self, mirrors: list, timeout: float = 5.0, max_attempts: int = 2, pool_size: int = 16,
+                 user_agent: str = None):
+        if not mirrors:
+            raise ValueError("OverpassClient needs at least one mirror.")
+        self.mirrors = mirrors
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self.pool_size = pool_size
+        self.user_agent = user_agent
+        self._rng = random.Random()
+        self._session = self._new_session()
+        # Pooled sockets must not be shared with forked workers (server.py).
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_session)
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.mirrors), pool_maxsize=self.pool_size, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if self.user_agent:
+            session.headers["User-Agent"] = self.user_agent
+        return session
+
+    def _reset_session(self):
+        self._session = self._new_session()
+
+    def close(self):
+        self._session.close()
+
+    def _candidates(self, reserve: float = 0.0) -> tuple:
+        """
+        Mirrors in routing order (weighted random without replacement), and
+        why others were skipped. Each returned mirror holds an acquire() —
+        query() sends to it or release()s it. Mirrors with `reserve` tokens
+        or fewer left are skipped.
+        """
+        now = time.monotonic()
+        pool = [m for m in self.mirrors if m.available(now)]
+        if not pool:
+            return [], "circuit_open" if any(m.breaker.state == "open" for m in self.mirrors) else "rate_limited"
+
+        order, reason = [], "rate_limited"
+        while pool and len(order) < self.max_attempts:
+            mirror = self._rng.choices(pool, weights=[m.score() for m in pool])[0]
+            pool.remove(mirror)
+            refused = mirror.acquire(reserve)
+            if refused is None:
+                order.append(mirror)
+            elif refused == "circuit_open":
+                reason = refused
+        return order, reason
+
+    def _send(self, mirror: Mirror, query: str, timeout: float) -> list:
+        response = self._session.post(mirror.url, data={"data": query}, timeout=timeout)
+        if response.status_code == 429 or response.status_code >= 500:
+            if response.status_code == 429:
+                try:
+                    retry_after = float(response.headers.get("Retry-After", _DEFAULT_RETRY_AFTER))
+                except ValueError:
+                    retry_after = _DEFAULT_RETRY_AFTER
+                mirror.throttled_until = time.monotonic() + retry_after
+                logger.warning(f"Overpass mirror {mirror.url} over quota — pausing it for {retry_after:.0f}s.")
+            raise _RetryableStatus(f"{response.status_code} from {mirror.url}", response=response)
+        response.raise_for_status()
+        return response.json().get("elements", [])
+
+    def query(self, query: str, timeout: float = None, reserve: float = 0.0) -> list:
+        """
+        Run one Overpass query and return its elements. `timeout` overrides
+        the client's budget (e.g. for large batched queries). `reserve`
+        quota tokens per mirror are left untouched — background queries
+        (corridor prefetch) pass it so live lookups keep their share.
+
+        Raises MirrorUnavailableError without sending anything when every
+        mirror is out of quota or has its breaker open; otherwise the last
+        requests exception once all attempts failed. Other errors (e.g. a 4xx
+        for a bad query) are recorded against the mirror and raised at once.
+        """
+        mirrors, reason = self._candidates(reserve)
+        if not mirrors:
+            raise MirrorUnavailableError(reason)
+
+        deadline = time.monotonic() + (timeout or self.timeout)
+        last_error = None
+        tried = 0
+        try:
+            for mirror in mirrors:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                tried += 1
+                mirror.requests += 1
+                started = time.monotonic()
+                try:
+                    elements = self._send(mirror, query, remaining)
+                except (requests.Timeout, requests.ConnectionError, _RetryableStatus, ValueError) as e:
+                    # ValueError: truncated / non-JSON body (Overpass sends HTML error pages).
+                    throttled = isinstance(e, _RetryableStatus) and e.response.status_code == 429
+                    if throttled:
+                        mirror.breaker.release()
+                    else:
+                        mirror.record(False)
+                    OVERPASS_REQUESTS.inc(mirror.url, "throttled" if throttled else "failure")
+                    last_error = e
+                    logger.warning(f"Overpass mirror {mirror.url} failed: {e}")
+                    continue
+                except Exception as e:
+                    mirror.record(False)
+                    OVERPASS_REQUESTS.inc(mirror.url, "failure")
+                    logger.warning(f"Overpass mirror {mirror.url} rejected the query: {e}")
+                    raise
+                mirror.record(True, time.monotonic() - started)
+                OVERPASS_REQUESTS.inc(mirror.url, "success")
+                return elements
+        finally:
+            for unused in mirrors[tried:]:
+                unused.release()
+
+        if last_error is None:
+            raise requests.Timeout("Overpass deadline exhausted before any mirror answered")
+        if isinstance(last_error, ValueError) and not isinstance(last_error, requests.RequestException):
+            raise requests.RequestException(f"Invalid Overpass response: {last_error}") from last_error
+        raise last_error
+
+    def snapshot(self) -> list:
+        """Per-mirror state for the health endpoint."""
+        return [m.snapshot() for m in self.mirrors]
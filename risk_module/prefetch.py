@@ -0,0 +1,207 @@
+# =============================================================================
+# prefetch.py — ZeroPenalty Risk Zone Intelligence Module
+# Predictive corridor prefetch: from a trip session's recent fixes, estimate
+# heading and speed, and warm the geotile cache for the tiles the vehicle
+# will reach within PREFETCH_HORIZON_S — in background threads, so the
+# request that arrives there finds calculate_dynamic_risk() already cached.
+# =============================================================================
+
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    OSM_CACHE_GEOHASH_PRECISION, PREFETCH_ENABLED, PREFETCH_HORIZON_S, PREFETCH_MAX_DISTANCE_M,
+    PREFETCH_MIN_SPEED_KMH, PREFETCH_WORKERS, PREFETCH_MAX_PENDING, PREFETCH_RESERVE_TOKENS,
+)
+import risk_engine
+from metrics import PREFETCH_TILES
+from tile_cache import geohash_encode
+from zone_geometry import meters_per_deg
+
+logger = logging.getLogger(__name__)
+
+# Fixes older than this (seconds) are ignored for heading / speed.
+TRACK_WINDOW_S = 30.0
+
+# Below this displacement (metres) across the window the vehicle is treated
+# as stationary — GPS jitter, not a heading.
+_MIN_DISPLACEMENT_M = 15.0
+
+# Corridor sampling step (metres) — a third of a precision-7 geotile, so no
+# tile on the line is skipped.
+_STEP_M = 50.0
+
+# Per-session memory of tiles already handed to the prefetcher.
+_SEEN_TILES_MAX = 64
+
+# Lookup sources meaning nothing was sent: no mirror above the quota
+# reserve, or a breaker open.
+_SKIPPED_SOURCES = ("offline_rate_limited", "offline_circuit_open")
+
+
+# ---------------------------------------------------------------------------
+# Motion Estimate
+# ---------------------------------------------------------------------------
+
+def estimate_motion(track) -> tuple:
+    """
+    (unit_north, unit_east, speed_mps) from recent fixes, or None when the
+    vehicle is stationary or the fixes are unusable.
+
+    track: (lat, lng, unix_ts, reported_speed_kmh) per fix, oldest first.
+    Heading comes from the oldest fix within TRACK_WINDOW_S to the newest;
+    speed is the distance covered over that time.
+    """
+    if len(track) < 2:
+        return None
+    lat, lng, t, _ = track[-1]
+    start = next((fix for fix in track if t - fix[2] <= TRACK_WINDOW_S), None)
+    if start is None or start is track[-1]:
+        return None
+
+    m_lat, m_lng = meters_per_deg(lat)
+    north = (lat - start[0]) * m_lat
+    east = (lng - start[1]) * m_lng
+    distance = math.hypot(north, east)
+    dt = t - start[2]
+    if distance < _MIN_DISPLACEMENT_M or dt <= 0:
+        return None
+    return north / distance, east / distance, distance / dt
+
+
+def corridor_points(lat: float, lng: float, motion: tuple, horizon_s: float = PREFETCH_HORIZON_S,
+                    max_distance_m: float = PREFETCH_MAX_DISTANCE_M) -> list:
+    """
+    [(tile, (lat, lng)), ...] — one sample point per geotile along the
+    straight-line path ahead, nearest first; the current tile is excluded.
+    """
+    unit_north, unit_east, speed_mps = motion
+    reach = min(speed_mps * horizon_s, max_distance_m)
+    m_lat, m_lng = meters_per_deg(lat)
+    current = geohash_encode(lat, lng, OSM_CACHE_GEOHASH_PRECISION)
+
+    tiles = {}
+    for step in range(1, int(reach // _STEP_M) + 1):
+        d = step * _STEP_M
+        point = (lat + unit_north * d / m_lat, lng + unit_east * d / m_lng)
+        tile = geohash_encode(*point, OSM_CACHE_GEOHASH_PRECISION)
+        if tile != current and tile not in tiles:
+            tiles[tile] = point
+    return list(tiles.items())
+
+
+# ---------------------------------------------------------------------------
+# Prefetcher
+# ---------------------------------------------------------------------------
+
+class CorridorPrefetcher:
+    """
+    Background warm-up of the geotile location cache.
+
+    observe() runs on the request path: it only estimates motion, samples
+    the corridor and queues the tiles not already queued (by any session).
+    The pool threads skip tiles that are cached and send the rest as one
+    fetch_location_risk_batch() call — a single Overpass union query per
+    corridor, which joins live lookups already in flight for its tiles.
+    Tiles beyond PREFETCH_MAX_PENDING are dropped, and nothing is sent while
+    the Overpass circuit breaker is open. Queries only take quota tokens
+    from mirrors holding more than PREFETCH_RESERVE_TOKENS: the rest of the
+    quota belongs to live lookups.
+    """
+
+    def __init__(self, workers: int = PREFETCH_WORKERS, max_pending: int = PREFETCH_MAX_PENDING,
+                 enabled: bool = PREFETCH_ENABLED):
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.enabled = enabled and risk_engine.OSM_CACHE is not None
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        """Drop the pool — forked workers start their own on first use."""
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch")
+        return self._executor
+
+    def observe(self, track, seen: set = None) -> int:
+        """
+        Queue the corridor ahead of the newest fix in `track` (see
+        estimate_motion()). seen: the session's tiles already queued, which
+        are skipped and updated. Returns the number of tiles queued.
+        """
+        if not self.enabled:
+            return 0
+        track = list(track)
+        motion = estimate_motion(track)
+        if motion is None or motion[2] * 3.6 < PREFETCH_MIN_SPEED_KMH:
+            return 0
+
+        corridor = corridor_points(track[-1][0], track[-1][1], motion)
+        if seen is not None:
+            corridor = [(tile, point) for tile, point in corridor if tile not in seen]
+        if not corridor:
+            return 0
+
+        with self._lock:
+            corridor = [(tile, point) for tile, point in corridor if tile not in self._pending]
+            room = max(0, self.max_pending - len(self._pending))
+            queued, dropped = corridor[:room], len(corridor) - min(room, len(corridor))
+            self._pending.update(tile for tile, _ in queued)
+            if queued:
+                self._pool().submit(self._warm, queued)
+
+        if dropped:
+            PREFETCH_TILES.inc("dropped", amount=dropped)
+        if queued:
+            PREFETCH_TILES.inc("queued", amount=len(queued))
+            if seen is not None:
+                if len(seen) > _SEEN_TILES_MAX:
+                    seen.clear()
+                seen.update(tile for tile, _ in queued)
+        return len(queued)
+
+    def _warm(self, corridor: list):
+        """Pool thread: fetch the corridor tiles that are still uncached."""
+        try:
+            missing = [point for _, point in corridor if risk_engine.cached_location_risk(*point) is None]
+            PREFETCH_TILES.inc("cached", amount=len(corridor) - len(missing))
+            if not missing:
+                return
+            if risk_engine.OSM_BREAKER.state == "open":
+                PREFETCH_TILES.inc("skipped", amount=len(missing))
+                return
+
+            started = time.perf_counter()
+            locations = risk_engine.fetch_location_risk_batch(missing, reserve=PREFETCH_RESERVE_TOKENS)
+            sources = [location.get("source") for location in locations]
+            fetched = sources.count("online")
+            skipped = sum(1 for source in sources if source in _SKIPPED_SOURCES)
+            PREFETCH_TILES.inc("fetched", amount=fetched)
+            PREFETCH_TILES.inc("skipped", amount=skipped)
+            PREFETCH_TILES.inc("failed", amount=len(missing) - fetched - skipped)
+            logger.debug(f"Prefetched {fetched}/{len(missing)} corridor tile(s) "
+                         f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            PREFETCH_TILES.inc("failed", amount=len(corridor))
+            logger.warning(f"Corridor prefetch failed: {e}")
+        finally:
+            with self._lock:
+                self._pending.difference_update(tile for tile, _ in corridor)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled, "workers": self.workers, "pending_tiles": len(self._pending)}
+
+
+# Shared by every trip session of this process
+PREFETCHER = CorridorPrefetcher()
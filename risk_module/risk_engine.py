@@ -5,17 +5,42 @@
 # =============================================================================
 
 import logging
+import math
+import os
 import requests
 from datetime import datetime, time as dtime
 
+import numpy as np
+
+from config import (
+    APP_VERSION, OVERPASS_URL, OVERPASS_MIRRORS, OVERPASS_RATE_LIMIT, OVERPASS_RATE_BURST,
+    OVERPASS_MAX_ATTEMPTS, OVERPASS_POOL_SIZE, OSM_BATCH_MAX_POINTS, OSM_BATCH_TIMEOUT, OSM_TIMEOUT, OSM_CACHE_ENABLED, OSM_CACHE_GEOHASH_PRECISION, OSM_CACHE_TTL,
+    OSM_CACHE_MAX_ENTRIES, OSM_CACHE_DB_PATH, OSM_CACHE_DB_MAX_ROWS, OSM_LOCAL_INDEX_PATH, OSM_FAILURE_TTL,
+    OSM_BREAKER_FAILURE_THRESHOLD, OSM_BREAKER_RESET_TIMEOUT, OSM_BREAKER_HALF_OPEN_MAX_CALLS,
+    RISK_TILES_PATH, RISK_TILES_CACHE_SIZE, HOTSPOTS_PATH, VALIDITY_MAX_DISTANCE_M, ZONE_LOOKUP_WORKERS,
+)
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from hotspot_index import HotspotIndex, dataset_files, file_signature
+from metrics import observe_stage
+from osm_index import OsmIndex
+from overpass_client import OverpassClient, Mirror, MirrorUnavailableError, parse_mirror_spec
+from risk_tiles import RiskTiles
+from tile_cache import TileCache, SingleFlight, SingleFlightSaturated, geohash_encode, geohash_bounds
+from zone_geometry import meters_per_deg
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
 # Constants
 # ---------------------------------------------------------------------------
 
-OSM_TIMEOUT = 5        # seconds — API timeout
-OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+# Overpass's [timeout:] setting takes whole seconds.
+_QUERY_TIMEOUT = max(1, math.ceil(OSM_TIMEOUT))
+_BATCH_QUERY_TIMEOUT = max(1, math.ceil(OSM_BATCH_TIMEOUT))
+
+# Search radii (metres) of the road and amenity clauses
+_ROAD_RADIUS_M = 30
+_AMENITY_RADIUS_M = 100
 
 # Road type → base speed limit + base risk
 ROAD_RISK_MAP = {
@@ -62,10 +87,248 @@ AMENITY_RISK_BOOST = {
 RISK_ORDER = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
 RISK_FROM_ORDER = {0: "LOW", 1: "MEDIUM", 2: "HIGH"}
 
+# Geotile cache for successful Overpass lookups (None when disabled)
+OSM_CACHE = TileCache(
+    precision=OSM_CACHE_GEOHASH_PRECISION,
+    ttl=OSM_CACHE_TTL,
+    max_entries=OSM_CACHE_MAX_ENTRIES,
+    db_path=OSM_CACHE_DB_PATH,
+    db_max_rows=OSM_CACHE_DB_MAX_ROWS,
+) if OSM_CACHE_ENABLED else None
+
+
+# Coalesces concurrent Overpass lookups for the same geotile; budgeted
+# lookups run on ZONE_LOOKUP_WORKERS background threads.
+OSM_SINGLE_FLIGHT = SingleFlight(max_workers=ZONE_LOOKUP_WORKERS)
+
+
+def _cache_get(kind: str, lat: float, lng: float):
+    """Copy of a cached lookup for the tile containing (lat, lng), or None."""
+    if OSM_CACHE is None:
+        return None
+    cached = OSM_CACHE.get(kind, lat, lng)
+    return dict(cached) if cached is not None else None
+
+
+def _cache_put(kind: str, lat: float, lng: float, value: dict, ttl: float = None):
+    if OSM_CACHE is not None:
+        OSM_CACHE.put(kind, lat, lng, value, ttl)
+
+
+def _memoize_failure(kind: str, lat: float, lng: float, fallback: dict) -> dict:
+    """Cache an offline fallback briefly so the same tile doesn't re-wait the timeout."""
+    _cache_put(kind, lat, lng, fallback, ttl=OSM_FAILURE_TTL)
+    return fallback
+
+
+# ---------------------------------------------------------------------------
+# Overpass Transport + Circuit Breaker
+# ---------------------------------------------------------------------------
+
+OSM_BREAKER = CircuitBreaker(
+    "overpass",
+    failure_threshold=OSM_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=OSM_BREAKER_RESET_TIMEOUT,
+    half_open_max_calls=OSM_BREAKER_HALF_OPEN_MAX_CALLS,
+)
+
+
+def _build_overpass_client() -> OverpassClient:
+    specs = OVERPASS_MIRRORS or [OVERPASS_URL]
+    mirrors = []
+    for spec in specs:
+        url, weight, rate, burst = parse_mirror_spec(spec, OVERPASS_RATE_LIMIT, OVERPASS_RATE_BURST)
+        mirrors.append(Mirror(url, weight, rate, burst,
+                              failure_threshold=OSM_BREAKER_FAILURE_THRESHOLD,
+                              reset_timeout=OSM_BREAKER_RESET_TIMEOUT))
+    logger.info(f"Overpass mirrors: {', '.join(m.url for m in mirrors)}")
+    return OverpassClient(mirrors, timeout=OSM_TIMEOUT, max_attempts=OVERPASS_MAX_ATTEMPTS,
+                          pool_size=OVERPASS_POOL_SIZE, user_agent=f"ZeroPenalty/{APP_VERSION}")
+
+
+# Pooled keep-alive session + mirror routing shared by every Overpass lookup.
+OVERPASS_CLIENT = _build_overpass_client()
+
+
+@observe_stage("overpass_http")
+def _overpass_query(query: str, timeout: float = None, reserve: float = 0.0) -> list:
+    """
+    Send a query through OVERPASS_CLIENT and return its elements
+    (`timeout` overrides OSM_TIMEOUT; `reserve` quota tokens per mirror are
+    left for live lookups, see OverpassClient.query()).
+
+    Raises CircuitOpenError without touching the network while the breaker
+    is open, and MirrorUnavailableError while every mirror is out of quota
+    or has its own breaker open. Timeouts, HTTP errors and bad payloads
+    (after failover) count as failures.
+    """
+    if not OSM_BREAKER.allow_request():
+        raise CircuitOpenError(f"Circuit '{OSM_BREAKER.name}' is open")
+    try:
+        elements = OVERPASS_CLIENT.query(query, timeout, reserve)
+    except MirrorUnavailableError:
+        OSM_BREAKER.release()
+        raise
+    except Exception:
+        OSM_BREAKER.record_failure()
+        raise
+    OSM_BREAKER.record_success()
+    return elements
+
+
+# ---------------------------------------------------------------------------
+# Offline OSM Index
+# ---------------------------------------------------------------------------
+
+OSM_LOCAL_INDEX = None
+
+
+def load_osm_index(path: str = OSM_LOCAL_INDEX_PATH):
+    """
+    (Re)load the offline OSM index built by osm_index.py.
+    Missing or unreadable files leave the engine on Overpass.
+    """
+    global OSM_LOCAL_INDEX
+    if not path or not os.path.exists(path):
+        OSM_LOCAL_INDEX = None
+        return None
+    try:
+        OSM_LOCAL_INDEX = OsmIndex(path)
+    except Exception as e:
+        logger.error(f"Failed to load offline OSM index {path}: {e} — using Overpass.")
+        OSM_LOCAL_INDEX = None
+    return OSM_LOCAL_INDEX
+
+
+load_osm_index()
+
+# ---------------------------------------------------------------------------
+# Precomputed Risk Tiles
+# ---------------------------------------------------------------------------
+
+RISK_TILES = None
+
+
+def load_risk_tiles(path: str = RISK_TILES_PATH):
+    """
+    (Re)load the tile pyramid built by risk_tiles.py.
+    Missing or unreadable files leave lookups on the index / Overpass.
+    """
+    global RISK_TILES
+    if not path or not os.path.exists(path):
+        RISK_TILES = None
+        return None
+    try:
+        RISK_TILES = RiskTiles(path, cache_size=RISK_TILES_CACHE_SIZE)
+    except Exception as e:
+        logger.error(f"Failed to load risk tiles {path}: {e} — not using tiles.")
+        RISK_TILES = None
+    return RISK_TILES
+
+
+load_risk_tiles()
+
+# ---------------------------------------------------------------------------
+# Local Accident-Hotspot Dataset
+# ---------------------------------------------------------------------------
+
+HOTSPOTS = None
+
+
+def load_hotspots(path: str = HOTSPOTS_PATH):
+    """
+    (Re)load the local hotspot dataset (hotspot_index.py). Called with every
+    zone reload; files whose mtime/size are unchanged are not re-read.
+    Unreadable files keep the current dataset; no files leave hotspot
+    counts on the offline index / Overpass.
+    """
+    global HOTSPOTS
+    files = dataset_files(path) if path else []
+    if not files:
+        HOTSPOTS = None
+        return None
+    try:
+        if HOTSPOTS is None or HOTSPOTS.signature != file_signature(files):
+            HOTSPOTS = HotspotIndex.load(files)
+    except Exception as e:
+        logger.error(f"Failed to load hotspot dataset {path}: {e} — keeping current hotspots.")
+    return HOTSPOTS
+
+
+load_hotspots()
+
+# ---------------------------------------------------------------------------
+# Overpass Query Building / Parsing
+# ---------------------------------------------------------------------------
+
+def _road_clauses(lat: float, lng: float) -> str:
+    """Overpass clauses: road within 30m + amenities within 100m."""
+    return (
+        f"      way(around:{_ROAD_RADIUS_M},{lat},{lng})[highway];\n"
+        f"      node(around:{_AMENITY_RADIUS_M},{lat},{lng})[amenity];"
+    )
+
+
+def _hazard_clauses(lat: float, lng: float, radius_m: int) -> str:
+    """Overpass clauses: crash-related tags and highway hazard markers."""
+    return "\n".join(
+        f"      {clause}"
+        for clause in (
+            f"node(around:{radius_m},{lat},{lng})[highway=speed_camera];",
+            f"node(around:{radius_m},{lat},{lng})[accident=yes];",
+            f"node(around:{radius_m},{lat},{lng})[hazard];",
+            f"way(around:{radius_m},{lat},{lng})[accident_prone=yes];",
+            f"node(around:{radius_m},{lat},{lng})[highway=stop][barrier=yes];",
+        )
+    )
+
+
+def _is_hazard(element: dict) -> bool:
+    """Whether an element matches one of the _hazard_clauses() filters."""
+    tags = element.get("tags", {})
+    if element["type"] == "way":
+        return tags.get("accident_prone") == "yes"
+    return (
+        tags.get("highway") == "speed_camera"
+        or tags.get("accident") == "yes"
+        or "hazard" in tags
+        or (tags.get("highway") == "stop" and tags.get("barrier") == "yes")
+    )
+
+
+def _parse_road_elements(elements: list) -> tuple:
+    """(road_type, amenities) from Overpass `out tags` elements."""
+    road_type = None
+    amenities = []
+
+    for element in elements:
+        tags = element.get("tags", {})
+        # Extract road type from ways
+        if element["type"] == "way" and "highway" in tags:
+            if road_type is None:
+                road_type = tags["highway"]
+        # Extract amenities from nodes
+        if element["type"] == "node" and "amenity" in tags:
+            amenity = tags["amenity"]
+            if amenity in AMENITY_RISK_BOOST:
+                amenities.append(amenity)
+
+    return road_type or "unclassified", list(set(amenities))
+
+
+def _parse_count(elements: list) -> int:
+    """Total from an Overpass `out count` element (0 if absent)."""
+    for element in elements:
+        if element.get("type") == "count":
+            return int(element.get("tags", {}).get("total", 0))
+    return 0
+
+
 # ---------------------------------------------------------------------------
 # OSM Road Type Fetcher
 # ---------------------------------------------------------------------------
 
+@observe_stage("osm_road")
 def fetch_road_type_osm(lat: float, lng: float) -> dict:
     """
     Query OpenStreetMap Overpass API to get road type + nearby amenities.
@@ -73,54 +336,54 @@ def fetch_road_type_osm(lat: float, lng: float) -> dict:
     Returns:
         dict with keys: road_type, amenities, source="online"
         On failure: fallback dict with source="offline"
+
+    Successful lookups are cached per geotile (see OSM_CACHE). With an
+    offline index loaded the lookup is answered locally (source="local").
     """
+    if OSM_LOCAL_INDEX is not None:
+        return {
+            "road_type": OSM_LOCAL_INDEX.road_type(lat, lng) or "unclassified",
+            "amenities": OSM_LOCAL_INDEX.amenities(lat, lng),
+            "source": "local",
+        }
+
+    cached = _cache_get("road", lat, lng)
+    if cached is not None:
+        return cached
+
     # Overpass query — road within 30m + amenities within 100m
     query = f"""
-    [out:json][timeout:{OSM_TIMEOUT}];
+    [out:json][timeout:{_QUERY_TIMEOUT}];
     (
-      way(around:30,{lat},{lng})[highway];
-      node(around:100,{lat},{lng})[amenity];
+{_road_clauses(lat, lng)}
     );
     out tags;
     """
 
     try:
-        resp = requests.post(
-            OVERPASS_URL,
-            data={"data": query},
-            timeout=OSM_TIMEOUT
-        )
-        resp.raise_for_status()
-        data = resp.json()
-
-        road_type = None
-        amenities = []
-
-        for element in data.get("elements", []):
-            tags = element.get("tags", {})
-            # Extract road type from ways
-            if element["type"] == "way" and "highway" in tags:
-                if road_type is None:
-                    road_type = tags["highway"]
-            # Extract amenities from nodes
-            if element["type"] == "node" and "amenity" in tags:
-                amenity = tags["amenity"]
-                if amenity in AMENITY_RISK_BOOST:
-                    amenities.append(amenity)
+        elements = _overpass_query(query)
+
+        road_type, amenities = _parse_road_elements(elements)
 
         logger.info(f"OSM online: road_type={road_type}, amenities={amenities}")
-        return {
-            "road_type": road_type or "unclassified",
-            "amenities": list(set(amenities)),
+        result = {
+            "road_type": road_type,
+            "amenities": amenities,
             "source": "online"
         }
+        _cache_put("road", lat, lng, result)
+        return result
 
+    except CircuitOpenError:
+        return {"road_type": "unclassified", "amenities": [], "source": "offline_circuit_open"}
+    except MirrorUnavailableError as e:
+        return {"road_type": "unclassified", "amenities": [], "source": f"offline_{e.reason}"}
     except requests.Timeout:
         logger.warning("OSM API timeout — using offline fallback")
-        return {"road_type": "unclassified", "amenities": [], "source": "offline_timeout"}
+        return _memoize_failure("road", lat, lng, {"road_type": "unclassified", "amenities": [], "source": "offline_timeout"})
     except requests.RequestException as e:
         logger.warning(f"OSM API error: {e} — using offline fallback")
-        return {"road_type": "unclassified", "amenities": [], "source": "offline_error"}
+        return _memoize_failure("road", lat, lng, {"road_type": "unclassified", "amenities": [], "source": "offline_error"})
     except Exception as e:
         logger.error(f"Unexpected OSM error: {e}")
         return {"road_type": "unclassified", "amenities": [], "source": "offline_error"}
@@ -130,29 +393,10 @@ def fetch_road_type_osm(lat: float, lng: float) -> dict:
 # Time-Based Risk Calculator
 # ---------------------------------------------------------------------------
 
-def get_time_risk(now: datetime = None) -> dict:
-    """
-    Calculate risk modifier based on current time.
-
-    Risk factors:
-        - Night hours (22:00–05:00)     → HIGH risk bump
-        - School hours (07:30–09:00 and 13:00–14:30) weekdays → risk bump near schools
-        - Late evening (20:00–22:00)    → MEDIUM risk bump
-        - Rush hours (08:00–10:00, 17:00–19:30) → MEDIUM bump
-
-    Returns:
-        dict with: risk_bump (int 0-2), labels (list), hour, is_night, is_school_hour, is_rush_hour
-    """
-    if now is None:
-        now = datetime.now()
-
-    hour = now.hour
-    minute = now.minute
-    weekday = now.weekday()  # 0=Monday, 6=Sunday
+def _classify_time(weekday: int, time_now: dtime) -> dict:
+    """Evaluate the get_time_risk() rules for one weekday / time of day (table builder)."""
     is_weekday = weekday < 5
 
-    time_now = now.time()
-
     is_night = dtime(22, 0) <= time_now or time_now <= dtime(5, 0)
     is_late_evening = dtime(20, 0) <= time_now < dtime(22, 0)
     is_school_hour = is_weekday and (
@@ -182,8 +426,8 @@ def get_time_risk(now: datetime = None) -> dict:
 
     return {
         "risk_bump": min(risk_bump, 3),  # cap at 3
-        "labels": labels,
-        "hour": hour,
+        "labels": tuple(labels),
+        "hour": time_now.hour,
         "is_night": is_night,
         "is_school_hour": is_school_hour,
         "is_rush_hour": is_rush_hour,
@@ -191,10 +435,147 @@ def get_time_risk(now: datetime = None) -> dict:
     }
 
 
+# Minute-of-week lookup table, built once at import.
+# All rule boundaries fall on whole minutes, but the inclusive ones (05:00,
+# 09:00, 14:30, 10:00, 19:30) only match the exact minute start — so each
+# minute has two slots: [.. :00.000000] and (:00.000000 .. :59.999999].
+# Slot index = (weekday * 1440 + minute_of_day) * 2 + (0 if exact else 1).
+MINUTES_PER_WEEK = 7 * 1440
+
+
+def _build_time_table() -> list:
+    interned = {}
+    table = []
+    for weekday in range(7):
+        for minute_of_day in range(1440):
+            hour, minute = divmod(minute_of_day, 60)
+            for t in (dtime(hour, minute, 0), dtime(hour, minute, 30)):
+                entry = _classify_time(weekday, t)
+                key = tuple(entry.values())
+                table.append(interned.setdefault(key, entry))
+    return table
+
+
+_TIME_TABLE = _build_time_table()
+
+# Column views of the table for get_time_risk_batch()
+_TIME_COLUMNS = {
+    name: np.array([entry[name] for entry in _TIME_TABLE], dtype=dtype)
+    for name, dtype in (
+        ("risk_bump", np.int8), ("hour", np.int8), ("is_night", bool),
+        ("is_school_hour", bool), ("is_rush_hour", bool), ("is_late_evening", bool),
+    )
+}
+
+
+def time_risk_key(now: datetime) -> int:
+    """
+    Time-table slot for a datetime. Datetimes with equal keys get identical
+    get_time_risk() output.
+    """
+    exact = now.second == 0 and now.microsecond == 0
+    return ((now.weekday() * 1440 + now.hour * 60 + now.minute) << 1) | (0 if exact else 1)
+
+
+def time_risk_for_key(key: int) -> dict:
+    """get_time_risk() output for a time_risk_key() slot."""
+    entry = _TIME_TABLE[key]
+    return {**entry, "labels": list(entry["labels"])}
+
+
+def time_risk_signature(key: int) -> tuple:
+    """
+    Risk-relevant part of a slot (bump + flags, not the hour). Two instants
+    with equal signatures sit on the same side of every time-risk boundary.
+    """
+    entry = _TIME_TABLE[key]
+    return (entry["risk_bump"], entry["is_night"], entry["is_school_hour"],
+            entry["is_rush_hour"], entry["is_late_evening"])
+
+
+def _build_next_change() -> np.ndarray:
+    """
+    For every slot, the (unwrapped) slot index where time_risk_signature()
+    next differs — i.e. the next night / rush hour / school hours transition.
+    """
+    signatures = [time_risk_signature(k) for k in range(len(_TIME_TABLE))]
+    n = len(signatures)
+    next_change = np.zeros(n, dtype=np.int64)
+    upcoming = 2 * n
+    for k in range(2 * n - 1, -1, -1):      # two laps so the week wraps around
+        if signatures[k % n] != signatures[(k + 1) % n]:
+            upcoming = k + 1
+        if k < n:
+            next_change[k] = upcoming
+    return next_change
+
+
+_NEXT_CHANGE = _build_next_change()
+
+
+def seconds_until_time_change(now: datetime = None) -> float:
+    """
+    Seconds until get_time_risk() output next changes in a risk-relevant way
+    (bump / night / rush hour / school hours / late evening — not the hour).
+    """
+    if now is None:
+        now = datetime.now()
+    # Both slots of minute m start at m:00, so the change happens then.
+    change_minute = int(_NEXT_CHANGE[time_risk_key(now)]) >> 1
+    elapsed = (now.weekday() * 1440 + now.hour * 60 + now.minute) * 60 + now.second + now.microsecond / 1e6
+    return max(0.0, change_minute * 60 - elapsed)
+
+
+@observe_stage("time_risk")
+def get_time_risk(now: datetime = None) -> dict:
+    """
+    Calculate risk modifier based on current time.
+
+    Risk factors:
+        - Night hours (22:00–05:00)     → HIGH risk bump
+        - School hours (07:30–09:00 and 13:00–14:30) weekdays → risk bump near schools
+        - Late evening (20:00–22:00)    → MEDIUM risk bump
+        - Rush hours (08:00–10:00, 17:00–19:30) → MEDIUM bump
+
+    Served from the precomputed minute-of-week table.
+
+    Returns:
+        dict with: risk_bump (int 0-2), labels (list), hour, is_night, is_school_hour, is_rush_hour
+    """
+    if now is None:
+        now = datetime.now()
+    return time_risk_for_key(time_risk_key(now))
+
+
+def get_time_risk_batch(timestamps) -> dict:
+    """
+    Vectorized get_time_risk() for NumPy datetime64 arrays (wall-clock time,
+    no timezone) — for batch evaluation and trip replay.
+
+    Returns:
+        dict of arrays: key (time_risk_key slot, usable with
+        time_risk_for_key() for labels), risk_bump, hour, is_night,
+        is_school_hour, is_rush_hour, is_late_evening
+    """
+    ts = np.asarray(timestamps).astype("datetime64[us]")
+    minutes = ts.astype("datetime64[m]")
+    days = ts.astype("datetime64[D]")
+
+    weekday = (days.astype(np.int64) + 3) % 7          # 1970-01-01 was a Thursday
+    minute_of_day = (minutes - days).astype(np.int64)
+    inexact = (ts != minutes.astype("datetime64[us]")).astype(np.int64)
+    keys = ((weekday * 1440 + minute_of_day) << 1) | inexact
+
+    result = {name: column[keys] for name, column in _TIME_COLUMNS.items()}
+    result["key"] = keys
+    return result
+
+
 # ---------------------------------------------------------------------------
 # Accident Hotspot Fetcher
 # ---------------------------------------------------------------------------
 
+@observe_stage("osm_hotspot")
 def fetch_accident_hotspots(lat: float, lng: float, radius_m: int = 500) -> dict:
     """
     Fetch accident hotspot data from OSM (via Overpass) —
@@ -205,41 +586,48 @@ def fetch_accident_hotspots(lat: float, lng: float, radius_m: int = 500) -> dict
 
     Returns:
         dict with: hotspot_nearby (bool), hotspot_count (int), source
+
+    The local hotspot dataset (source="hotspots") and the offline index
+    (source="local") answer without Overpass.
     """
+    hotspots = HOTSPOTS
+    if hotspots is not None:
+        count = hotspots.count(lat, lng, radius_m)
+        return {"hotspot_nearby": count > 0, "hotspot_count": count, "source": "hotspots"}
+
+    if OSM_LOCAL_INDEX is not None:
+        count = OSM_LOCAL_INDEX.hotspot_count(lat, lng, radius_m)
+        return {"hotspot_nearby": count > 0, "hotspot_count": count, "source": "local"}
+
+    cache_kind = f"hotspot{radius_m}"
+    cached = _cache_get(cache_kind, lat, lng)
+    if cached is not None:
+        return cached
+
     query = f"""
-    [out:json][timeout:{OSM_TIMEOUT}];
+    [out:json][timeout:{_QUERY_TIMEOUT}];
     (
-      node(around:{radius_m},{lat},{lng})[highway=speed_camera];
-      node(around:{radius_m},{lat},{lng})[accident=yes];
-      node(around:{radius_m},{lat},{lng})[hazard];
-      way(around:{radius_m},{lat},{lng})[accident_prone=yes];
-      node(around:{radius_m},{lat},{lng})[highway=stop][barrier=yes];
+{_hazard_clauses(lat, lng, radius_m)}
     );
     out count;
     """
 
     try:
-        resp = requests.post(
-            OVERPASS_URL,
-            data={"data": query},
-            timeout=OSM_TIMEOUT
-        )
-        resp.raise_for_status()
-        data = resp.json()
+        elements = _overpass_query(query)
 
-        count = 0
-        if "elements" in data:
-            count = len(data["elements"])
-        elif "total" in data.get("remarks", ""):
-            pass
+        count = _parse_count(elements)
 
         logger.info(f"Accident hotspot check: count={count}")
-        return {
+        result = {
             "hotspot_nearby": count > 0,
             "hotspot_count": count,
             "source": "online"
         }
+        _cache_put(cache_kind, lat, lng, result)
+        return result
 
+    except (CircuitOpenError, MirrorUnavailableError):
+        return {"hotspot_nearby": False, "hotspot_count": 0, "source": "offline"}
     except Exception as e:
         logger.warning(f"Accident hotspot fetch failed: {e}")
         return {"hotspot_nearby": False, "hotspot_count": 0, "source": "offline"}
@@ -249,7 +637,374 @@ def fetch_accident_hotspots(lat: float, lng: float, radius_m: int = 500) -> dict
 # Final Risk Score Calculator
 # ---------------------------------------------------------------------------
 
-def calculate_dynamic_risk(lat: float, lng: float) -> dict:
+@observe_stage("osm_location")
+def fetch_location_risk(lat: float, lng: float, radius_m: int = 500, use_tiles: bool = True,
+                        timeout: float = None) -> dict:
+    """
+    Location-only part of the dynamic pipeline (no time component):
+    OSM road type + nearby amenities + accident hotspots.
+
+    Lookup order: risk tiles (source="tiles") → offline index
+    (source="local") → geotile cache → Overpass. Concurrent misses for the
+    same geotile are coalesced so only one Overpass request per tile is in
+    flight; the others share its result. use_tiles=False skips the tiles
+    (the tile builder samples through here).
+
+    With the local hotspot dataset loaded, hotspot_nearby / hotspot_count
+    come from it whatever the source, and Overpass is asked for the road and
+    amenities only.
+
+    timeout caps how long this call waits (request deadline), not the
+    Overpass request: that runs with OSM_TIMEOUT in the background and still
+    fills the cache. Past the deadline the lookup answers
+    source="offline_deadline", which is neither memoized nor a breaker failure.
+    With every background lookup thread busy, a miss answers
+    source="offline_saturated" at once, without starting a lookup.
+
+    Returns:
+        dict with: road_type, amenities, source, hotspot_nearby, hotspot_count
+    """
+    hotspots = HOTSPOTS
+
+    location = _local_location(lat, lng, radius_m, use_tiles)
+    if location is not None:
+        return _with_hotspots(hotspots, location, lat, lng, radius_m)
+
+    # Road-only lookups share the "road" cache kind with fetch_road_type_osm().
+    with_hazards = hotspots is None
+    kind = f"location{radius_m}" if with_hazards else "road"
+    cached = _cache_get(kind, lat, lng)
+    if cached is None:
+        tile_key = f"{kind}:{geohash_encode(lat, lng, OSM_CACHE_GEOHASH_PRECISION)}"
+        # The leader re-checks the cache in case a previous flight just finished.
+        try:
+            cached = dict(OSM_SINGLE_FLIGHT.do(
+                tile_key,
+                lambda: _cache_get(kind, lat, lng) or _query_location_osm(lat, lng, radius_m, with_hazards),
+                timeout,
+            ))
+        except (TimeoutError, SingleFlightSaturated) as e:
+            # The lookup for this tile (ours or another request's) outlived our
+            # deadline, or no lookup thread was free to start one.
+            source = "offline_deadline" if isinstance(e, TimeoutError) else "offline_saturated"
+            cached = {"road_type": "unclassified", "amenities": [], "source": source}
+            if with_hazards:
+                cached.update(hotspot_nearby=False, hotspot_count=0)
+    return _with_hotspots(hotspots, cached, lat, lng, radius_m)
+
+
+def cached_location_risk(lat: float, lng: float, radius_m: int = 500):
+    """
+    fetch_location_risk() without network I/O: risk tiles, offline index or
+    the geotile cache (memoized failures included). None when none of them
+    has the point.
+    """
+    hotspots = HOTSPOTS
+    location = _local_location(lat, lng, radius_m)
+    if location is None:
+        location = _cache_get(f"location{radius_m}" if hotspots is None else "road", lat, lng)
+    if location is None:
+        return None
+    return _with_hotspots(hotspots, location, lat, lng, radius_m)
+
+
+def _local_location(lat: float, lng: float, radius_m: int, use_tiles: bool = True):
+    """Risk tiles / offline index answer for (lat, lng), or None when neither covers it."""
+    if use_tiles and RISK_TILES is not None and radius_m == RISK_TILES.hotspot_radius_m:
+        location = RISK_TILES.location(lat, lng)
+        if location is not None:
+            return location
+    if OSM_LOCAL_INDEX is not None:
+        return OSM_LOCAL_INDEX.lookup(lat, lng, radius_m)
+    return None
+
+
+def _with_hotspots(hotspots, location: dict, lat: float, lng: float, radius_m: int) -> dict:
+    """`location` with its hotspot fields taken from the local dataset (if loaded)."""
+    if hotspots is None:
+        return location
+    count = hotspots.count(lat, lng, radius_m)
+    return {**location, "hotspot_nearby": count > 0, "hotspot_count": count}
+
+
+def _query_location_osm(lat: float, lng: float, radius_m: int, with_hazards: bool = True) -> dict:
+    """
+    ONE Overpass request — a union of the road/amenity and hazard clauses as
+    two named sets — instead of fetch_road_type_osm() followed by
+    fetch_accident_hotspots(). Successful results are cached per geotile.
+    with_hazards=False (hotspot dataset loaded) sends the road set only.
+    """
+    kind = f"location{radius_m}" if with_hazards else "road"
+    hazard_set = f"""
+    (
+{_hazard_clauses(lat, lng, radius_m)}
+    )->.hazard;
+    .hazard out count;""" if with_hazards else ""
+    query = f"""
+    [out:json][timeout:{_QUERY_TIMEOUT}];
+    (
+{_road_clauses(lat, lng)}
+    )->.road;
+    .road out tags;{hazard_set}
+    """
+
+    offline = {"road_type": "unclassified", "amenities": []}
+    if with_hazards:
+        offline.update(hotspot_nearby=False, hotspot_count=0)
+    try:
+        elements = _overpass_query(query)
+
+        road_type, amenities = _parse_road_elements(elements)
+        result = {"road_type": road_type, "amenities": amenities, "source": "online"}
+        if with_hazards:
+            count = _parse_count(elements)
+            result.update(hotspot_nearby=count > 0, hotspot_count=count)
+            logger.info(f"OSM online: road_type={road_type}, amenities={amenities}, hotspots={count}")
+        else:
+            logger.info(f"OSM online: road_type={road_type}, amenities={amenities}")
+        _cache_put(kind, lat, lng, result)
+        return result
+
+    except CircuitOpenError:
+        return {**offline, "source": "offline_circuit_open"}
+    except MirrorUnavailableError as e:
+        return {**offline, "source": f"offline_{e.reason}"}
+    except requests.Timeout:
+        logger.warning("OSM API timeout — using offline fallback")
+        return _memoize_failure(kind, lat, lng, {**offline, "source": "offline_timeout"})
+    except requests.RequestException as e:
+        logger.warning(f"OSM API error: {e} — using offline fallback")
+        return _memoize_failure(kind, lat, lng, {**offline, "source": "offline_error"})
+    except Exception as e:
+        logger.error(f"Unexpected OSM error: {e}")
+        return {**offline, "source": "offline_error"}
+
+
+# ---------------------------------------------------------------------------
+# Batched Location Lookups
+# ---------------------------------------------------------------------------
+
+@observe_stage("osm_location_batch")
+def fetch_location_risk_batch(points: list, radius_m: int = 500, reserve: float = 0.0) -> list:
+    """
+    fetch_location_risk() for many (lat, lng) points, results in input order.
+
+    Points answered by risk tiles, the offline index or the geotile cache
+    are looked up one by one. The rest are grouped by geotile, one
+    representative point per tile as the cache would store it, and sent as
+    union queries of up to OSM_BATCH_MAX_POINTS tiles each. The returned
+    geometry is matched back to each tile locally and cached, so a 2,000
+    point trip costs a few Overpass requests instead of one per tile.
+
+    Tiles take part in OSM_SINGLE_FLIGHT like single lookups: a tile
+    already in flight is waited for rather than queried again, and /zone
+    lookups for a tile in this batch wait for the batch.
+
+    reserve: quota tokens per Overpass mirror to leave untouched
+    (background callers such as the corridor prefetch).
+    """
+    hotspots = HOTSPOTS
+    with_hazards = hotspots is None
+    kind = f"location{radius_m}" if with_hazards else "road"
+
+    results = [None] * len(points)
+    pending = {}    # geotile (exact point without a cache) → indices into points
+    for i, (lat, lng) in enumerate(points):
+        location = _local_location(lat, lng, radius_m)
+        if location is None:
+            location = _cache_get(kind, lat, lng)
+        if location is not None:
+            results[i] = _with_hotspots(hotspots, location, lat, lng, radius_m)
+            continue
+        key = geohash_encode(lat, lng, OSM_CACHE_GEOHASH_PRECISION) if OSM_CACHE is not None else (lat, lng)
+        pending.setdefault(key, []).append(i)
+
+    # Same keys as fetch_location_risk() (exact points are not coalesced).
+    led, joined = OSM_SINGLE_FLIGHT.claim(
+        f"{kind}:{key}" for key in pending if OSM_CACHE is not None)
+    groups = [(key, indices) for key, indices in pending.items() if f"{kind}:{key}" not in joined]
+    try:
+        for start in range(0, len(groups), OSM_BATCH_MAX_POINTS):
+            chunk = groups[start:start + OSM_BATCH_MAX_POINTS]
+            locations = _query_locations_osm([points[indices[0]] for _, indices in chunk],
+                                             radius_m, with_hazards, reserve)
+            for (key, indices), location in zip(chunk, locations):
+                flight = f"{kind}:{key}"
+                if flight in led:
+                    OSM_SINGLE_FLIGHT.finish(flight, led[flight], location)
+                for i in indices:
+                    lat, lng = points[i]
+                    results[i] = _with_hotspots(hotspots, dict(location), lat, lng, radius_m)
+    finally:
+        offline = {"road_type": "unclassified", "amenities": [], "source": "offline_error"}
+        if with_hazards:
+            offline.update(hotspot_nearby=False, hotspot_count=0)
+        for flight, call in led.items():
+            OSM_SINGLE_FLIGHT.finish(flight, call, offline)
+
+    for key, indices in pending.items():
+        flight = f"{kind}:{key}"
+        if flight in joined:
+            location = OSM_SINGLE_FLIGHT.wait(flight, joined[flight])
+            for i in indices:
+                lat, lng = points[i]
+                results[i] = _with_hotspots(hotspots, dict(location), lat, lng, radius_m)
+
+    if groups:
+        logger.info(f"Batched OSM lookup: {len(points)} point(s), {len(groups)} uncached tile(s), "
+                    f"{math.ceil(len(groups) / OSM_BATCH_MAX_POINTS)} Overpass request(s)")
+    return results
+
+
+def _query_locations_osm(points: list, radius_m: int, with_hazards: bool, reserve: float = 0.0) -> list:
+    """
+    ONE Overpass union of every point's road/amenity (and hazard) clauses,
+    returned with geometry (`out tags geom`) and assigned back to each point
+    locally. Results are cached per point's geotile, like _query_location_osm().
+    """
+    kind = f"location{radius_m}" if with_hazards else "road"
+    clauses = []
+    for lat, lng in points:
+        clauses.append(_road_clauses(lat, lng))
+        if with_hazards:
+            clauses.append(_hazard_clauses(lat, lng, radius_m))
+    union = "\n".join(clauses)
+    query = f"""
+    [out:json][timeout:{_BATCH_QUERY_TIMEOUT}];
+    (
+{union}
+    );
+    out tags geom;
+    """
+
+    offline = {"road_type": "unclassified", "amenities": []}
+    if with_hazards:
+        offline.update(hotspot_nearby=False, hotspot_count=0)
+    try:
+        elements = _overpass_query(query, timeout=OSM_BATCH_TIMEOUT, reserve=reserve)
+        results = _assign_elements(elements, points, radius_m, with_hazards)
+        for (lat, lng), result in zip(points, results):
+            _cache_put(kind, lat, lng, result)
+        return results
+
+    except CircuitOpenError:
+        return [{**offline, "source": "offline_circuit_open"} for _ in points]
+    except MirrorUnavailableError as e:
+        return [{**offline, "source": f"offline_{e.reason}"} for _ in points]
+    except requests.Timeout:
+        logger.warning(f"OSM API timeout on a {len(points)}-tile batch — using offline fallback")
+        return [_memoize_failure(kind, lat, lng, {**offline, "source": "offline_timeout"}) for lat, lng in points]
+    except requests.RequestException as e:
+        logger.warning(f"OSM API error on a {len(points)}-tile batch: {e} — using offline fallback")
+        return [_memoize_failure(kind, lat, lng, {**offline, "source": "offline_error"}) for lat, lng in points]
+    except Exception as e:
+        logger.error(f"Unexpected OSM error: {e}")
+        return [{**offline, "source": "offline_error"} for _ in points]
+
+
+def _segments(elements: list) -> tuple:
+    """
+    (owner, coords): every segment of the elements' geometry, coords rows
+    being (lat_a, lng_a, lat_b, lng_b); a node is one zero-length segment.
+    """
+    owner, coords = [], []
+    for k, element in enumerate(elements):
+        if element["type"] == "node":
+            vertices = [(element["lat"], element["lon"])]
+        else:
+            vertices = [(p["lat"], p["lon"]) for p in element.get("geometry") or () if p]
+        if len(vertices) == 1:
+            vertices = vertices * 2
+        for a, b in zip(vertices, vertices[1:]):
+            owner.append(k)
+            coords.append((*a, *b))
+    return np.array(owner, dtype=np.int64), np.array(coords, dtype=np.float64).reshape(-1, 4)
+
+
+def _within(lat: float, lng: float, segments: tuple, radius_m: float) -> np.ndarray:
+    """Sorted indices of the elements with a segment within radius_m of (lat, lng)."""
+    owner, coords = segments
+    if len(owner) == 0:
+        return owner
+    m_lat, m_lng = meters_per_deg(lat)
+    ax, ay = (coords[:, 1] - lng) * m_lng, (coords[:, 0] - lat) * m_lat
+    dx, dy = (coords[:, 3] - lng) * m_lng - ax, (coords[:, 2] - lat) * m_lat - ay
+    length2 = dx * dx + dy * dy
+    t = np.clip(-(ax * dx + ay * dy) / np.where(length2 > 0, length2, 1.0), 0.0, 1.0)
+    return np.unique(owner[np.hypot(ax + t * dx, ay + t * dy) <= radius_m])
+
+
+def _assign_elements(elements: list, points: list, radius_m: int, with_hazards: bool) -> list:
+    """
+    Per-point _query_location_osm()-shaped results from the elements of a
+    batched query, using the same radii as the per-point clauses.
+    """
+    # Per-point queries keep the first way in Overpass's id order.
+    roads = sorted((e for e in elements if e["type"] == "way" and "highway" in e.get("tags", {})),
+                   key=lambda e: e["id"])
+    amenities = [e for e in elements
+                 if e["type"] == "node" and e.get("tags", {}).get("amenity") in AMENITY_RISK_BOOST]
+    hazards = [e for e in elements if _is_hazard(e)] if with_hazards else []
+    road_segments, amenity_segments, hazard_segments = _segments(roads), _segments(amenities), _segments(hazards)
+
+    results = []
+    for lat, lng in points:
+        near_roads = _within(lat, lng, road_segments, _ROAD_RADIUS_M)
+        result = {
+            "road_type": roads[near_roads[0]]["tags"]["highway"] if len(near_roads) else "unclassified",
+            "amenities": list({amenities[k]["tags"]["amenity"]
+                               for k in _within(lat, lng, amenity_segments, _AMENITY_RADIUS_M)}),
+            "source": "online",
+        }
+        if with_hazards:
+            count = len(_within(lat, lng, hazard_segments, radius_m))
+            result.update(hotspot_nearby=count > 0, hotspot_count=count)
+        results.append(result)
+    return results
+
+
+def _distance_to_edge(lat: float, lng: float, bounds: tuple) -> float:
+    """Metres from a point to the nearest edge of a (south, west, north, east) box containing it."""
+    south, west, north, east = bounds
+    m_lat, m_lng = meters_per_deg(lat)
+    return float(max(0.0, min((lat - south) * m_lat, (north - lat) * m_lat,
+                              (lng - west) * m_lng, (east - lng) * m_lng)))
+
+
+def location_validity(lat: float, lng: float, source: str, radius_m: int = 500) -> dict:
+    """
+    How far the point can move before fetch_location_risk() may answer
+    differently, given the source of its last answer.
+
+    Tiles carry a per-cell distance to the nearest cell with different data;
+    Overpass results (and memoized failures) are cached per geotile, so the
+    distance is to that tile's edge. The offline index answers per point
+    (distance 0). A loaded hotspot dataset further caps the distance at the
+    nearest hotspot's radius_m circle.
+
+    Returns:
+        dict with: distance_m, basis, ttl_s (None → no limit of its own)
+    """
+    if source == "tiles" and RISK_TILES is not None:
+        validity = {"distance_m": RISK_TILES.stable_distance(lat, lng), "basis": "risk_tiles", "ttl_s": None}
+    elif source.startswith("offline"):
+        bounds = geohash_bounds(lat, lng, OSM_CACHE_GEOHASH_PRECISION)
+        validity = {"distance_m": _distance_to_edge(lat, lng, bounds), "basis": "geotile", "ttl_s": OSM_FAILURE_TTL}
+    elif source == "online" and OSM_CACHE is not None:
+        bounds = geohash_bounds(lat, lng, OSM_CACHE_GEOHASH_PRECISION)
+        validity = {"distance_m": _distance_to_edge(lat, lng, bounds), "basis": "geotile", "ttl_s": OSM_CACHE.ttl}
+    else:
+        return {"distance_m": 0.0, "basis": "point", "ttl_s": None}
+
+    hotspots = HOTSPOTS
+    if hotspots is not None:
+        stable = hotspots.stable_distance(lat, lng, radius_m, VALIDITY_MAX_DISTANCE_M)
+        if stable < validity["distance_m"]:
+            validity.update(distance_m=stable, basis="hotspots")
+    return validity
+
+
+def calculate_dynamic_risk(lat: float, lng: float, now: datetime = None, timeout: float = None) -> dict:
     """
     Full dynamic risk pipeline:
         1. OSM road type (online → offline fallback)
@@ -257,13 +1012,33 @@ def calculate_dynamic_risk(lat: float, lng: float) -> dict:
         3. Accident hotspots
         4. Time-based risk
 
+    timeout caps the wait for the location lookup (see fetch_location_risk()).
+
     Returns a complete risk assessment dict.
     """
+    return build_dynamic_zone(fetch_location_risk(lat, lng, timeout=timeout), get_time_risk(now))
+
+
+def calculate_cached_risk(lat: float, lng: float, now: datetime = None):
+    """calculate_dynamic_risk() from local / cached data only; None on a cache miss."""
+    location = cached_location_risk(lat, lng)
+    if location is None:
+        return None
+    return build_dynamic_zone(location, get_time_risk(now))
+
+
+def location_rules(location: dict) -> dict:
+    """
+    Time-independent half of build_dynamic_zone(): base risk score, speed
+    limit and penalty multiplier from road type, amenities and hotspots.
+    Also what risk_tiles.py precomputes per tile cell.
+
+    Returns:
+        dict with: risk_score (unclamped), speed_limit, multiplier, risk_factors
+    """
     # Step 1 — Road type from OSM
-    osm_data = fetch_road_type_osm(lat, lng)
-    road_type = osm_data["road_type"]
-    amenities = osm_data["amenities"]
-    osm_source = osm_data["source"]
+    road_type = location["road_type"]
+    amenities = location["amenities"]
 
     # Get base risk from road type
     road_info = ROAD_RISK_MAP.get(road_type, ROAD_RISK_MAP["unclassified"])
@@ -293,14 +1068,37 @@ def calculate_dynamic_risk(lat: float, lng: float) -> dict:
     risk_factors.extend(amenity_labels)
 
     # Step 3 — Accident hotspots
-    accident_data = fetch_accident_hotspots(lat, lng)
-    if accident_data["hotspot_nearby"]:
+    if location["hotspot_nearby"]:
         risk_score += 2
         base_multiplier += 0.5
-        risk_factors.append(f"⚠️ Accident Hotspot Nearby ({accident_data['hotspot_count']} markers)")
+        risk_factors.append(f"⚠️ Accident Hotspot Nearby ({location['hotspot_count']} markers)")
+
+    return {
+        "risk_score": risk_score,
+        "speed_limit": base_speed_limit,
+        "multiplier": base_multiplier,
+        "risk_factors": risk_factors,
+    }
+
+
+def build_dynamic_zone(location: dict, time_data: dict) -> dict:
+    """
+    Combine a fetch_location_risk() result with get_time_risk() output into
+    a dynamic zone. Pure computation — lets callers share one location
+    lookup or one time-risk result across many evaluations.
+    """
+    road_type = location["road_type"]
+    amenities = location["amenities"]
+    osm_source = location["source"]
+
+    # Steps 1–3 — road type, amenities, hotspots
+    base = location_rules(location)
+    risk_score = base["risk_score"]
+    base_speed_limit = base["speed_limit"]
+    base_multiplier = base["multiplier"]
+    risk_factors = base["risk_factors"]
 
     # Step 4 — Time-based risk
-    time_data = get_time_risk()
     risk_score += time_data["risk_bump"]
     risk_factors.extend(time_data["labels"])
 
@@ -343,7 +1141,7 @@ def calculate_dynamic_risk(lat: float, lng: float) -> dict:
         "road_type": road_type,
         "amenities_nearby": amenities,
         "time_factors": time_data,
-        "accident_hotspot": accident_data["hotspot_nearby"],
+        "accident_hotspot": location["hotspot_nearby"],
         "data_source": osm_source,
     }
 
@@ -0,0 +1,563 @@
+# =============================================================================
+# risk_tiles.py — ZeroPenalty Risk Zone Intelligence Module
+# Precomputed city-wide dynamic risk as a slippy-map tile pyramid. Each tile
+# is a size×size grid of the location part of calculate_dynamic_risk() —
+# road type, amenities, hotspot count and the resulting base speed limit /
+# risk / multiplier (no time component). Stored as gzipped JSON in an
+# MBTiles-layout SQLite file, served by GET /tiles/<z>/<x>/<y> and used by
+# risk_engine.fetch_location_risk() before the offline index or Overpass.
+#
+# Usage:
+#   python risk_tiles.py build --bbox 18.42,73.75,18.62,73.98 -o risk_tiles.mbtiles
+#   python risk_tiles.py info risk_tiles.mbtiles
+#   python risk_tiles.py query risk_tiles.mbtiles 18.5284 73.8742
+# =============================================================================
+
+import argparse
+import gzip
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from json_codec import dumps
+from zone_geometry import meters_per_deg
+
+logger = logging.getLogger(__name__)
+
+TILE_FORMAT = "zeropenalty-risk-json"
+TILE_FORMAT_VERSION = 1
+
+# Defaults: z16 tiles are ≈580 m wide at Pune's latitude; 16×16 cells ≈36 m.
+DEFAULT_MAX_ZOOM = 16
+DEFAULT_MIN_ZOOM = 11
+DEFAULT_TILE_SIZE = 16
+
+RISK_LEVELS = ("LOW", "MEDIUM", "HIGH")
+
+# Web Mercator latitude limit
+_MAX_LAT = 85.05112878
+
+# Equatorial circumference (metres) of the Web Mercator sphere
+_EQUATOR_M = 40_075_016.686
+
+# Cap on the per-cell "stable_m" distance stored in max-zoom tiles.
+DEFAULT_STABLE_LIMIT_M = 2000.0
+
+# Marker for "tile not in the pyramid" in the decoded-tile cache
+_MISSING = object()
+
+
+# ---------------------------------------------------------------------------
+# Tile Math (Web Mercator / XYZ, as used by OSM and Leaflet)
+# ---------------------------------------------------------------------------
+
+def tile_coords(lat: float, lng: float, z: int) -> tuple:
+    """Fractional (x, y) tile coordinates of a point at zoom z."""
+    lat = max(-_MAX_LAT, min(_MAX_LAT, lat))
+    n = 1 << z
+    x = (lng + 180.0) / 360.0 * n
+    lat_rad = math.radians(lat)
+    y = (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n
+    return x, y
+
+
+def tile_point(z: int, x: float, y: float) -> tuple:
+    """(lat, lng) of fractional tile coordinates — inverse of tile_coords()."""
+    n = 1 << z
+    lng = x / n * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    return lat, lng
+
+
+def tile_bounds(z: int, x: int, y: int) -> list:
+    """[south, west, north, east] of a tile."""
+    north, west = tile_point(z, x, y)
+    south, east = tile_point(z, x + 1, y + 1)
+    return [round(south, 7), round(west, 7), round(north, 7), round(east, 7)]
+
+
+def cell_size_m(lat: float, z: int, size: int) -> float:
+    """Side (metres) of a size×size tile cell at zoom z — Mercator cells are square."""
+    return _EQUATOR_M * math.cos(math.radians(min(abs(lat), _MAX_LAT))) / ((1 << z) * size)
+
+
+def tiles_in_bbox(south: float, west: float, north: float, east: float, z: int) -> list:
+    """(x, y) of every zoom-z tile overlapping the box."""
+    x0, y0 = tile_coords(north, west, z)
+    x1, y1 = tile_coords(south, east, z)
+    n = (1 << z) - 1
+    return [
+        (x, y)
+        for x in range(max(0, int(x0)), min(n, int(x1)) + 1)
+        for y in range(max(0, int(y0)), min(n, int(y1)) + 1)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Cells
+# ---------------------------------------------------------------------------
+# A cell is (road_type, amenities, hotspot_count, speed_limit, risk, multiplier)
+# with amenities a sorted tuple and risk an index into RISK_LEVELS.
+
+def _cell(location: dict, rules: dict) -> tuple:
+    return (
+        location["road_type"],
+        tuple(sorted(location["amenities"])),
+        int(location["hotspot_count"]),
+        int(rules["speed_limit"]),
+        min(rules["risk_score"], 2),
+        round(min(rules["multiplier"], 4.0), 1),
+    )
+
+
+def _restrictiveness(cell: tuple) -> tuple:
+    """Sort key — higher is stricter (risk, then lower limit, then multiplier)."""
+    return cell[4], -cell[3], cell[5], cell[2]
+
+
+def _aggregate(children: dict, size: int) -> list:
+    """
+    Parent tile cells from up to four child tiles ({(dx, dy): cells}): each
+    parent cell keeps the strictest of the 2×2 child cells it covers.
+    """
+    cells = [None] * (size * size)
+    for (dx, dy), child in children.items():
+        for row in range(size):
+            parent_row = (dy * size + row) // 2
+            for col in range(size):
+                cell = child[row * size + col]
+                if cell is None:
+                    continue
+                i = parent_row * size + (dx * size + col) // 2
+                if cells[i] is None or _restrictiveness(cell) > _restrictiveness(cells[i]):
+                    cells[i] = cell
+    return cells
+
+
+def _stable_distances(level: dict, size: int, cell_m: float, limit_m: float) -> dict:
+    """
+    Per max-zoom cell, metres from its centre to the nearest cell whose
+    location data differs (or is missing), capped at limit_m — so clients
+    and validity envelopes know how far the same answer extends.
+
+    Lower bound via a banded Euclidean distance transform to "boundary"
+    cells (cells with a differing 4-neighbour): any differing cell is at
+    least as far as the nearest boundary cell.
+    """
+    xs = [x for x, _ in level]
+    ys = [y for _, y in level]
+    x0, y0 = min(xs), min(ys)
+    height, width = (max(ys) - y0 + 1) * size, (max(xs) - x0 + 1) * size
+
+    # Integer code per distinct (road, amenities, hotspots); -1 no data,
+    # and a ring of -2 around the grid for "outside the built area".
+    codes, ids = {}, np.full((height + 2, width + 2), -2, dtype=np.int64)
+    for (x, y), cells in level.items():
+        block = [-1 if c is None else codes.setdefault(c[:3], len(codes)) for c in cells]
+        r, c = (y - y0) * size + 1, (x - x0) * size + 1
+        ids[r:r + size, c:c + size] = np.array(block, dtype=np.int64).reshape(size, size)
+
+    inner = ids[1:-1, 1:-1]
+    boundary = (
+        (inner != ids[:-2, 1:-1]) | (inner != ids[2:, 1:-1]) |
+        (inner != ids[1:-1, :-2]) | (inner != ids[1:-1, 2:])
+    )
+
+    band = int(math.ceil(limit_m / cell_m)) + 1
+    # Vertical distance (cells) to the nearest boundary cell in the same column.
+    vertical = np.where(boundary, 0, band).astype(np.float64)
+    for r in range(1, height):
+        vertical[r] = np.minimum(vertical[r], vertical[r - 1] + 1)
+    for r in range(height - 2, -1, -1):
+        vertical[r] = np.minimum(vertical[r], vertical[r + 1] + 1)
+    # Then the closest column within the band.
+    vertical_sq = vertical ** 2
+    best_sq = vertical_sq.copy()
+    for k in range(1, band + 1):
+        shifted = np.full_like(vertical_sq, np.inf)
+        shifted[:, k:] = vertical_sq[:, :-k] if k < width else np.inf
+        np.minimum(best_sq, shifted + k * k, out=best_sq)
+        shifted = np.full_like(vertical_sq, np.inf)
+        shifted[:, :-k] = vertical_sq[:, k:] if k < width else np.inf
+        np.minimum(best_sq, shifted + k * k, out=best_sq)
+    stable = np.minimum(np.sqrt(best_sq) * cell_m, limit_m).astype(np.int64)
+
+    out = {}
+    for (x, y) in level:
+        r, c = (y - y0) * size, (x - x0) * size
+        out[(x, y)] = stable[r:r + size, c:c + size].ravel().tolist()
+    return out
+
+
+def _encode_tile(z: int, x: int, y: int, size: int, cells: list, stable: list = None) -> bytes:
+    """
+    Gzipped JSON payload: palettes + row-major (north → south) cell arrays,
+    plus "stable_m" (see _stable_distances()) on max-zoom tiles.
+    """
+    road_codes, amenity_codes = {}, {}
+    columns = {name: [] for name in ("road", "amenities", "hotspot_count", "speed_limit", "risk", "multiplier")}
+
+    for cell in cells:
+        if cell is None:    # no data (failed lookup, or edge of the built area)
+            for column in columns.values():
+                column.append(None)
+            continue
+        road, amenities, hotspots, limit, risk, multiplier = cell
+        columns["road"].append(road_codes.setdefault(road, len(road_codes)))
+        columns["amenities"].append(amenity_codes.setdefault(amenities, len(amenity_codes)))
+        columns["hotspot_count"].append(hotspots)
+        columns["speed_limit"].append(limit)
+        columns["risk"].append(risk)
+        columns["multiplier"].append(multiplier)
+
+    payload = {
+        "format": TILE_FORMAT,
+        "version": TILE_FORMAT_VERSION,
+        "z": z, "x": x, "y": y,
+        "size": size,
+        "bounds": tile_bounds(z, x, y),
+        "road_types": list(road_codes),
+        "amenity_sets": [list(a) for a in amenity_codes],
+        "risk_levels": list(RISK_LEVELS),
+        **columns,
+    }
+    if stable is not None:
+        payload["stable_m"] = [None if cell is None else d for cell, d in zip(cells, stable)]
+    return gzip.compress(dumps(payload), mtime=0)
+
+
+# ---------------------------------------------------------------------------
+# Builder
+# ---------------------------------------------------------------------------
+
+def _sample_tile(z: int, x: int, y: int, size: int, location_fn, rules_fn) -> list:
+    """
+    Evaluate location_fn at every cell centre of one tile. Failed lookups
+    (offline_* fallbacks) are left empty so live lookups still answer them.
+    """
+    cells = []
+    for row in range(size):
+        for col in range(size):
+            lat, lng = tile_point(z, x + (col + 0.5) / size, y + (row + 0.5) / size)
+            location = location_fn(lat, lng)
+            if location.get("source", "").startswith("offline"):
+                cells.append(None)
+            else:
+                cells.append(_cell(location, rules_fn(location)))
+    return cells
+
+
+def build_pyramid(bbox: tuple, output_path: str, max_zoom: int = DEFAULT_MAX_ZOOM,
+                  min_zoom: int = DEFAULT_MIN_ZOOM, size: int = DEFAULT_TILE_SIZE,
+                  workers: int = 4, location_fn=None, stable_limit_m: float = DEFAULT_STABLE_LIMIT_M) -> dict:
+    """
+    Sample the location risk over bbox (south, west, north, east) at
+    max_zoom and aggregate it up to min_zoom.
+
+    location_fn(lat, lng) → fetch_location_risk()-shaped dict. Defaults to
+    fetch_location_risk() without the tile lookup, i.e. the offline OSM
+    index when one is loaded (recommended — a city is ~10⁵–10⁶ samples),
+    otherwise Overpass through the geotile cache.
+
+    Returns a summary dict.
+    """
+    from risk_engine import fetch_location_risk, location_rules
+    from osm_index import HOTSPOT_RADIUS_M
+
+    if location_fn is None:
+        def location_fn(lat, lng):
+            return fetch_location_risk(lat, lng, HOTSPOT_RADIUS_M, use_tiles=False)
+
+    south, west, north, east = bbox
+    if not (south < north and west < east):
+        raise ValueError("bbox must be south,west,north,east with south < north and west < east.")
+    if not 0 <= min_zoom <= max_zoom <= 22:
+        raise ValueError("Zoom levels must satisfy 0 <= min_zoom <= max_zoom <= 22.")
+    if not 1 <= size <= 256:
+        raise ValueError("Tile size must be between 1 and 256 cells.")
+
+    started = time.monotonic()
+    base_tiles = tiles_in_bbox(south, west, north, east, max_zoom)
+    logger.info(f"Sampling {len(base_tiles)} z{max_zoom} tiles × {size * size} cells "
+                f"({len(base_tiles) * size * size} lookups, {workers} worker(s))...")
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(
+            "CREATE TABLE metadata (name TEXT PRIMARY KEY, value TEXT);"
+            "CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB,"
+            " PRIMARY KEY (zoom_level, tile_column, tile_row));"
+        )
+
+        def store(z, x, y, cells, stable=None):
+            # MBTiles rows are TMS (counted from the south).
+            conn.execute("INSERT INTO tiles VALUES (?, ?, ?, ?)",
+                         (z, x, (1 << z) - 1 - y, _encode_tile(z, x, y, size, cells, stable)))
+
+        level = {}
+        failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            sampled = pool.map(lambda t: _sample_tile(max_zoom, t[0], t[1], size, location_fn, location_rules),
+                               base_tiles)
+            for done, ((x, y), cells) in enumerate(zip(base_tiles, sampled), start=1):
+                level[(x, y)] = cells
+                failed += cells.count(None)
+                if done % 250 == 0:
+                    logger.info(f"  {done}/{len(base_tiles)} tiles sampled")
+
+        # Smallest cell in the box (Mercator cells shrink away from the equator).
+        cell_m = cell_size_m(max(abs(south), abs(north)), max_zoom, size)
+        stable = _stable_distances(level, size, cell_m, stable_limit_m)
+        for (x, y), cells in level.items():
+            store(max_zoom, x, y, cells, stable[(x, y)])
+
+        tile_counts = {max_zoom: len(level)}
+        for z in range(max_zoom - 1, min_zoom - 1, -1):
+            parents = {}
+            for (x, y), cells in level.items():
+                parents.setdefault((x // 2, y // 2), {})[(x % 2, y % 2)] = cells
+            level = {}
+            for (x, y), children in parents.items():
+                level[(x, y)] = _aggregate(children, size)
+                store(z, x, y, level[(x, y)])
+            tile_counts[z] = len(level)
+
+        metadata = {
+            "name": "ZeroPenalty dynamic risk",
+            "format": TILE_FORMAT,
+            "version": str(TILE_FORMAT_VERSION),
+            "bounds": f"{west},{south},{east},{north}",
+            "minzoom": str(min_zoom),
+            "maxzoom": str(max_zoom),
+            "tile_size": str(size),
+            "hotspot_radius_m": str(HOTSPOT_RADIUS_M),
+            "cell_m": str(cell_m),
+            "built_at": str(int(time.time())),
+        }
+        conn.executemany("INSERT INTO metadata VALUES (?, ?)", metadata.items())
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, output_path)
+
+    summary = {
+        "output": output_path,
+        "bbox": [south, west, north, east],
+        "tiles": {f"z{z}": n for z, n in sorted(tile_counts.items())},
+        "cells_sampled": len(base_tiles) * size * size,
+        "cells_failed": failed,
+        "seconds": round(time.monotonic() - started, 1),
+        "bytes": os.path.getsize(output_path),
+    }
+    if failed:
+        logger.warning(f"{failed} cell lookup(s) failed and were left empty — rebuild to fill them.")
+    logger.info(f"Risk tile pyramid built: {summary}")
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# Reader
+# ---------------------------------------------------------------------------
+
+class RiskTiles:
+    """
+    Read-only access to a pyramid written by build_pyramid(): raw tiles for
+    GET /tiles, and point lookups against the max-zoom tiles for
+    fetch_location_risk(). Decoded tiles are kept in an LRU of cache_size.
+    """
+
+    def __init__(self, path: str, cache_size: int = 1024):
+        self.path = path
+        self.cache_size = max(1, cache_size)
+        self._local = threading.local()
+        self._decoded = OrderedDict()   # (x, y) -> decoded max-zoom tile or _MISSING
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        # SQLite connections must not cross fork() (see server.py).
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._drop_connections)
+
+        metadata = dict(self._db().execute("SELECT name, value FROM metadata").fetchall())
+        if metadata.get("format") != TILE_FORMAT:
+            raise ValueError(f"{path} is not a risk tile pyramid (format={metadata.get('format')!r}).")
+        if int(metadata.get("version", 0)) != TILE_FORMAT_VERSION:
+            raise ValueError(f"{path} has tile format v{metadata.get('version')}, "
+                             f"expected v{TILE_FORMAT_VERSION} — rebuild it.")
+        self.metadata = metadata
+        self.min_zoom = int(metadata["minzoom"])
+        self.max_zoom = int(metadata["maxzoom"])
+        self.tile_size = int(metadata["tile_size"])
+        self.hotspot_radius_m = int(metadata["hotspot_radius_m"])
+        logger.info(f"Loaded risk tiles from {path} (z{self.min_zoom}–z{self.max_zoom}, "
+                    f"{self.tile_size}×{self.tile_size} cells, bounds {metadata.get('bounds')})")
+
+    def _db(self) -> sqlite3.Connection:
+        """Per-thread read-only SQLite connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connections(self):
+        self._local = threading.local()
+
+    def tile_bytes(self, z: int, x: int, y: int):
+        """Gzipped JSON for tile z/x/y (XYZ scheme), or None if it was not built."""
+        row = self._db().execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (z, x, (1 << z) - 1 - y),
+        ).fetchone()
+        return bytes(row[0]) if row is not None else None
+
+    def _tile(self, x: int, y: int):
+        """Decoded max-zoom tile, or None."""
+        key = (x, y)
+        with self._lock:
+            tile = self._decoded.get(key)
+            if tile is not None:
+                self._decoded.move_to_end(key)
+                self.hits += 1
+                return None if tile is _MISSING else tile
+            self.misses += 1
+
+        data = self.tile_bytes(self.max_zoom, x, y)
+        tile = json.loads(gzip.decompress(data)) if data is not None else _MISSING
+        with self._lock:
+            self._decoded[key] = tile
+            while len(self._decoded) > self.cache_size:
+                self._decoded.popitem(last=False)
+        return None if tile is _MISSING else tile
+
+    def location(self, lat: float, lng: float):
+        """
+        fetch_location_risk()-shaped dict (source="tiles") for the cell
+        containing (lat, lng), or None outside the built area.
+        """
+        fx, fy = tile_coords(lat, lng, self.max_zoom)
+        tile = self._tile(int(fx), int(fy))
+        if tile is None:
+            return None
+        size = tile["size"]
+        i = min(int((fy % 1) * size), size - 1) * size + min(int((fx % 1) * size), size - 1)
+        road = tile["road"][i]
+        if road is None:
+            return None
+        count = tile["hotspot_count"][i]
+        return {
+            "road_type": tile["road_types"][road],
+            "amenities": list(tile["amenity_sets"][tile["amenities"][i]]),
+            "source": "tiles",
+            "hotspot_nearby": count > 0,
+            "hotspot_count": count,
+        }
+
+    def stable_distance(self, lat: float, lng: float) -> float:
+        """
+        Metres the point can move before the max-zoom cell data may differ:
+        the cell's "stable_m" less the point's offset from the cell centre
+        (never less than the distance to the cell's own edge).
+        """
+        south, west, north, east = self.cell_bounds(lat, lng)
+        m_lat, m_lng = meters_per_deg(lat)
+        to_edge = max(0.0, min((lat - south) * m_lat, (north - lat) * m_lat,
+                               (lng - west) * m_lng, (east - lng) * m_lng))
+
+        fx, fy = tile_coords(lat, lng, self.max_zoom)
+        tile = self._tile(int(fx), int(fy))
+        stable = (tile or {}).get("stable_m")
+        if not stable:
+            return float(to_edge)
+        size = tile["size"]
+        i = min(int((fy % 1) * size), size - 1) * size + min(int((fx % 1) * size), size - 1)
+        if stable[i] is None:
+            return 0.0
+        offset = math.hypot((lat - (south + north) / 2) * m_lat, (lng - (west + east) / 2) * m_lng)
+        cell_m = float(self.metadata.get("cell_m", 0.0))
+        return float(max(to_edge, stable[i] - offset - cell_m / math.sqrt(2)))
+
+    def cell_bounds(self, lat: float, lng: float):
+        """(south, west, north, east) of the max-zoom cell containing the point."""
+        fx, fy = tile_coords(lat, lng, self.max_zoom)
+        size = self.tile_size
+        col, row = math.floor(fx * size), math.floor(fy * size)
+        north, west = tile_point(self.max_zoom, col / size, row / size)
+        south, east = tile_point(self.max_zoom, (col + 1) / size, (row + 1) / size)
+        return south, west, north, east
+
+    def info(self) -> dict:
+        """Pyramid metadata and lookup counters for the health endpoint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            cached = len(self._decoded)
+            hit_rate = round(self.hits / lookups, 4) if lookups else 0.0
+        return {
+            "path": self.path,
+            "bounds": self.metadata.get("bounds"),
+            "min_zoom": self.min_zoom,
+            "max_zoom": self.max_zoom,
+            "tile_size": self.tile_size,
+            "built_at": int(self.metadata.get("built_at", 0)),
+            "decoded_tiles": cached,
+            "tile_cache_hit_rate": hit_rate,
+        }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _parse_bbox(value: str) -> tuple:
+    parts = [float(p) for p in value.split(",")]
+    if len(parts) != 4:
+        raise argparse.ArgumentTypeError("bbox must be south,west,north,east")
+    return tuple(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect the precomputed dynamic risk tile pyramid.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Sample location risk over a bounding box")
+    build.add_argument("--bbox", type=_parse_bbox, required=True, help="south,west,north,east")
+    build.add_argument("-o", "--output", default=os.path.join(os.path.dirname(__file__), "risk_tiles.mbtiles"))
+    build.add_argument("--max-zoom", type=int, default=DEFAULT_MAX_ZOOM)
+    build.add_argument("--min-zoom", type=int, default=DEFAULT_MIN_ZOOM)
+    build.add_argument("--size", type=int, default=DEFAULT_TILE_SIZE, help="cells per tile side")
+    build.add_argument("--workers", type=int, default=4)
+
+    info = sub.add_parser("info", help="Show pyramid metadata")
+    info.add_argument("path")
+
+    query = sub.add_parser("query", help="Look up a coordinate")
+    query.add_argument("path")
+    query.add_argument("lat", type=float)
+    query.add_argument("lng", type=float)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s — %(message)s")
+
+    if args.command == "build":
+        summary = build_pyramid(args.bbox, args.output, args.max_zoom, args.min_zoom, args.size, args.workers)
+        print(json.dumps(summary, indent=2))
+    elif args.command == "info":
+        print(json.dumps(RiskTiles(args.path).info(), indent=2))
+    else:
+        print(json.dumps(RiskTiles(args.path).location(args.lat, args.lng), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
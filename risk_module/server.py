@@ -0,0 +1,190 @@
+# =============================================================================
+# server.py — ZeroPenalty Risk Zone Intelligence Module
+# Production entry point: pre-forked multi-process server. The master loads
+# and indexes the zones once, then forks WORKERS processes that share the
+# listening socket and the zone index (copy-on-write / shared mmap pages).
+#
+# Usage:
+#   python server.py                     # WORKERS (default: one per core)
+#   python server.py --workers 8 --port 5000
+#
+#   kill -HUP <master pid>     → reload zones.json in every worker
+#   kill -TERM <master pid>    → graceful shutdown
+# =============================================================================
+
+import argparse
+import gc
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from config import APP_NAME, APP_VERSION, HOST, PORT, WORKERS
+
+logger = logging.getLogger("server")
+
+# A worker that dies sooner than this after starting is respawned with a delay.
+_CRASH_LOOP_WINDOW = 1.0
+
+# Master loop period (seconds) for reaping workers and handling SIGHUP.
+_POLL_INTERVAL = 0.2
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+def _run_worker(listener: socket.socket, host: str, port: int):
+    """Serve requests on the inherited listening socket until SIGTERM."""
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    server = make_server(host, port, app_module.app, threaded=True, fd=listener.fileno())
+
+    def _stop(signum, frame):
+        # shutdown() blocks until serve_forever() returns — call it off the main thread.
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)    # the master handles Ctrl-C
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    logger.info(f"Worker {os.getpid()} serving.")
+    server.serve_forever()
+    app_module.ZONE_STATS.flush()    # last counters for GET /zones/stats in the other workers
+    os._exit(0)
+
+
+# ---------------------------------------------------------------------------
+# Master
+# ---------------------------------------------------------------------------
+
+class Master:
+    """Forks and supervises workers; relays zone reloads through the shared version."""
+
+    def __init__(self, host: str, port: int, workers: int):
+        self.host, self.port, self.workers = host, port, max(1, workers)
+        self.children = {}          # pid -> start time
+        self.stopping = False
+        self.reload_requested = False
+
+    def _listen(self) -> socket.socket:
+        listener = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, self.port))
+        listener.listen(1024)
+        listener.set_inheritable(True)
+        return listener
+
+    def _spawn(self, listener: socket.socket):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(listener, self.host, self.port)
+            except BaseException:
+                logger.exception("Worker crashed.")
+            finally:
+                os._exit(1)
+        self.children[pid] = time.monotonic()
+
+    def _reload_zones(self, app_module):
+        """SIGHUP: recompile zones once here, then let workers re-map it."""
+        try:
+            zones = app_module.load_zones()
+            # Workers forked later inherit the master's dataset, not a reload.
+            app_module.risk_engine.load_hotspots()
+        except Exception as e:
+            logger.error(f"Zone reload failed: {e} — workers keep current zones.")
+            return
+        with app_module._zones_lock:
+            app_module.ZONES_CACHE = zones
+            app_module._bump_zones_version()
+        logger.info(f"Zone database v{app_module.ZONES_VERSION.value} published to workers "
+                    f"({len(zones)} zones).")
+
+    def run(self):
+        listener = self._listen()
+
+        # Load + index zones once; forked workers inherit them.
+        import app as app_module
+        app_module.attach_zones_version(multiprocessing.Value("Q", 0))
+        logger.info(f"{APP_NAME} v{APP_VERSION} — master {os.getpid()} on {self.host}:{self.port}, "
+                    f"{self.workers} worker(s), {len(app_module.ZONES_CACHE)} zones "
+                    f"({getattr(app_module.ZONES_CACHE, 'storage', 'memory')}).")
+
+        # Keep the inherited heap out of the collector so workers do not
+        # dirty (and copy) shared pages just by scanning them.
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+
+        for _ in range(self.workers):
+            self._spawn(listener)
+
+        while self.children:
+            if self.reload_requested:
+                self.reload_requested = False
+                self._reload_zones(app_module)
+            self._reap(listener)
+            time.sleep(_POLL_INTERVAL)
+
+        listener.close()
+        logger.info("All workers stopped.")
+
+    def _reap(self, listener: socket.socket):
+        """Collect exited workers and respawn them unless shutting down."""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            logger.warning(f"Worker {pid} exited ({os.waitstatus_to_exitcode(status)}) — respawning.")
+            if time.monotonic() - started < _CRASH_LOOP_WINDOW:
+                time.sleep(_CRASH_LOOP_WINDOW)
+            self._spawn(listener)
+
+    def _on_stop(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info(f"Shutting down {len(self.children)} worker(s)...")
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _on_reload(self, signum, frame):
+        # Handled in the main loop — loading zones inside a signal handler is unsafe.
+        self.reload_requested = True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=f"{APP_NAME} — pre-forked production server.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s — %(message)s",
+                        datefmt="%Y-%m-%d %H:%M:%S")
+    if not hasattr(os, "fork"):
+        sys.exit("server.py needs os.fork() (Linux/macOS); use `python app.py` on this platform.")
+    Master(args.host, args.port, args.workers).run()
+
+
+if __name__ == "__main__":
+    main()
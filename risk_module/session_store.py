@@ -0,0 +1,217 @@
+# =============================================================================
+# session_store.py — ZeroPenalty Risk Zone Intelligence Module
+# Stateful trip sessions: remember the last resolved zone per vehicle and only
+# re-run zone detection when the vehicle could have changed zone.
+# =============================================================================
+
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+from config import (
+    DEFAULT_ZONE, OSM_CACHE_GEOHASH_PRECISION,
+    SESSION_REEVAL_DISTANCE_M, SESSION_IDLE_TTL, SESSION_MAX_ACTIVE,
+)
+from risk_engine import time_risk_key, time_risk_for_key, time_risk_signature, seconds_until_time_change
+from tile_cache import geohash_encode
+from zone_engine import resolve_zone_tier, apply_rules, zone_contains, haversine_m, validity_envelope
+from prefetch import PREFETCHER
+
+# Recent fixes kept per session for the corridor prefetch (heading / speed).
+_TRACK_LENGTH = 8
+
+# Seconds between sweeps of idle sessions (run by create() / get()).
+_EXPIRE_INTERVAL = 60.0
+
+# resolve_zone_tier() reasons for an answer below the session's tier — it is
+# used for the fix but not kept, so the next fix detects again.
+_DEGRADED_REASONS = ("budget", "overload", "fallback")
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Session State
+# ---------------------------------------------------------------------------
+
+class TripSession:
+    """Per-trip state: the last resolved zone and where/when it was resolved."""
+
+    def __init__(self, use_dynamic: bool = True, vehicle_id: str = None):
+        self.id = uuid.uuid4().hex
+        self.use_dynamic = use_dynamic
+        self.vehicle_id = vehicle_id
+        self.created_at = time.time()
+        self.last_seen = self.created_at
+        self.lock = threading.Lock()
+
+        self.zone = None            # zone dict from resolve_zone_tier()
+        self.anchor = None          # (lat, lng) of the last full detection
+        self.anchor_tile = None     # geotile of the anchor (dynamic zones)
+        self.time_signature = None  # time_risk_signature() at the last detection
+        self.degraded = False       # zone came from a degraded tier — re-detect next fix
+
+        self.fixes = 0
+        self.full_evaluations = 0
+
+        self.track = deque(maxlen=_TRACK_LENGTH)   # (lat, lng, unix_ts, speed_kmh)
+        self.prefetched_tiles = set()               # corridor tiles already queued
+
+    def summary(self) -> dict:
+        return {
+            "session_id": self.id,
+            "dynamic": self.use_dynamic,
+            "fixes": self.fixes,
+            "full_evaluations": self.full_evaluations,
+            "current_zone_id": (self.zone or {}).get("id") or (self.zone or {}).get("zone_id"),
+        }
+
+
+class SessionStore:
+    """
+    Thread-safe registry of open trip sessions with idle expiry.
+
+    Idle sessions are swept at most every _EXPIRE_INTERVAL seconds by
+    create() / get(), and whenever the store is full, so at most
+    max_active sessions are ever held.
+    """
+
+    def __init__(self, idle_ttl: float = SESSION_IDLE_TTL, max_active: int = SESSION_MAX_ACTIVE):
+        self.idle_ttl = idle_ttl
+        self.max_active = max_active
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_expire = time.time()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _expire(self, now: float):
+        """Drop idle sessions (lock held)."""
+        self._last_expire = now
+        stale = [sid for sid, s in self._sessions.items() if now - s.last_seen > self.idle_ttl]
+        for sid in stale:
+            del self._sessions[sid]
+        if stale:
+            logger.info(f"Expired {len(stale)} idle trip session(s).")
+
+    def create(self, use_dynamic: bool = True, vehicle_id: str = None) -> TripSession:
+        """Open a session; raises RuntimeError when the store is full."""
+        session = TripSession(use_dynamic, vehicle_id)
+        now = time.time()
+        with self._lock:
+            if len(self._sessions) >= self.max_active or now - self._last_expire > _EXPIRE_INTERVAL:
+                self._expire(now)
+            if len(self._sessions) >= self.max_active:
+                raise RuntimeError(f"Too many active sessions (max {self.max_active}).")
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str):
+        """Open session by id, or None if unknown/expired."""
+        now = time.time()
+        with self._lock:
+            if now - self._last_expire > _EXPIRE_INTERVAL:
+                self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is not None and now - session.last_seen > self.idle_ttl:
+                del self._sessions[session_id]
+                return None
+            return session
+
+    def close(self, session_id: str):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+
+# ---------------------------------------------------------------------------
+# Fix Evaluation
+# ---------------------------------------------------------------------------
+
+def _reevaluation_reason(session: TripSession, lat: float, lng: float, signature: tuple, zones: list):
+    """Why the cached zone can no longer be trusted for this fix, or None."""
+    if session.zone is None:
+        return "first_fix"
+    if session.degraded:
+        return "degraded"
+    if signature != session.time_signature:
+        return "time_boundary"
+    if haversine_m(lat, lng, *session.anchor) > SESSION_REEVAL_DISTANCE_M:
+        return "distance"
+
+    zone = session.zone
+    if zone.get("is_dynamic"):
+        # Dynamic zones describe the road around the anchor's geotile.
+        if geohash_encode(lat, lng, OSM_CACHE_GEOHASH_PRECISION) != session.anchor_tile:
+            return "left_zone"
+    elif zone.get("id") == DEFAULT_ZONE["id"]:
+        # Outside every static zone — re-detect as soon as one applies.
+        candidates = zones.candidates(lat, lng) if hasattr(zones, "candidates") else zones
+        if any(zone_contains(z, lat, lng) for z in candidates):
+            return "entered_zone"
+    elif "radius" in zone and not zone_contains(zone, lat, lng):
+        return "left_zone"
+    return None
+
+
+def evaluate_fix(session: TripSession, lat: float, lng: float, speed: float, zones: list,
+                 now: datetime = None, deadline: float = None, overloaded: bool = False) -> dict:
+    """
+    Evaluate one GPS fix within a trip session.
+
+    Zone detection (geodesic scan / Overpass) only re-runs when the vehicle
+    leaves the current zone's geometry, moves more than
+    SESSION_REEVAL_DISTANCE_M from the last detection, or crosses a
+    time-risk boundary. Otherwise only apply_rules() runs on the cached zone.
+
+    deadline / overloaded: latency budget and load signal, as for
+    evaluate_driver(). A detection answered below the session's tier
+    (budget, load or a failed dynamic lookup) is used for this fix only:
+    the next fix detects again (reason "degraded").
+
+    Dynamic sessions also queue the corridor ahead of the vehicle for
+    background prefetch (see prefetch.py).
+    """
+    key = time_risk_key(now or datetime.now())
+    time_info = time_risk_for_key(key)
+    signature = time_risk_signature(key)
+
+    with session.lock:
+        session.fixes += 1
+        session.last_seen = time.time()
+        session.track.append((lat, lng, now.timestamp() if now is not None else session.last_seen, speed))
+
+        reason = _reevaluation_reason(session, lat, lng, signature, zones)
+        if reason is not None:
+            session.zone, _, tier_reason = resolve_zone_tier(lat, lng, zones, session.use_dynamic, now,
+                                                             deadline, overloaded)
+            session.degraded = tier_reason in _DEGRADED_REASONS
+            session.anchor = (lat, lng)
+            session.anchor_tile = geohash_encode(lat, lng, OSM_CACHE_GEOHASH_PRECISION)
+            session.time_signature = signature
+            session.full_evaluations += 1
+            zone = session.zone
+        elif session.zone.get("time_factors"):
+            # Same side of every time boundary — refresh hour/labels only.
+            zone = {**session.zone, "time_factors": time_info}
+        else:
+            zone = session.zone
+
+        result = apply_rules(zone, speed, time_info, session.vehicle_id)
+        if session.degraded:
+            # Not kept for the next fix — the client should not skip it either.
+            result["validity"] = {"distance_m": 0.0, "time_change_s": int(seconds_until_time_change(now)),
+                                  "ttl_s": 0, "basis": "point"}
+        else:
+            result["validity"] = validity_envelope(lat, lng, zone, zones, session.use_dynamic, now)
+        result["session"] = {**session.summary(), "reevaluated": reason is not None, "reason": reason}
+
+        if session.use_dynamic:
+            try:
+                PREFETCHER.observe(session.track, session.prefetched_tiles)
+            except Exception as e:
+                logger.warning(f"Corridor prefetch not queued: {e}")
+    return result
@@ -0,0 +1,13 @@
+# =============================================================================
+# tests/conftest.py — ZeroPenalty Risk Zone Intelligence Module
+# The modules import each other flat (`from config import ...`), as when
+# app.py runs from risk_module/ — put that directory on the path.
+# =============================================================================
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# apply_rules() records into ZONE_STATS — keep its snapshots out of the tree.
+os.environ.setdefault("ZONE_STATS_DIR", "")
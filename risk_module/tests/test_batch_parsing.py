@@ -0,0 +1,47 @@
+# =============================================================================
+# tests/test_batch_parsing.py — ZeroPenalty Risk Zone Intelligence Module
+# POST /zone/batch body formats: JSON array / {"points": [...]} / NDJSON.
+# =============================================================================
+
+import pytest
+
+from app import parse_batch_points
+
+POINT = '{"lat": 18.5284, "lng": 73.8742, "speed": 35}'
+OTHER = '{"lat": 18.5600, "lng": 73.9100, "speed": 40, "vehicle_id": "V1"}'
+
+BODIES = {
+    "array": f"[{POINT}, {OTHER}]",
+    "points": f'{{"points": [{POINT}, {OTHER}]}}',
+    "points_spaced": f'{{ "points": [{POINT}, {OTHER}] }}',
+    "points_pretty": f'{{\n  "points": [\n    {POINT},\n    {OTHER}\n  ]\n}}',
+    "array_pretty": f"[\n  {POINT},\n  {OTHER}\n]",
+}
+
+
+@pytest.mark.parametrize("content_type", ["application/json", "application/json; charset=utf-8", "", "text/plain"])
+@pytest.mark.parametrize("name", sorted(BODIES))
+def test_json_bodies(name, content_type):
+    points, vehicle_ids, err = parse_batch_points(BODIES[name], content_type)
+    assert err is None
+    assert [p[:3] for p in points] == [(18.5284, 73.8742, 35.0), (18.56, 73.91, 40.0)]
+    assert vehicle_ids == [None, "V1"]
+
+
+@pytest.mark.parametrize("content_type", ["application/x-ndjson", "application/jsonlines", "", "text/plain"])
+@pytest.mark.parametrize("lines", [[POINT, OTHER], [POINT]])
+def test_ndjson_bodies(lines, content_type):
+    points, _, err = parse_batch_points("\n".join(lines) + "\n", content_type)
+    assert err is None
+    assert len(points) == len(lines)
+
+
+def test_json_content_type_is_not_read_as_ndjson():
+    body = f"{POINT}\n{OTHER}\n"
+    points, _, err = parse_batch_points(body, "application/json")
+    assert points is None and "not valid JSON" in err
+
+
+def test_json_object_without_points():
+    _, _, err = parse_batch_points(POINT, "application/json")
+    assert "non-empty array" in err
@@ -0,0 +1,89 @@
+# =============================================================================
+# tests/test_fleet_tracker.py — ZeroPenalty Risk Zone Intelligence Module
+# FleetTracker row bookkeeping when the tracker is at capacity.
+# =============================================================================
+
+import time
+
+from fleet_tracker import FleetTracker
+from zone_engine import load_zones
+
+ZONES = load_zones()
+
+# Outside every Pune zone
+LAT, LNG = 18.60, 73.70
+
+
+def _ingest(tracker, vehicle_ids, ts):
+    n = len(vehicle_ids)
+    return tracker.ingest(vehicle_ids, [LAT] * n, [LNG] * n, [30.0] * n, [ts] * n, ZONES)
+
+
+def _make_idle(tracker):
+    """
+    Age every tracked vehicle past idle_ttl. The last sweep is recent enough
+    that ingest() skips its periodic one, so only a full tracker sweeps.
+    """
+    tracker.seen[tracker.seen > 0] = time.time() - 10 * tracker.idle_ttl
+    tracker._last_expire = time.time() - 5.0
+
+
+def _assert_consistent(tracker):
+    for vehicle_id, row in tracker._rows.items():
+        assert tracker._ids[row] == vehicle_id
+        assert tracker.seen[row] > 0
+    assert not set(tracker._rows.values()) & set(tracker._free)
+    live = {row for row, vehicle_id in enumerate(tracker._ids) if vehicle_id is not None}
+    assert live == set(tracker._rows.values())
+
+
+def test_full_tracker_mixed_known_and_new_ids():
+    tracker = FleetTracker(max_vehicles=3, idle_ttl=60)
+    _ingest(tracker, ["A", "B", "C"], ts=1000)
+    _make_idle(tracker)
+
+    # A and B are known (but idle), D and E are new — the sweep must not free
+    # A's or B's row after they were resolved for this chunk.
+    result = _ingest(tracker, ["A", "D", "B", "E"], ts=2000)
+    _assert_consistent(tracker)
+    assert (result["applied"], result["dropped"]) == (3, 1)
+    assert len(tracker) == 3
+    # Every applied position belongs to a tracked vehicle.
+    for vehicle_id in ["A", "D", "B"]:
+        assert tracker.vehicle(vehicle_id)["ts"] == 2000.0
+    assert tracker.vehicle("E") is None
+
+    # Later sweeps and ingests keep working.
+    _make_idle(tracker)
+    _ingest(tracker, ["F", "A", "G", "H"], ts=3000)
+    _assert_consistent(tracker)
+    assert len(tracker) == 3
+
+
+def test_full_tracker_sweep_keeps_resolved_rows():
+    tracker = FleetTracker(max_vehicles=2, idle_ttl=60)
+    _ingest(tracker, ["A", "B"], ts=1000)
+    _make_idle(tracker)
+
+    _ingest(tracker, ["A", "C"], ts=2000)
+    _assert_consistent(tracker)
+    assert tracker.vehicle("A")["ts"] == 2000.0
+    assert tracker.vehicle("C")["ts"] == 2000.0
+
+    # The next idle sweep must find every live row registered.
+    _make_idle(tracker)
+    _ingest(tracker, ["D"], ts=3000)
+    _assert_consistent(tracker)
+
+
+def test_full_tracker_drops_new_ids_without_idle_vehicles():
+    tracker = FleetTracker(max_vehicles=2, idle_ttl=60)
+    _ingest(tracker, ["A", "B"], ts=1000)
+    tracker._last_expire = time.time() - 5.0
+
+    result = _ingest(tracker, ["A", "C", "B"], ts=2000)
+    _assert_consistent(tracker)
+    assert result["applied"] == 2
+    assert result["dropped"] == 1
+    assert tracker.vehicle("C") is None
+    assert tracker.vehicle("A")["ts"] == 2000.0
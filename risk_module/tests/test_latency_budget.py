@@ -0,0 +1,66 @@
+# =============================================================================
+# tests/test_latency_budget.py — ZeroPenalty Risk Zone Intelligence Module
+# A request deadline limits the wait for Overpass, not the Overpass call.
+# =============================================================================
+
+import time
+
+import risk_engine
+from tile_cache import SingleFlight
+
+
+def _slow_overpass(monkeypatch, delay: float, calls: list):
+    def query(query, timeout=None):
+        calls.append(timeout)
+        time.sleep(delay)
+        return [{"type": "way", "tags": {"highway": "primary"}}]
+
+    monkeypatch.setattr(risk_engine, "_overpass_query", query)
+    for name in ("RISK_TILES", "OSM_LOCAL_INDEX", "HOTSPOTS"):
+        monkeypatch.setattr(risk_engine, name, None)
+
+
+def test_deadline_answers_offline_and_lookup_fills_cache(monkeypatch):
+    calls = []
+    _slow_overpass(monkeypatch, 0.4, calls)
+    failures = risk_engine.OSM_BREAKER.snapshot()["consecutive_failures"]
+    lat, lng = 12.3456, 76.5432
+
+    started = time.perf_counter()
+    location = risk_engine.fetch_location_risk(lat, lng, timeout=0.05)
+    assert time.perf_counter() - started < 0.3
+    assert location["source"] == "offline_deadline"
+    assert calls == [None]      # Overpass keeps OSM_TIMEOUT
+
+    time.sleep(0.6)
+    cached = risk_engine.cached_location_risk(lat, lng)
+    assert cached is not None and cached["source"] == "online"
+    assert cached["road_type"] == "primary"
+    assert risk_engine.OSM_BREAKER.snapshot()["consecutive_failures"] == failures
+
+
+def test_no_deadline_waits_for_the_lookup(monkeypatch):
+    calls = []
+    _slow_overpass(monkeypatch, 0.1, calls)
+    location = risk_engine.fetch_location_risk(12.4567, 76.6543)
+    assert location["source"] == "online"
+    assert calls == [None]
+
+
+def test_busy_lookup_pool_sheds_new_misses(monkeypatch):
+    calls = []
+    _slow_overpass(monkeypatch, 0.3, calls)
+    monkeypatch.setattr(risk_engine, "OSM_SINGLE_FLIGHT", SingleFlight(max_workers=1))
+
+    first = risk_engine.fetch_location_risk(12.5678, 76.7654, timeout=0.01)
+    assert first["source"] == "offline_deadline"
+    started = time.perf_counter()
+    second = risk_engine.fetch_location_risk(12.6789, 76.8765, timeout=1.0)
+    assert time.perf_counter() - started < 0.1
+    assert second["source"] == "offline_saturated"
+    assert len(calls) == 1      # no second lookup (or thread) was started
+
+    time.sleep(0.5)
+    assert risk_engine.fetch_location_risk(12.6789, 76.8765, timeout=1.0)["source"] == "online"
+    stats = risk_engine.OSM_SINGLE_FLIGHT.stats()
+    assert stats["saturated"] == 1 and stats["background"] == 0
@@ -0,0 +1,49 @@
+# =============================================================================
+# tests/test_overpass_client.py — ZeroPenalty Risk Zone Intelligence Module
+# OverpassClient quota tokens and breaker slots across failover.
+# =============================================================================
+
+import pytest
+import requests
+
+from overpass_client import Mirror, MirrorUnavailableError, OverpassClient
+
+
+def _client(send, burst: float = 4, max_attempts: int = 2) -> OverpassClient:
+    # rate is tiny so the buckets do not refill during the test
+    mirrors = [Mirror(f"http://mirror-{i}/api/interpreter", rate=0.001, burst=burst) for i in range(2)]
+    client = OverpassClient(mirrors, timeout=5, max_attempts=max_attempts)
+    client._send = send
+    return client
+
+
+def test_unused_failover_mirror_keeps_its_token():
+    client = _client(lambda mirror, query, timeout: [])
+    # 2 mirrors × 4 burst tokens: every token pays for one sent query.
+    for _ in range(8):
+        assert client.query("[out:json];") == []
+    with pytest.raises(MirrorUnavailableError) as e:
+        client.query("[out:json];")
+    assert e.value.reason == "rate_limited"
+
+
+def test_client_error_is_recorded_and_releases_slots():
+    def send(mirror, query, timeout):
+        response = requests.Response()
+        response.status_code = 400
+        raise requests.HTTPError(f"400 from {mirror.url}", response=response)
+
+    client = _client(send)
+    for mirror in client.mirrors:
+        mirror.breaker._state = "half_open"
+
+    with pytest.raises(requests.HTTPError):
+        client.query("[out:json];")
+
+    tried = [m for m in client.mirrors if m.requests]
+    unused = [m for m in client.mirrors if not m.requests]
+    assert len(tried) == 1 and len(unused) == 1
+    assert tried[0].failures == 1
+    assert tried[0].breaker.state == "open"        # the half-open trial failed
+    assert unused[0].breaker._half_open_calls == 0  # its trial slot was given back
+    assert unused[0].bucket._tokens == pytest.approx(4, abs=0.01)
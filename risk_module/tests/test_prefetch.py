@@ -0,0 +1,74 @@
+# =============================================================================
+# tests/test_prefetch.py — ZeroPenalty Risk Zone Intelligence Module
+# Corridor prefetch leaves the reserved Overpass quota to live lookups and
+# joins live lookups already in flight.
+# =============================================================================
+
+import threading
+
+import pytest
+
+import risk_engine
+from config import PREFETCH_RESERVE_TOKENS
+from overpass_client import Mirror, OverpassClient
+from prefetch import CorridorPrefetcher
+from tile_cache import TileCache, geohash_encode
+
+
+def _corridor(i: int) -> list:
+    point = (13.01 + i * 0.01, 77.61)
+    return [(geohash_encode(*point), point)]
+
+
+def _setup(monkeypatch, burst: float = 4) -> tuple:
+    # rate is tiny so the buckets do not refill during the test
+    mirrors = [Mirror(f"http://mirror-{i}/api/interpreter", rate=0.001, burst=burst) for i in range(2)]
+    client = OverpassClient(mirrors, timeout=5)
+    sent = []
+    client._send = lambda mirror, query, timeout: sent.append(mirror) or []
+    monkeypatch.setattr(risk_engine, "OVERPASS_CLIENT", client)
+    monkeypatch.setattr(risk_engine, "OSM_CACHE", TileCache())
+    for name in ("RISK_TILES", "OSM_LOCAL_INDEX", "HOTSPOTS"):
+        monkeypatch.setattr(risk_engine, name, None)
+    return client, sent
+
+
+def test_prefetch_never_spends_the_reserve_of_any_mirror(monkeypatch):
+    client, sent = _setup(monkeypatch)
+    roomy, reserved = client.mirrors
+    # Live lookups have spent `reserved` down to the reserve.
+    while reserved.bucket._tokens >= PREFETCH_RESERVE_TOKENS + 1:
+        assert reserved.bucket.try_acquire()
+    left = reserved.bucket._tokens
+
+    prefetcher = CorridorPrefetcher(enabled=True)
+    for i in range(8):
+        prefetcher._warm(_corridor(i))
+
+    assert sent and all(mirror is roomy for mirror in sent)
+    assert len(sent) == 4 - PREFETCH_RESERVE_TOKENS
+    assert reserved.bucket._tokens == pytest.approx(left, abs=0.01)
+    assert roomy.bucket._tokens == pytest.approx(PREFETCH_RESERVE_TOKENS, abs=0.01)
+    assert roomy.rate_limited == reserved.rate_limited == 0
+    # ... and the reserved tokens still serve live queries.
+    for _ in range(int(PREFETCH_RESERVE_TOKENS) * len(client.mirrors)):
+        assert client.query("[out:json];") == []
+
+
+def test_prefetch_joins_a_live_lookup_in_flight(monkeypatch):
+    _, sent = _setup(monkeypatch)
+    (tile, (lat, lng)), = _corridor(0)
+    flight = f"location500:{tile}"
+    led, _ = risk_engine.OSM_SINGLE_FLIGHT.claim([flight])
+
+    result = []
+    thread = threading.Thread(target=lambda: result.extend(risk_engine.fetch_location_risk_batch(
+        [(lat, lng)], reserve=PREFETCH_RESERVE_TOKENS)))
+    thread.start()
+    live = {"road_type": "primary", "amenities": [], "source": "online",
+            "hotspot_nearby": False, "hotspot_count": 0}
+    risk_engine.OSM_SINGLE_FLIGHT.finish(flight, led[flight], live)
+    thread.join(timeout=5)
+
+    assert result == [live]
+    assert sent == []
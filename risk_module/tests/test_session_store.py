@@ -0,0 +1,36 @@
+# =============================================================================
+# tests/test_session_store.py — ZeroPenalty Risk Zone Intelligence Module
+# Session fixes honour the latency budget; idle sessions are swept.
+# =============================================================================
+
+import time
+
+from session_store import SessionStore, evaluate_fix
+from zone_engine import load_zones
+
+LAT, LNG = 18.5284, 73.8742
+
+
+def test_budget_bounds_detection_and_degraded_zone_is_not_kept():
+    zones = load_zones()
+    session = SessionStore().create(use_dynamic=False)
+
+    late = evaluate_fix(session, LAT, LNG, 35, zones, deadline=time.monotonic() - 1)
+    assert late["is_default_zone"] and late["session"]["reason"] == "first_fix"
+    assert late["validity"]["ttl_s"] == 0 and session.degraded
+
+    result = evaluate_fix(session, LAT, LNG, 35, zones)
+    assert result["session"]["reevaluated"] and result["session"]["reason"] == "degraded"
+    assert not session.degraded
+    assert evaluate_fix(session, LAT, LNG, 35, zones)["session"]["reevaluated"] is False
+
+
+def test_idle_sessions_are_swept_periodically():
+    store = SessionStore(idle_ttl=10)
+    idle, active = store.create(), store.create()
+    idle.last_seen -= 60
+    assert len(store) == 2
+
+    store._last_expire -= 120
+    assert store.get(active.id) is active
+    assert len(store) == 1
@@ -0,0 +1,34 @@
+# =============================================================================
+# tests/test_tile_cache.py — ZeroPenalty Risk Zone Intelligence Module
+# The SQLite tier of TileCache drops expired rows and stays under its cap.
+# =============================================================================
+
+import tile_cache
+from tile_cache import TileCache
+
+
+def test_disk_tier_purges_expired_rows_at_startup(tmp_path):
+    db_path = str(tmp_path / "tiles.db")
+    cache = TileCache(db_path=db_path)
+    cache.put("road", 12.97, 77.59, {"road_type": "primary"})
+    cache.put("road", 13.07, 77.69, {"road_type": "offline"}, ttl=-1)
+    assert cache.stats()["disk_entries"] == 2
+
+    reopened = TileCache(db_path=db_path)
+    stats = reopened.stats()
+    assert stats["disk_entries"] == 1 and stats["disk_purged"] == 1
+    assert stats["disk_bytes"] > 0
+    assert reopened.get("road", 12.97, 77.59) == {"road_type": "primary"}
+
+
+def test_disk_tier_is_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(tile_cache, "_DISK_PURGE_EVERY", 10)
+    cache = TileCache(db_path=str(tmp_path / "tiles.db"), db_max_rows=5)
+    for i in range(20):
+        cache.put("road", 12.0 + i * 0.01, 77.0, {"i": i}, ttl=1000 + i)
+
+    assert cache.stats()["disk_entries"] == 5
+    cache.clear()
+    # The rows expiring last are kept.
+    assert cache.get("road", 12.0 + 19 * 0.01, 77.0) == {"i": 19}
+    assert cache.get("road", 12.0, 77.0) is None
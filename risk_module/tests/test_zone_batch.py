@@ -0,0 +1,20 @@
+# =============================================================================
+# tests/test_zone_batch.py — ZeroPenalty Risk Zone Intelligence Module
+# Batch results have the same shape as single evaluations.
+# =============================================================================
+
+from datetime import datetime
+
+from zone_engine import evaluate_batch, evaluate_driver, load_zones
+
+
+def test_batch_results_carry_tier_and_validity():
+    zones = load_zones()
+    now = datetime(2026, 3, 2, 9, 30)
+    points = [(18.5284, 73.8742, 35.0, now), (0.0, 0.0, 10.0, now)]
+
+    batch = evaluate_batch(points, zones, use_dynamic=False)
+    for (lat, lng, speed, ts), result in zip(points, batch):
+        single = evaluate_driver(lat, lng, speed, zones, use_dynamic=False, now=ts)
+        assert result["tier"] == single["tier"] == "static"
+        assert result["validity"] == single["validity"]
@@ -0,0 +1,57 @@
+# =============================================================================
+# tests/test_zone_db.py — ZeroPenalty Risk Zone Intelligence Module
+# zones.bin is only reused for the zones.json it was compiled from.
+# =============================================================================
+
+import json
+import os
+
+from zone_db import CompiledZoneIndex
+from zone_engine import load_zones
+
+
+def _write_zones(path, zone_id: str, mtime: float):
+    zone = {"id": zone_id, "name": zone_id, "latitude": 18.52, "longitude": 73.87, "radius": 300,
+            "risk_level": "HIGH", "speed_limit": 20, "penalty_multiplier": 3.0, "alert_strength": "STRONG"}
+    path.write_text(json.dumps({"zones": [zone]}), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_compiled_file_is_not_reused_for_another_source(tmp_path):
+    compiled = str(tmp_path / "zones.bin")
+    first, other = tmp_path / "first.json", tmp_path / "other.json"
+    _write_zones(first, "zone_first", mtime=2_000_000_000)
+    _write_zones(other, "zone_other", mtime=1_000_000_000)    # older than zones.bin
+
+    assert load_zones(str(first), compiled)[0]["id"] == "zone_first"
+    zones = load_zones(str(other), compiled)
+    assert isinstance(zones, CompiledZoneIndex)
+    assert zones[0]["id"] == "zone_other"
+
+
+def test_compiled_file_is_rebuilt_when_source_changes(tmp_path):
+    compiled = str(tmp_path / "zones.bin")
+    source = tmp_path / "zones.json"
+    _write_zones(source, "zone_a", mtime=1_000_000_000)
+    assert load_zones(str(source), compiled)[0]["id"] == "zone_a"
+
+    # Same mtime, different content size — e.g. restored from a backup.
+    _write_zones(source, "zone_bb", mtime=1_000_000_000)
+    assert load_zones(str(source), compiled)[0]["id"] == "zone_bb"
+
+    before = os.stat(compiled).st_mtime_ns
+    assert load_zones(str(source), compiled)[0]["id"] == "zone_bb"
+    assert os.stat(compiled).st_mtime_ns == before     # fresh → mapped, not rewritten
+
+
+def test_non_string_fields_keep_their_type(tmp_path):
+    source = tmp_path / "zones.json"
+    _write_zones(source, "zone_a", mtime=1_000_000_000)
+    document = json.loads(source.read_text(encoding="utf-8"))
+    document["zones"][0].update(id=3, description=None)
+    source.write_text(json.dumps(document), encoding="utf-8")
+
+    in_memory = load_zones(str(source), "")[0]
+    compiled = load_zones(str(source), str(tmp_path / "zones.bin"))[0]
+    assert compiled["id"] == in_memory["id"] == 3
+    assert compiled["description"] is None and compiled["name"] == "zone_a"
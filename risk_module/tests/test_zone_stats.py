@@ -0,0 +1,34 @@
+# =============================================================================
+# tests/test_zone_stats.py — ZeroPenalty Risk Zone Intelligence Module
+# Snapshots of other runs and exited workers are pruned, not merged.
+# =============================================================================
+
+import json
+import os
+import subprocess
+import sys
+
+from zone_stats import HLL_PRECISION, ZoneStats
+
+
+def _snapshot(directory, pid: int, epoch: float):
+    document = {"pid": pid, "epoch": epoch, "hll_precision": HLL_PRECISION,
+                "zones": {"zone_001": {"zone_name": "Z", "evaluations": 5, "overspeed": 1,
+                                       "penalty_inr": 500.0, "vehicles_hll": None}}}
+    (directory / f"worker-{pid}.json").write_text(json.dumps(document), encoding="utf-8")
+
+
+def test_stale_snapshots_are_pruned(tmp_path):
+    stats = ZoneStats(directory=str(tmp_path), flush_interval=0)
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    live = os.getppid()
+
+    _snapshot(tmp_path, live, stats.epoch)              # live peer, this run
+    _snapshot(tmp_path, exited.pid, stats.epoch)        # exited peer
+    _snapshot(tmp_path, 1, stats.epoch - 100)           # earlier run (pid 1 is alive)
+
+    report = stats.report()
+    assert report["workers"] == 2
+    assert report["totals"]["evaluations"] == 5
+    assert sorted(os.listdir(tmp_path)) == [f"worker-{live}.json"]
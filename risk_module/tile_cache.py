@@ -0,0 +1,435 @@
+# =============================================================================
+# tile_cache.py — ZeroPenalty Risk Zone Intelligence Module
+# Geotile-keyed TTL/LRU cache for Overpass lookups (road type, amenities,
+# hotspot counts), with an optional SQLite tier shared across processes, plus
+# single-flight coalescing of concurrent lookups for the same tile.
+# =============================================================================
+
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Disk-tier writes (per process) between purges of expired / excess rows.
+_DISK_PURGE_EVERY = 500
+
+
+# ---------------------------------------------------------------------------
+# Geohash
+# ---------------------------------------------------------------------------
+
+def geohash_encode(lat: float, lng: float, precision: int = 7) -> str:
+    """
+    Encode a coordinate as a geohash string.
+
+    Precision 7 ≈ 153 m × 153 m cells — roughly one street segment.
+    """
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits, ch, even = 0, 0, True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch = (ch << 1) | 1
+                lng_lo = mid
+            else:
+                ch <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_BASE32[ch])
+            bits, ch = 0, 0
+
+    return "".join(chars)
+
+
+def geohash_bounds(lat: float, lng: float, precision: int = 7) -> tuple:
+    """(south, west, north, east) of the geohash cell containing a coordinate."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    cell_lat = 180.0 / (1 << lat_bits)
+    cell_lng = 360.0 / (1 << lng_bits)
+    south = math.floor((lat + 90.0) / cell_lat) * cell_lat - 90.0
+    west = math.floor((lng + 180.0) / cell_lng) * cell_lng - 180.0
+    return south, west, south + cell_lat, west + cell_lng
+
+
+# ---------------------------------------------------------------------------
+# Tile Cache
+# ---------------------------------------------------------------------------
+
+class TileCache:
+    """
+    Two-tier cache keyed by (kind, geohash tile).
+
+    Memory tier: OrderedDict LRU bounded by max_entries, per-entry expiry.
+    Disk tier (optional): SQLite file so entries survive restarts and are
+    shared between worker processes. Values must be JSON-serializable.
+    Expired rows are deleted at startup and every _DISK_PURGE_EVERY writes,
+    which also trims the table to db_max_rows (soonest-expiring rows first).
+    """
+
+    def __init__(self, precision: int = 7, ttl: float = 3600, max_entries: int = 50_000,
+                 db_path: Optional[str] = None, db_max_rows: int = 0):
+        self.precision = precision
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.db_max_rows = db_max_rows
+
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_purged = 0
+        self._disk_writes = 0
+
+        if db_path:
+            # SQLite connections must not cross fork() — pre-forked workers
+            # (server.py) open their own on first use.
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=self._drop_connections)
+            try:
+                self._db().execute(
+                    "CREATE TABLE IF NOT EXISTS tile_cache ("
+                    " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._db().execute(
+                    "CREATE INDEX IF NOT EXISTS tile_cache_expires_at ON tile_cache (expires_at)"
+                )
+                self._db().commit()
+                self._disk_purge(time.time())
+                logger.info(f"OSM tile cache disk tier enabled at {db_path}")
+            except sqlite3.Error as e:
+                logger.error(f"OSM tile cache disk tier unavailable ({e}) — memory only.")
+                self.db_path = None
+
+    def tile(self, lat: float, lng: float) -> str:
+        """Geohash tile a coordinate falls in."""
+        return geohash_encode(lat, lng, self.precision)
+
+    def key(self, kind: str, lat: float, lng: float) -> str:
+        return f"{kind}:{self.tile(lat, lng)}"
+
+    # -- Disk tier -----------------------------------------------------------
+
+    def _db(self) -> sqlite3.Connection:
+        """Per-thread SQLite connection (connections are not thread-safe)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=1.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _drop_connections(self):
+        self._local = threading.local()
+
+    def _disk_get(self, key: str, now: float):
+        try:
+            row = self._db().execute(
+                "SELECT value, expires_at FROM tile_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"OSM tile cache disk read failed: {e}")
+            return None
+        if row is None or row[1] <= now:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _disk_put(self, key: str, value, expires_at: float):
+        try:
+            conn = self._db()
+            conn.execute(
+                "INSERT OR REPLACE INTO tile_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"OSM tile cache disk write failed: {e}")
+            return
+        with self._lock:
+            self._disk_writes += 1
+            purge = self._disk_writes % _DISK_PURGE_EVERY == 0
+        if purge:
+            self._disk_purge(time.time())
+
+    def _disk_purge(self, now: float):
+        """Delete expired rows, then the soonest-expiring ones beyond db_max_rows."""
+        try:
+            conn = self._db()
+            deleted = conn.execute("DELETE FROM tile_cache WHERE expires_at <= ?", (now,)).rowcount
+            if self.db_max_rows > 0:
+                excess = conn.execute("SELECT COUNT(*) FROM tile_cache").fetchone()[0] - self.db_max_rows
+                if excess > 0:
+                    deleted += conn.execute(
+                        "DELETE FROM tile_cache WHERE key IN"
+                        " (SELECT key FROM tile_cache ORDER BY expires_at LIMIT ?)", (excess,)
+                    ).rowcount
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"OSM tile cache disk purge failed: {e}")
+            return
+        if deleted:
+            with self._lock:
+                self.disk_purged += deleted
+            logger.debug(f"OSM tile cache disk tier: purged {deleted} row(s)")
+
+    def _disk_stats(self) -> dict:
+        try:
+            rows = self._db().execute("SELECT COUNT(*) FROM tile_cache").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"OSM tile cache disk stats failed: {e}")
+            rows = None
+        try:
+            size = sum(os.path.getsize(self.db_path + suffix) for suffix in ("", "-wal")
+                       if os.path.exists(self.db_path + suffix))
+        except OSError:
+            size = None
+        return {"disk_entries": rows, "disk_max_entries": self.db_max_rows or None,
+                "disk_bytes": size, "disk_purged": self.disk_purged}
+
+    # -- Public API ----------------------------------------------------------
+
+    def get(self, kind: str, lat: float, lng: float):
+        """Cached value for the tile containing (lat, lng), or None."""
+        key = self.key(kind, lat, lng)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        if self.db_path:
+            found = self._disk_get(key, now)
+            if found is not None:
+                value, expires_at = found
+                with self._lock:
+                    self._store(key, value, expires_at)
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, kind: str, lat: float, lng: float, value, ttl: Optional[float] = None):
+        """Store a value for the tile containing (lat, lng)."""
+        key = self.key(kind, lat, lng)
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self.db_path:
+            self._disk_put(key, value, expires_at)
+
+    def _store(self, key: str, value, expires_at: float):
+        """Insert into the memory tier and evict LRU entries (lock held)."""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop all memory-tier entries (the disk tier is left intact)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters (and disk-tier size) for the health endpoint."""
+        disk = self._disk_stats() if self.db_path else {}
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "geohash_precision": self.precision,
+                "disk_tier": bool(self.db_path),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                **disk,
+            }
+
+
+# ---------------------------------------------------------------------------
+# Single-Flight Request Coalescing
+# ---------------------------------------------------------------------------
+
+class SingleFlightSaturated(Exception):
+    """Every background worker is busy — the call was not started."""
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight block and receive the same result (or
+    exception). Nothing is remembered once the call completes — pair it with
+    TileCache for that.
+
+    Calls with a timeout run on a pool of `max_workers` threads so they can
+    outlive their callers; once all of them are busy, new calls are refused
+    (SingleFlightSaturated) rather than queued or given more threads.
+    """
+
+    def __init__(self, max_workers: int = 16):
+        self.max_workers = max(1, max_workers)
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.saturated = 0
+        self._reset_pool()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_pool)
+
+    def _reset_pool(self):
+        """Drop the pool — forked workers start their own on first use."""
+        self._executor = None
+        self._background = 0
+
+    def do(self, key, fn, timeout: float = None):
+        """
+        Run fn() once per key in flight. With a `timeout`, every caller —
+        the leader included — gives up after that many seconds with
+        TimeoutError while the flight carries on: the leader then runs fn()
+        on the pool, so its result still lands (e.g. in a cache). A new
+        flight raises SingleFlightSaturated when the pool is fully busy.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            elif timeout is not None and self._background >= self.max_workers:
+                self.saturated += 1
+                raise SingleFlightSaturated(f"{self._background} background call(s) in flight")
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+                if timeout is not None:
+                    self._background += 1
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                            thread_name_prefix="single-flight")
+                    executor = self._executor
+
+        if leader and timeout is None:
+            self._run(key, call, fn)
+        elif leader:
+            executor.submit(self._run_background, key, call, fn)
+        return self.wait(key, call, timeout)
+
+    def claim(self, keys) -> tuple:
+        """
+        Start or join the flights for several keys at once (batched lookups).
+
+        Returns (led, joined), both {key: call}: the caller now leads the
+        keys in `led` and must finish() each of them; the keys in `joined`
+        were already in flight — wait() returns their result.
+        """
+        led, joined = {}, {}
+        with self._lock:
+            for key in keys:
+                call = self._calls.get(key)
+                if call is not None:
+                    call.waiters += 1
+                    self.coalesced += 1
+                    joined[key] = call
+                else:
+                    led[key] = self._calls[key] = _Call()
+                    self.executions += 1
+        return led, joined
+
+    def finish(self, key, call: _Call, result=None, error: Exception = None):
+        """Complete a flight led through claim(); finishing it again is a no-op."""
+        with self._lock:
+            if call.done.is_set():
+                return
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            call.result, call.error = result, error
+            call.done.set()
+
+    def wait(self, key, call: _Call, timeout: float = None):
+        """Result of an in-flight call (its exception is re-raised); TimeoutError after `timeout`."""
+        if not call.done.wait(max(0.0, timeout) if timeout is not None else None):
+            raise TimeoutError(f"Gave up waiting for in-flight call '{key}'")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _run(self, key, call: _Call, fn):
+        result = error = None
+        try:
+            result = fn()
+        except Exception as e:
+            error = e
+        finally:
+            self.finish(key, call, result, error)
+
+    def _run_background(self, key, call: _Call, fn):
+        try:
+            self._run(key, call, fn)
+        finally:
+            with self._lock:
+                self._background -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "background": self._background,
+                "max_workers": self.max_workers,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "saturated": self.saturated,
+            }
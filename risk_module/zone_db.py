@@ -0,0 +1,289 @@
+# =============================================================================
+# zone_db.py — ZeroPenalty Risk Zone Intelligence Module
+# Compiled, memory-mapped zone database: columnar float64 coordinates/radii,
+# interned strings and a prebuilt grid index in one binary file. Workers mmap
+# the same file, so startup is near-instant and the pages are shared.
+#
+# Usage:
+#   python zone_db.py compile zones.json zones.bin
+#   python zone_db.py info zones.bin
+# =============================================================================
+
+import argparse
+import json
+import logging
+import math
+import mmap
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ZPZONES\0"
+FORMAT_VERSION = 4
+_HEADER_SIZE = 16                 # magic (8) + version u32 + directory length u32
+_ALIGN = 8
+_NO_STRING = 0xFFFFFFFF           # field absent from the zone
+
+# Keeps packed cell keys monotonic for negative longitudes
+_CELL_KEY_OFFSET = 1 << 31
+
+# Zone fields stored as their own interned-string columns when they hold a
+# string; every other non-coordinate field (including polygon/corridor
+# geometry, and e.g. a numeric "id") goes into a sorted JSON "attrs" string
+# (also interned), so values keep their JSON type. Underscore keys are
+# runtime-only.
+STRING_FIELDS = ("id", "name", "risk_level", "alert_strength", "description")
+COORD_FIELDS = ("latitude", "longitude", "radius")
+
+
+def _cell_key(cell_lat: int, cell_lng: int) -> int:
+    return (cell_lat << 32) + (cell_lng + _CELL_KEY_OFFSET)
+
+
+# ---------------------------------------------------------------------------
+# Writer
+# ---------------------------------------------------------------------------
+
+def source_signature(source_path: str) -> dict:
+    """Identity of a zones.json recorded in (and checked against) the compiled file."""
+    stat = os.stat(source_path)
+    return {"path": os.path.abspath(source_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def write_compiled(index, path: str, source: dict = None):
+    """
+    Serialize a zone_engine.ZoneIndex to `path`. source: source_signature()
+    of the zones.json it was built from (taken before reading it), checked
+    by is_fresh().
+
+    Written to a temp file in the same directory and renamed into place, so
+    readers (including already-mapped workers) never see a partial file.
+    """
+    zones = list(index)
+    strings, interned = [], {}
+
+    def intern(value) -> int:
+        if value is None:
+            return _NO_STRING
+        if value not in interned:
+            interned[value] = len(strings)
+            strings.append(value)
+        return interned[value]
+
+    columns = {
+        "lat": np.asarray(index.lats, dtype="<f8"),
+        "lng": np.asarray(index.lngs, dtype="<f8"),
+        "radius": np.asarray(index.radii, dtype="<f8"),
+        "shaped": np.asarray(index.shaped, dtype=bool),
+    }
+    for field in STRING_FIELDS:
+        columns[f"str_{field}"] = np.array(
+            [intern(z[field] if isinstance(z.get(field), str) else None) for z in zones], dtype="<u4"
+        )
+    columns["str_attrs"] = np.array([
+        intern(json.dumps(
+            {k: v for k, v in z.items()
+             if not (k in STRING_FIELDS and isinstance(v, str)) and k not in COORD_FIELDS
+             and not k.startswith("_")},
+            sort_keys=True, ensure_ascii=False,
+        ))
+        for z in zones
+    ], dtype="<u4")
+
+    encoded = [s.encode("utf-8") for s in strings]
+    columns["string_offsets"] = np.cumsum([0] + [len(b) for b in encoded], dtype=np.int64).astype("<i8")
+    columns["string_blob"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    cells = sorted(index.bucket_items(), key=lambda item: _cell_key(*item[0]))
+    columns["cell_keys"] = np.array([_cell_key(*cell) for cell, _ in cells], dtype="<i8")
+    columns["cell_offsets"] = np.cumsum([0] + [len(ids) for _, ids in cells], dtype=np.int64).astype("<i8")
+    columns["cell_zones"] = np.array([i for _, ids in cells for i in ids], dtype="<i4")
+    columns["oversized"] = np.array(index.oversized, dtype="<i4")
+
+    # Lay out sections 8-byte aligned after the header + directory.
+    directory = {"zone_count": len(zones), "cell_deg": index.cell_deg, "source": source, "sections": {}}
+    offset = 0
+    for name, arr in columns.items():
+        directory["sections"][name] = {"offset": offset, "dtype": arr.dtype.str, "count": int(arr.size)}
+        offset += -(-arr.nbytes // _ALIGN) * _ALIGN
+    dir_bytes = json.dumps(directory).encode("utf-8")
+    dir_len = -(-len(dir_bytes) // _ALIGN) * _ALIGN
+    data_start = _HEADER_SIZE + dir_len
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.array([FORMAT_VERSION, dir_len], dtype="<u4").tobytes())
+        f.write(dir_bytes.ljust(dir_len, b" "))
+        for name, arr in columns.items():
+            f.seek(data_start + directory["sections"][name]["offset"])
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    logger.info(f"Compiled {len(zones)} zone(s), {len(cells)} grid cell(s) → {path}")
+
+
+# ---------------------------------------------------------------------------
+# Reader
+# ---------------------------------------------------------------------------
+
+class CompiledZoneIndex:
+    """
+    Read-only, mmap-backed drop-in for zone_engine.ZoneIndex.
+
+    Coordinates, radii and the grid live in the mapped file; zone dicts are
+    materialized on first access (per process) from the interned strings.
+    """
+
+    storage = "mmap"
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mm[:8] != MAGIC:
+            raise ValueError(f"{path} is not a compiled zone database.")
+        version, dir_len = np.frombuffer(self._mm, dtype="<u4", count=2, offset=8)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported zone database version {version}.")
+        directory = json.loads(bytes(self._mm[_HEADER_SIZE:_HEADER_SIZE + dir_len]))
+        data_start = _HEADER_SIZE + int(dir_len)
+
+        self.cell_deg = directory["cell_deg"]
+        self._count = directory["zone_count"]
+        self._cols = {
+            name: np.frombuffer(self._mm, dtype=sec["dtype"], count=sec["count"],
+                                offset=data_start + sec["offset"])
+            for name, sec in directory["sections"].items()
+        }
+        self.lats = self._cols["lat"]
+        self.lngs = self._cols["lng"]
+        self.radii = self._cols["radius"]
+        self.shaped = self._cols["shaped"]
+        self._cell_keys = self._cols["cell_keys"]
+        self._oversized = self._cols["oversized"]
+        self._zones = {}
+        self._cell_candidates = {}   # grid cell -> materialized candidate list (cells in the file only)
+        self._oversized_candidates = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        return (self[i] for i in range(self._count))
+
+    def __getitem__(self, i):
+        zone = self._zones.get(i)
+        if zone is None:
+            zone = self._zones[i] = self._materialize(i)
+        return zone
+
+    def _string(self, idx: int):
+        if idx == _NO_STRING:
+            return None
+        offsets = self._cols["string_offsets"]
+        return bytes(self._cols["string_blob"][offsets[idx]:offsets[idx + 1]]).decode("utf-8")
+
+    def _materialize(self, i: int) -> dict:
+        zone = {}
+        for field in STRING_FIELDS:
+            value = self._string(int(self._cols[f"str_{field}"][i]))
+            if value is not None:
+                zone[field] = value
+        zone["latitude"] = float(self.lats[i])
+        zone["longitude"] = float(self.lngs[i])
+        zone["radius"] = float(self.radii[i])
+        zone.update(json.loads(self._string(int(self._cols["str_attrs"][i]))))
+        return zone
+
+    def _cell(self, lat: float, lng: float) -> tuple:
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def bucket(self, cell_lat: int, cell_lng: int):
+        """Ascending zone indices bucketed in a grid cell."""
+        key = _cell_key(cell_lat, cell_lng)
+        pos = int(np.searchsorted(self._cell_keys, key))
+        if pos < len(self._cell_keys) and self._cell_keys[pos] == key:
+            offsets = self._cols["cell_offsets"]
+            return self._cols["cell_zones"][offsets[pos]:offsets[pos + 1]]
+        return self._oversized
+
+    def candidates(self, lat: float, lng: float) -> list:
+        """Zones whose bounding box covers the point, in original list order."""
+        cell = self._cell(lat, lng)
+        found = self._cell_candidates.get(cell)
+        if found is not None:
+            return found
+        ids = self.bucket(*cell)
+        if ids is self._oversized:
+            # Empty cells are not cached individually — there are unboundedly many.
+            if self._oversized_candidates is None:
+                self._oversized_candidates = [self[int(i)] for i in ids]
+            return self._oversized_candidates
+        found = self._cell_candidates[cell] = [self[int(i)] for i in ids]
+        return found
+
+    def info(self) -> dict:
+        return {
+            "path": self.path,
+            "zones": self._count,
+            "grid_cells": int(len(self._cell_keys)),
+            "cell_deg": self.cell_deg,
+            "interned_strings": int(len(self._cols["string_offsets"]) - 1),
+            "bytes": len(self._mm),
+        }
+
+
+def is_fresh(compiled_path: str, source_path: str, cell_deg: float) -> bool:
+    """
+    True if compiled_path exists, was built from source_path as it is now
+    (same path, size and mtime) and matches cell_deg.
+    """
+    try:
+        source = source_signature(source_path)
+        with open(compiled_path, "rb") as f:
+            head = f.read(_HEADER_SIZE)
+            if head[:8] != MAGIC:
+                return False
+            version, dir_len = np.frombuffer(head, dtype="<u4", count=2, offset=8)
+            if version != FORMAT_VERSION:
+                return False
+            directory = json.loads(f.read(int(dir_len)))
+        return directory["cell_deg"] == cell_deg and directory.get("source") == source
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile or inspect the binary zone database.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    comp = sub.add_parser("compile", help="Compile zones.json into a memory-mappable file")
+    comp.add_argument("source")
+    comp.add_argument("output")
+
+    inspect = sub.add_parser("info", help="Show a compiled file's contents summary")
+    inspect.add_argument("path")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s — %(message)s")
+
+    if args.command == "compile":
+        from zone_engine import load_zones
+        source = source_signature(args.source)
+        write_compiled(load_zones(args.source, compiled_path=None), args.output, source)
+        args.path = args.output
+    print(json.dumps(CompiledZoneIndex(args.path).info(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,47 +6,246 @@
 
 import json
 import logging
+import math
+import os
+import time
+from datetime import datetime
 from typing import Optional
+
+import numpy as np
 from geopy.distance import geodesic
 
-from config import ZONES_DB_PATH, DEFAULT_ZONE, BASE_PENALTY
-from risk_engine import calculate_dynamic_risk, get_time_risk
+from config import (
+    ZONES_DB_PATH, ZONES_BIN_PATH, DEFAULT_ZONE, BASE_PENALTY, ZONE_GRID_CELL_DEG,
+    ZONE_BATCH_TOLERANCE, ZONE_BATCH_MAX_PAIRS, VALIDITY_MAX_DISTANCE_M, VALIDITY_MAX_TTL,
+    ZONE_DYNAMIC_MIN_MS, ZONE_STATIC_MIN_MS,
+)
+from risk_engine import (
+    calculate_dynamic_risk, calculate_cached_risk, get_time_risk, fetch_location_risk, fetch_location_risk_batch, build_dynamic_zone,
+    time_risk_key, time_risk_for_key, seconds_until_time_change, location_validity,
+)
+from zone_db import CompiledZoneIndex, write_compiled, is_fresh, source_signature
+from metrics import observe_stage, DATA_SOURCE, ZONE_RESOLUTIONS, ZONE_TIERS
+from zone_geometry import (
+    MIN_METERS_PER_DEG_LAT, MIN_METERS_PER_DEG_LNG_EQUATOR, PREPARED_KEY, PreparedPolygon, is_shaped, prepare,
+    shape_of,
+)
+from zone_stats import ZONE_STATS
 
 logger = logging.getLogger(__name__)
 
 
+# ---------------------------------------------------------------------------
+# Spatial Index
+# ---------------------------------------------------------------------------
+
+# Zones spanning more cells than this are checked on every lookup instead.
+_MAX_CELLS_PER_ZONE = 4096
+
+# Spherical (haversine) distance differs from WGS84 geodesic by < 0.6%, so a
+# candidate whose haversine distance exceeds its radius by more than this
+# factor can never match and is skipped without calling geodesic().
+_EARTH_RADIUS_M = 6_371_008.8
+_HAVERSINE_REJECT_FACTOR = 1.01
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in metres on a spherical Earth."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * _EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _zone_bbox(zone: dict) -> Optional[tuple]:
+    """(lat_lo, lat_hi, lng_lo, lng_hi) enclosing a zone's circle, or None near the poles."""
+    lat, lng, radius = zone["latitude"], zone["longitude"], zone["radius"]
+    dlat = radius / MIN_METERS_PER_DEG_LAT
+    cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90.0)))
+    if cos_lat <= 1e-9:
+        return None
+    dlng = radius / (MIN_METERS_PER_DEG_LNG_EQUATOR * cos_lat)
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+def _with_bounding_circle(zone: dict) -> dict:
+    """Copy of a polygon/corridor zone with its prepared shape and enclosing circle."""
+    shape = prepare(zone)
+    lat, lng, radius = shape.bounding_circle()
+    return {**zone, "latitude": lat, "longitude": lng, "radius": radius, PREPARED_KEY: shape}
+
+
+class ZoneIndex:
+    """
+    Zone list with a uniform grid bucket map over zone bounding circles.
+
+    Each grid cell maps to the (ordered) indices of zones whose bounding box
+    overlaps it, so detection only runs geodesic() on nearby candidates.
+    Zone centres and radii are also kept as contiguous float64 arrays for the
+    vectorized batch matcher.
+    Polygon and corridor zones are bucketed by their own bbox; their
+    latitude/longitude/radius are replaced by an enclosing circle and
+    `shaped` flags them for exact tests.
+    Behaves like the plain zone list it wraps (len, iteration, indexing).
+    """
+
+    storage = "memory"
+
+    def __init__(self, zones: list, cell_deg: float = ZONE_GRID_CELL_DEG):
+        zones = [_with_bounding_circle(z) if is_shaped(z) else z for z in zones]
+        self.zones = zones
+        self.cell_deg = cell_deg
+        self._buckets = {}
+        self._oversized = []
+
+        self.lats = np.array([z["latitude"] for z in zones], dtype=np.float64)
+        self.lngs = np.array([z["longitude"] for z in zones], dtype=np.float64)
+        self.radii = np.array([z["radius"] for z in zones], dtype=np.float64)
+        self.shaped = np.array([PREPARED_KEY in z for z in zones], dtype=bool)
+
+        for i, zone in enumerate(zones):
+            cells = self._cells_for_zone(zone)
+            if cells is None:
+                self._oversized.append(i)
+                continue
+            for cell in cells:
+                self._buckets.setdefault(cell, []).append(i)
+
+        # Merge oversized zones into every bucket once, keeping list order so
+        # tie-breaking matches a full linear scan.
+        oversized = tuple(self._oversized)
+        self._buckets = {
+            cell: tuple(sorted(set(indices).union(oversized)))
+            for cell, indices in self._buckets.items()
+        }
+        self._oversized = oversized
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    def __iter__(self):
+        return iter(self.zones)
+
+    def __getitem__(self, i):
+        return self.zones[i]
+
+    def _cell(self, lat: float, lng: float) -> tuple:
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def _cells_for_zone(self, zone: dict) -> Optional[list]:
+        """Grid cells overlapped by a zone's bounding box, or None if too many."""
+        bbox = shape_of(zone).bbox if PREPARED_KEY in zone else _zone_bbox(zone)
+        if bbox is None:
+            return None
+        lat_lo, lat_hi, lng_lo, lng_hi = bbox
+
+        cell_lat_lo, cell_lng_lo = self._cell(lat_lo, lng_lo)
+        cell_lat_hi, cell_lng_hi = self._cell(lat_hi, lng_hi)
+        if (cell_lat_hi - cell_lat_lo + 1) * (cell_lng_hi - cell_lng_lo + 1) > _MAX_CELLS_PER_ZONE:
+            return None
+        return [
+            (i, j)
+            for i in range(cell_lat_lo, cell_lat_hi + 1)
+            for j in range(cell_lng_lo, cell_lng_hi + 1)
+        ]
+
+    def bucket(self, cell_lat: int, cell_lng: int) -> tuple:
+        """Ascending zone indices bucketed in a grid cell."""
+        return self._buckets.get((cell_lat, cell_lng), self._oversized)
+
+    def bucket_items(self):
+        """((cell_lat, cell_lng), indices) pairs — used by zone_db to serialize the grid."""
+        return self._buckets.items()
+
+    @property
+    def oversized(self) -> tuple:
+        """Indices of zones checked on every lookup (too large to bucket)."""
+        return self._oversized
+
+    def candidates(self, lat: float, lng: float) -> list:
+        """Zones whose bounding box covers the point, in original list order."""
+        return [self.zones[i] for i in self.bucket(*self._cell(lat, lng))]
+
+
 # ---------------------------------------------------------------------------
 # Zone Loader
 # ---------------------------------------------------------------------------
 
-def load_zones(filepath: str = ZONES_DB_PATH) -> list:
-    """Load zone definitions from zones.json (static fallback database)."""
+def load_zones(filepath: str = ZONES_DB_PATH, compiled_path: Optional[str] = ZONES_BIN_PATH):
+    """
+    Load zone definitions from zones.json (static fallback database) and index them.
+
+    With `compiled_path` set, the zones are served from a memory-mapped
+    CompiledZoneIndex: reused as-is when it was built from this zones.json
+    (same path, size and mtime), otherwise recompiled (atomically) first.
+    If the compiled file cannot be written or mapped, the in-memory
+    ZoneIndex is returned instead.
+    """
+    if compiled_path and os.path.exists(filepath) and is_fresh(compiled_path, filepath, ZONE_GRID_CELL_DEG):
+        try:
+            index = CompiledZoneIndex(compiled_path)
+            logger.info(f"Mapped {len(index)} zone(s) from {compiled_path}")
+            return index
+        except (OSError, ValueError) as e:
+            logger.warning(f"Compiled zone database unusable ({e}) — recompiling from {filepath}")
+
     try:
+        source = source_signature(filepath)     # before reading: a later edit forces a recompile
         with open(filepath, "r", encoding="utf-8") as f:
             data = json.load(f)
         if "zones" not in data or not isinstance(data["zones"], list):
             raise ValueError("zones.json must contain a top-level 'zones' array.")
         logger.info(f"Loaded {len(data['zones'])} zone(s) from {filepath}")
-        return data["zones"]
+        index = ZoneIndex(data["zones"])
     except FileNotFoundError:
         logger.error(f"Zone database not found at path: {filepath}")
         raise
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse zones.json: {e}")
         raise ValueError(f"Invalid JSON in zone database: {e}") from e
+    except (KeyError, TypeError) as e:
+        logger.error(f"Invalid zone definition in zones.json: {e}")
+        raise ValueError(f"Zone is missing latitude/longitude/radius: {e}") from e
+
+    if not compiled_path:
+        return index
+    try:
+        write_compiled(index, compiled_path, source)
+        return CompiledZoneIndex(compiled_path)
+    except (OSError, ValueError, TypeError) as e:
+        logger.warning(f"Could not compile zones to {compiled_path} ({e}) — serving from memory.")
+        return index
 
 
 # ---------------------------------------------------------------------------
 # Static Zone Detection (zones.json fallback)
 # ---------------------------------------------------------------------------
 
+@observe_stage("static_detection")
 def detect_zone_static(user_lat: float, user_lng: float, zones: list) -> dict:
-    """Detect zone from static zones.json using geodesic distance."""
+    """
+    Detect zone from static zones.json using geodesic distance.
+
+    With a ZoneIndex (or CompiledZoneIndex) only the zones bucketed in the point's grid cell are
+    measured; a plain list is scanned in full.
+    """
     user_coords = (user_lat, user_lng)
     closest_zone = None
     closest_distance = float("inf")
 
-    for zone in zones:
+    candidates = zones.candidates(user_lat, user_lng) if hasattr(zones, "candidates") else zones
+
+    for zone in candidates:
+        if is_shaped(zone):
+            distance_meters = shape_of(zone).distance_within(user_lat, user_lng)
+            if distance_meters is not None and distance_meters < closest_distance:
+                closest_distance = distance_meters
+                closest_zone = zone
+            continue
+        approx = haversine_m(user_lat, user_lng, zone["latitude"], zone["longitude"])
+        if approx > min(zone["radius"], closest_distance) * _HAVERSINE_REJECT_FACTOR:
+            continue
         zone_coords = (zone["latitude"], zone["longitude"])
         distance_meters = geodesic(user_coords, zone_coords).meters
         if distance_meters <= zone["radius"] and distance_meters < closest_distance:
@@ -61,23 +260,199 @@ def detect_zone_static(user_lat: float, user_lng: float, zones: list) -> dict:
     return DEFAULT_ZONE
 
 
+def zone_contains(zone: dict, lat: float, lng: float) -> bool:
+    """True if (lat, lng) lies within a static zone's circle (geodesic), polygon or corridor."""
+    if is_shaped(zone):
+        return shape_of(zone).contains(lat, lng)
+    approx = haversine_m(lat, lng, zone["latitude"], zone["longitude"])
+    if approx > zone["radius"] * _HAVERSINE_REJECT_FACTOR:
+        return False
+    if approx < zone["radius"] / _HAVERSINE_REJECT_FACTOR:
+        return True
+    return geodesic((lat, lng), (zone["latitude"], zone["longitude"])).meters <= zone["radius"]
+
+
+# ---------------------------------------------------------------------------
+# Batch Static Zone Detection (vectorized)
+# ---------------------------------------------------------------------------
+
+def _haversine_matrix(lats: np.ndarray, lngs: np.ndarray, zone_lats: np.ndarray, zone_lngs: np.ndarray) -> np.ndarray:
+    """(points × zones) great-circle distances in metres."""
+    p1 = np.radians(lats)[:, None]
+    p2 = np.radians(zone_lats)[None, :]
+    dl = np.radians(zone_lngs)[None, :] - np.radians(lngs)[:, None]
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * _EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _closest_exact(lat: float, lng: float, zones: ZoneIndex, zone_ids: np.ndarray, approx: np.ndarray, tolerance: float) -> int:
+    """
+    Geodesic closest-containing zone among zone_ids, or -1.
+
+    Candidates are measured in haversine order and the scan stops once no
+    remaining zone can beat the best exact distance; ties go to the lower
+    zone index, as in detect_zone_static.
+    """
+    closest, closest_distance = -1, float("inf")
+    for k in np.argsort(approx, kind="stable").tolist():
+        if approx[k] * (1 - tolerance) > closest_distance:
+            break
+        zid = int(zone_ids[k])
+        distance_meters = geodesic((lat, lng), (float(zones.lats[zid]), float(zones.lngs[zid]))).meters
+        if distance_meters <= zones.radii[zid] and (
+            distance_meters < closest_distance or (distance_meters == closest_distance and zid < closest)
+        ):
+            closest, closest_distance = zid, distance_meters
+    return closest
+
+
+def _match_chunk(lats: np.ndarray, lngs: np.ndarray, zones: ZoneIndex, zone_ids: np.ndarray, tolerance: float) -> np.ndarray:
+    """Match a chunk of points against candidate zones (ascending zone_ids)."""
+    out = np.full(len(lats), -1, dtype=np.int64)
+    radii = zones.radii[zone_ids]
+    dist = _haversine_matrix(lats, lngs, zones.lats[zone_ids], zones.lngs[zone_ids])
+
+    sure = dist <= radii * (1 - tolerance)
+    uncertain = (dist <= radii * (1 + tolerance)) & ~sure
+    sure_dist = np.where(sure, dist, np.inf)
+    best = np.argmin(sure_dist, axis=1)
+    best_dist = sure_dist[np.arange(len(lats)), best]
+
+    # Geodesic refinement is needed when the haversine error could change the
+    # winner: an uncertain (near-boundary) zone that might be closer than the
+    # best sure zone, or a runner-up within the tolerance band of the best.
+    limit = best_dist * (1 + tolerance) / (1 - tolerance)
+    refine = (uncertain & (dist <= limit[:, None])).any(axis=1)
+    if sure_dist.shape[1] > 1:
+        runner_up = np.partition(sure_dist, 1, axis=1)[:, 1]
+        refine |= runner_up <= limit
+
+    confident = np.isfinite(best_dist) & ~refine
+    out[confident] = zone_ids[best[confident]]
+    for row in np.flatnonzero(refine):
+        in_band = sure[row] | uncertain[row]
+        out[row] = _closest_exact(
+            float(lats[row]), float(lngs[row]), zones, zone_ids[in_band], dist[row][in_band], tolerance
+        )
+    return out
+
+
+@observe_stage("static_detection_batch")
+def detect_zones_batch(lats, lngs, zones: ZoneIndex, tolerance: float = ZONE_BATCH_TOLERANCE) -> np.ndarray:
+    """
+    Vectorized detect_zone_static for arrays of coordinates.
+
+    Points are grouped by spatial-index cell and each group is compared with
+    that cell's candidate zones in one haversine pass over the index's
+    float64 arrays. Points where the haversine error (`tolerance`, relative)
+    could change the outcome are refined with geodesic(), so results match
+    detect_zone_static.
+
+    Returns:
+        int64 array of indices into `zones`, -1 where the DEFAULT zone applies.
+    """
+    if not hasattr(zones, "bucket"):
+        zones = ZoneIndex(list(zones))
+    lats = np.ascontiguousarray(lats, dtype=np.float64).ravel()
+    lngs = np.ascontiguousarray(lngs, dtype=np.float64).ravel()
+    if lats.shape != lngs.shape:
+        raise ValueError("lats and lngs must have the same length.")
+
+    result = np.full(len(lats), -1, dtype=np.int64)
+    if len(lats) == 0 or len(zones) == 0:
+        return result
+
+    cell_lat = np.floor(lats / zones.cell_deg).astype(np.int64)
+    cell_lng = np.floor(lngs / zones.cell_deg).astype(np.int64)
+    order = np.lexsort((cell_lng, cell_lat))
+    cell_lat, cell_lng = cell_lat[order], cell_lng[order]
+    breaks = np.flatnonzero((np.diff(cell_lat) != 0) | (np.diff(cell_lng) != 0)) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [len(order)]))
+
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        zone_ids = zones.bucket(int(cell_lat[start]), int(cell_lng[start]))
+        if len(zone_ids) == 0:
+            continue
+        zone_ids = np.asarray(zone_ids, dtype=np.int64)
+        shaped = zones.shaped[zone_ids]
+        circle_ids, shaped_ids = zone_ids[~shaped], zone_ids[shaped]
+        step = max(1, ZONE_BATCH_MAX_PAIRS // max(1, len(circle_ids)))
+        for chunk_start in range(start, end, step):
+            idx = order[chunk_start:min(end, chunk_start + step)]
+            if len(circle_ids):
+                result[idx] = _match_chunk(lats[idx], lngs[idx], zones, circle_ids, tolerance)
+            if len(shaped_ids):
+                result[idx] = _match_shaped(lats[idx], lngs[idx], zones, shaped_ids, result[idx])
+
+    return result
+
+
+def _match_shaped(lats: np.ndarray, lngs: np.ndarray, zones: ZoneIndex, shaped_ids: np.ndarray,
+                  circle_match: np.ndarray) -> np.ndarray:
+    """Let polygon/corridor zones override circle matches, with detect_zone_static's ranking."""
+    best = np.full(len(lats), np.inf)
+    best_id = np.full(len(lats), -1, dtype=np.int64)
+    for zid in shaped_ids.tolist():
+        dist = shape_of(zones[zid]).distances_within(lats, lngs)
+        better = dist < best
+        best[better], best_id[better] = dist[better], zid
+
+    out = circle_match.copy()
+    for row in np.flatnonzero(best_id >= 0).tolist():
+        cid = int(circle_match[row])
+        if cid >= 0:
+            circle_distance = geodesic((lats[row], lngs[row]), (float(zones.lats[cid]), float(zones.lngs[cid]))).meters
+            if circle_distance < best[row] or (circle_distance == best[row] and cid < best_id[row]):
+                continue
+        out[row] = best_id[row]
+    return out
+
+
+def zones_for_matches(matches: np.ndarray, zones: list) -> list:
+    """Map detect_zones_batch() output to zone dicts (DEFAULT_ZONE for -1)."""
+    return [zones[i] if i >= 0 else DEFAULT_ZONE for i in matches.tolist()]
+
+
 # ---------------------------------------------------------------------------
 # Rule Application Engine
 # ---------------------------------------------------------------------------
 
-def apply_rules(zone: dict, speed: float) -> dict:
-    """Apply driving rules for the detected zone and evaluate driver's speed."""
-    speed_limit = zone.get("speed_limit") or zone.get("speed_limit_kmh", 60)
+def zone_speed_limit(zone: dict) -> float:
+    """Speed limit (km/h) apply_rules() enforces for a zone."""
+    return zone.get("speed_limit") or zone.get("speed_limit_kmh", 60)
+
+
+def overspeed_penalty(zone: dict) -> float:
+    """Penalty (INR) apply_rules() charges for overspeeding in a zone."""
+    return round(BASE_PENALTY * zone.get("penalty_multiplier", 1.0), 2)
+
+
+@observe_stage("apply_rules")
+def apply_rules(zone: dict, speed: float, time_info: dict = None, vehicle_id: str = None) -> dict:
+    """
+    Apply driving rules for the detected zone and evaluate driver's speed.
+
+    time_info: precomputed get_time_risk() output, used when the zone carries
+    no time factors of its own (defaults to the current time).
+    vehicle_id: optional, counted towards the zone's unique vehicles.
+    Every call is recorded in the per-zone counters (GET /zones/stats).
+    """
+    speed_limit = zone_speed_limit(zone)
     penalty_multiplier = zone.get("penalty_multiplier", 1.0)
     is_overspeeding = speed > speed_limit
-    penalty = round(BASE_PENALTY * penalty_multiplier, 2) if is_overspeeding else 0.0
+    penalty = overspeed_penalty(zone) if is_overspeeding else 0.0
 
     # Time factors — always computed server-side
-    time_info = zone.get("time_factors") or get_time_risk()
+    time_info = zone.get("time_factors") or time_info or get_time_risk()
+
+    zone_id = zone.get("id") or zone.get("zone_id", "dynamic")
+    zone_name = zone.get("name") or zone.get("zone_name", "Unknown Zone")
+    ZONE_STATS.record(zone_id, zone_name, is_overspeeding, penalty, vehicle_id)
 
     return {
-        "zone_id":            zone.get("id") or zone.get("zone_id", "dynamic"),
-        "zone_name":          zone.get("name") or zone.get("zone_name", "Unknown Zone"),
+        "zone_id":            zone_id,
+        "zone_name":          zone_name,
         "risk_level":         zone.get("risk_level", "LOW"),
         "description":        zone.get("description", ""),
         "speed_limit_kmh":    speed_limit,
@@ -104,33 +479,325 @@ def apply_rules(zone: dict, speed: float) -> dict:
     }
 
 
+# ---------------------------------------------------------------------------
+# Validity Envelope
+# ---------------------------------------------------------------------------
+
+def _zone_ids_near(lat: float, lng: float, radius_m: float, zones) -> np.ndarray:
+    """Indices of zones bucketed in any grid cell within radius_m of the point."""
+    dlat = radius_m / MIN_METERS_PER_DEG_LAT
+    cos_lat = max(math.cos(math.radians(min(abs(lat) + dlat, 89.9))), 1e-6)
+    dlng = radius_m / (MIN_METERS_PER_DEG_LNG_EQUATOR * cos_lat)
+    i_lo, i_hi = math.floor((lat - dlat) / zones.cell_deg), math.floor((lat + dlat) / zones.cell_deg)
+    j_lo, j_hi = math.floor((lng - dlng) / zones.cell_deg), math.floor((lng + dlng) / zones.cell_deg)
+    if (i_hi - i_lo + 1) * (j_hi - j_lo + 1) >= len(zones):
+        return np.arange(len(zones))    # small database: cheaper than the bucket lookups
+    found = []      # every bucket (or a miss) already includes the oversized zones
+    for i in range(i_lo, i_hi + 1):
+        for j in range(j_lo, j_hi + 1):
+            found.append(np.asarray(zones.bucket(i, j), dtype=np.int64))
+    return np.unique(np.concatenate(found))
+
+
+def static_validity(lat: float, lng: float, zone: dict, zones, limit_m: float = VALIDITY_MAX_DISTANCE_M) -> float:
+    """
+    Metres the point can move before detect_zone_static() may return a
+    different zone (capped at limit_m).
+
+    Bounded by the distance to every nearby zone boundary (no zone is entered
+    or left) and, for the matched zone, half the ranking gap to every other
+    containing zone (ranking distances change at most 1 m per metre moved, so
+    the winner cannot change). Haversine's error is taken off the margins.
+    """
+    if not hasattr(zones, "bucket"):
+        zones = ZoneIndex(list(zones))
+    if len(zones) == 0:
+        return limit_m
+
+    ids = _zone_ids_near(lat, lng, limit_m, zones)
+    if len(ids) == 0:
+        return limit_m
+    tolerance = ZONE_BATCH_TOLERANCE
+    centre = _haversine_matrix(np.array([lat]), np.array([lng]), zones.lats[ids], zones.lngs[ids])[0]
+    radii = zones.radii[ids]
+    shaped = zones.shaped[ids]
+
+    # Zones (or shapes' bounding circles) further than limit_m cannot matter.
+    near = centre - radii <= limit_m
+    ids, centre, radii, shaped = ids[near], centre[near], radii[near], shaped[near]
+
+    best = limit_m
+    rankings = []       # (ranking distance, moves with the point) of containing zones
+    matched_id = None if zone.get("id") == DEFAULT_ZONE.get("id") else zone.get("id")
+    matched_rank = None
+
+    circles = ~shaped
+    if circles.any():
+        d, r = centre[circles], radii[circles]
+        best = min(best, float((np.abs(r - d) - tolerance * d).min()))
+        for zid, dist in zip(ids[circles][d <= r].tolist(), d[d <= r].tolist()):
+            if zones[zid].get("id") == matched_id:
+                matched_rank = (dist, True)
+            else:
+                rankings.append((dist, True))
+
+    for zid in ids[shaped].tolist():
+        z = zones[zid]
+        shape = shape_of(z)
+        best = min(best, shape.boundary_distance(lat, lng) * (1 - tolerance))
+        rank = shape.distance_within(lat, lng)
+        if rank is None:
+            continue
+        entry = (rank, not isinstance(shape, PreparedPolygon))
+        if z.get("id") == matched_id:
+            matched_rank = entry
+        else:
+            rankings.append(entry)
+
+    if matched_rank is not None:
+        m_dist, m_moves = matched_rank
+        for dist, moves in rankings:
+            if not (moves or m_moves):
+                continue    # two polygons both rank 0 wherever both contain the point
+            gap = dist - m_dist - tolerance * (dist + m_dist)
+            best = min(best, gap / 2 if (moves and m_moves) else gap)
+
+    return max(0.0, best)
+
+
+def validity_envelope(lat: float, lng: float, zone: dict, zones, use_dynamic: bool = True,
+                      now: datetime = None) -> dict:
+    """
+    How long and how far a result for (lat, lng) stays valid, so clients can
+    skip calls while they remain inside it.
+
+    Returns:
+        dict with:
+            distance_m    — metres from (lat, lng) before the zone may change
+            time_change_s — seconds until the next time-risk transition
+            ttl_s         — seconds the result may be reused (≤ time_change_s)
+            basis         — what bounds distance_m: static_zone, default_zone,
+                            risk_tiles, geotile, hotspots or point
+    """
+    time_change = seconds_until_time_change(now)
+    ttl = VALIDITY_MAX_TTL
+
+    if zone.get("is_dynamic"):
+        source = zone.get("data_source", "")
+        location = location_validity(lat, lng, source)
+        distance, basis = location["distance_m"], location["basis"]
+        if source.startswith("offline"):
+            # Dynamic fallback applies only while no static zone matches.
+            distance = min(distance, static_validity(lat, lng, DEFAULT_ZONE, zones))
+    else:
+        distance = static_validity(lat, lng, zone, zones)
+        basis = "default_zone" if zone.get("id") == DEFAULT_ZONE.get("id") else "static_zone"
+        location = {"ttl_s": None}
+        if use_dynamic:
+            # Static zone only because the dynamic lookup failed — retried per geotile.
+            location = location_validity(lat, lng, "offline")
+            distance = min(distance, location["distance_m"])
+
+    if location["ttl_s"] is not None:
+        ttl = min(ttl, location["ttl_s"])
+
+    return {
+        "distance_m": round(min(distance, VALIDITY_MAX_DISTANCE_M), 1),
+        "time_change_s": int(time_change),
+        "ttl_s": int(min(ttl, time_change)),
+        "basis": basis,
+    }
+
+
 # ---------------------------------------------------------------------------
 # Unified Entry Point — Dynamic + Static Fallback
 # ---------------------------------------------------------------------------
 
-def evaluate_driver(user_lat: float, user_lng: float, speed: float, zones: list, use_dynamic: bool = True) -> dict:
+def plan_tier(use_dynamic: bool = True, deadline: float = None, overloaded: bool = False) -> tuple:
+    """
+    Best tier a request can afford, as (tier, reason):
+
+        dynamic — full pipeline, Overpass allowed
+        cached  — dynamic from risk tiles / offline index / geotile cache only
+        static  — zones.json only
+        default — DEFAULT_ZONE with no lookup at all
+
+    deadline is the time.monotonic() by which the answer is due (None → no
+    budget); overloaded means too many requests are in flight to start new
+    Overpass calls. reason: ok, requested (dynamic=false), budget, overload.
+    """
+    remaining_ms = None if deadline is None else (deadline - time.monotonic()) * 1000
+    if remaining_ms is not None and remaining_ms < ZONE_STATIC_MIN_MS:
+        return "default", "budget"
+    if not use_dynamic:
+        return "static", "requested"
+    if remaining_ms is not None and remaining_ms < ZONE_DYNAMIC_MIN_MS:
+        return "cached", "budget"
+    if overloaded:
+        return "cached", "overload"
+    return "dynamic", "ok"
+
+
+def resolve_zone_tier(user_lat: float, user_lng: float, zones: list, use_dynamic: bool = True,
+                      now: datetime = None, deadline: float = None, overloaded: bool = False) -> tuple:
+    """
+    resolve_zone() within a latency budget: (zone, tier, reason), see
+    plan_tier(). The wait for Overpass is capped at the time left before
+    `deadline` (the lookup itself finishes in the background and fills the
+    cache); a cached-tier miss is answered from zones.json, and so is a
+    failed dynamic lookup when a static zone matches (reason "fallback").
+    """
+    tier, reason = plan_tier(use_dynamic, deadline, overloaded)
+    if tier == "default":
+        return DEFAULT_ZONE, tier, reason
+
+    if tier != "static":
+        try:
+            if tier == "dynamic":
+                timeout = None
+                if deadline is not None:
+                    timeout = deadline - time.monotonic() - ZONE_STATIC_MIN_MS / 1000
+                dynamic_zone = calculate_dynamic_risk(user_lat, user_lng, now, timeout)
+            else:
+                dynamic_zone = calculate_cached_risk(user_lat, user_lng, now)
+
+            if dynamic_zone is not None:
+                DATA_SOURCE.inc(dynamic_zone.get("data_source", "unknown"))
+
+                # OSM offline + static zone exists → prefer static zone (more specific)
+                if dynamic_zone.get("data_source", "").startswith("offline"):
+                    static_zone = detect_zone_static(user_lat, user_lng, zones)
+                    if static_zone.get("id") != DEFAULT_ZONE.get("id"):
+                        logger.info("OSM offline — using matched static zone.")
+                        ZONE_RESOLUTIONS.inc("static_fallback")
+                        return static_zone, "static", "fallback"
+                    logger.info("OSM offline — using dynamic fallback data.")
+                ZONE_RESOLUTIONS.inc("dynamic")
+                return dynamic_zone, tier, reason
+
+        except Exception as e:
+            logger.error(f"Dynamic evaluation failed: {e} — falling back to static.")
+            ZONE_RESOLUTIONS.inc("dynamic_error")
+            reason = "fallback"
+    else:
+        ZONE_RESOLUTIONS.inc("static")
+
+    return detect_zone_static(user_lat, user_lng, zones), "static", reason
+
+
+def resolve_zone(user_lat: float, user_lng: float, zones: list, use_dynamic: bool = True,
+                 now: datetime = None) -> dict:
+    """
+    Detection half of evaluate_driver(): the zone whose rules apply.
+
+    Dynamic mode (default): OSM road type + accidents + time risk.
+    If OSM fails → auto-fallback to static zones.json.
+    Static mode: zones.json only.
+    """
+    return resolve_zone_tier(user_lat, user_lng, zones, use_dynamic, now)[0]
+
+
+def evaluate_driver(user_lat: float, user_lng: float, speed: float, zones: list, use_dynamic: bool = True,
+                    now: datetime = None, deadline: float = None, overloaded: bool = False,
+                    vehicle_id: str = None) -> dict:
     """
     Full pipeline: detect zone + apply rules.
 
     Dynamic mode (default): OSM road type + accidents + time risk.
     If OSM fails → auto-fallback to static zones.json.
     Static mode: zones.json only.
+    now: timestamp of the GPS fix (defaults to the current time).
+    deadline / overloaded: latency budget and load signal — the pipeline
+    degrades dynamic → cached → static → default (see plan_tier()).
+    vehicle_id: optional, for the zone's unique-vehicle count.
+
+    The result carries the "tier" that answered and a "validity" envelope
+    (see validity_envelope()).
+    """
+    time_info = get_time_risk(now) if now is not None else None
+    zone, tier, reason = resolve_zone_tier(user_lat, user_lng, zones, use_dynamic, now, deadline, overloaded)
+    ZONE_TIERS.inc(tier, reason)
+    result = apply_rules(zone, speed, time_info, vehicle_id)
+    result["tier"] = tier
+    if tier == "default":
+        # Nothing was looked up — no distance to vouch for; ask again next fix.
+        result["validity"] = {"distance_m": 0.0, "time_change_s": int(seconds_until_time_change(now)),
+                              "ttl_s": 0, "basis": "point"}
+    else:
+        result["validity"] = validity_envelope(user_lat, user_lng, zone, zones, use_dynamic, now)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Batch Entry Point
+# ---------------------------------------------------------------------------
+
+def evaluate_batch(points: list, zones: list, use_dynamic: bool = True, vehicle_ids: list = None) -> list:
     """
+    evaluate_driver() for many GPS fixes, results in input order.
+
+    points: list of (lat, lng, speed, now) tuples; now may be None.
+    vehicle_ids: optional list parallel to points (entries may be None).
+
+    Work is shared across the batch: static detection runs once through
+    detect_zones_batch(), get_time_risk() runs once per distinct minute,
+    and dynamic location lookups run once per distinct coordinate, with the
+    Overpass misses sent as a few batched queries (fetch_location_risk_batch).
+    Each result carries "tier" and "validity" like evaluate_driver()'s.
+    """
+    if not points:
+        return []
+
+    current = datetime.now()
+    time_cache = {}
+    time_infos = []
+    for _, _, _, now in points:
+        key = time_risk_key(now or current)
+        if key not in time_cache:
+            time_cache[key] = time_risk_for_key(key)
+        time_infos.append(time_cache[key])
+
+    matches = detect_zones_batch([p[0] for p in points], [p[1] for p in points], zones)
+    static_zones = zones_for_matches(matches, zones)
+
+    location_cache = {}
     if use_dynamic:
+        coords = list(dict.fromkeys((lat, lng) for lat, lng, _, _ in points))
         try:
-            dynamic_zone = calculate_dynamic_risk(user_lat, user_lng)
+            location_cache = dict(zip(coords, fetch_location_risk_batch(coords)))
+        except Exception as e:
+            logger.error(f"Batched location lookup failed: {e} — looking points up one by one.")
 
-            # OSM offline + static zone exists → prefer static zone (more specific)
-            if dynamic_zone.get("data_source", "").startswith("offline"):
-                static_zone = detect_zone_static(user_lat, user_lng, zones)
-                if static_zone.get("id") != DEFAULT_ZONE.get("id"):
-                    logger.info("OSM offline — using matched static zone.")
-                    return apply_rules(static_zone, speed)
-                logger.info("OSM offline — using dynamic fallback data.")
-            return apply_rules(dynamic_zone, speed)
+    if vehicle_ids is None:
+        vehicle_ids = [None] * len(points)
 
-        except Exception as e:
-            logger.error(f"Dynamic evaluation failed: {e} — falling back to static.")
+    results = []
+    for (lat, lng, speed, now), time_info, static_zone, vehicle_id in zip(points, time_infos, static_zones,
+                                                                          vehicle_ids):
+        zone, tier = static_zone, "static"
+        if use_dynamic:
+            try:
+                if (lat, lng) not in location_cache:
+                    location_cache[(lat, lng)] = fetch_location_risk(lat, lng)
+                dynamic_zone = build_dynamic_zone(location_cache[(lat, lng)], time_info)
+                DATA_SOURCE.inc(dynamic_zone["data_source"])
+
+                # Same preference as evaluate_driver: OSM offline → matched static zone.
+                if not (dynamic_zone["data_source"].startswith("offline")
+                        and static_zone.get("id") != DEFAULT_ZONE.get("id")):
+                    zone, tier = dynamic_zone, "dynamic"
+                    ZONE_RESOLUTIONS.inc("dynamic")
+                else:
+                    ZONE_RESOLUTIONS.inc("static_fallback")
+            except Exception as e:
+                logger.error(f"Dynamic evaluation failed: {e} — falling back to static.")
+                ZONE_RESOLUTIONS.inc("dynamic_error")
+        else:
+            ZONE_RESOLUTIONS.inc("static")
+
+        results.append({**apply_rules(zone, speed, time_info, vehicle_id), "tier": tier,
+                        "validity": validity_envelope(lat, lng, zone, zones, use_dynamic, now)})
 
-    zone = detect_zone_static(user_lat, user_lng, zones)
-    return apply_rules(zone, speed)
+    logger.info(f"Batch evaluated {len(points)} point(s), "
+                f"{len(location_cache)} distinct location(s), {len(time_cache)} distinct minute(s)")
+    return results
@@ -0,0 +1,236 @@
+# =============================================================================
+# zone_geometry.py — ZeroPenalty Risk Zone Intelligence Module
+# Polygon and corridor (buffered polyline) zone shapes, prepared once into
+# numpy edge/segment arrays so point-in-zone tests stay cheap with thousands
+# of complex zones.
+# =============================================================================
+
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+# Conservative metres-per-degree figures (lower bounds on the WGS84 ellipsoid)
+# so a bounding box always contains its full geodesic buffer / circle.
+MIN_METERS_PER_DEG_LAT = 110_500.0
+MIN_METERS_PER_DEG_LNG_EQUATOR = 111_000.0
+
+# Upper bound on (points × edges) pairs evaluated per numpy pass.
+_MAX_PAIRS = 1_000_000
+
+# Polygons get roughly one latitude band per this many edges (capped), so a
+# containment test only looks at edges that can cross the point's latitude.
+_EDGES_PER_BAND = 8
+_MAX_BANDS = 256
+
+SHAPE_KEYS = ("polygon", "corridor")
+PREPARED_KEY = "_prepared"
+
+
+def is_shaped(zone: dict) -> bool:
+    """True for polygon/corridor zones (as opposed to latitude/longitude/radius circles)."""
+    return "polygon" in zone or "corridor" in zone
+
+
+def meters_per_deg(lat):
+    """(metres per degree latitude, metres per degree longitude) on WGS84 at `lat`."""
+    phi = np.radians(lat)
+    m_lat = 111_132.92 - 559.82 * np.cos(2 * phi) + 1.175 * np.cos(4 * phi)
+    m_lng = 111_412.84 * np.cos(phi) - 93.5 * np.cos(3 * phi)
+    return m_lat, m_lng
+
+
+def _vertices(zone: dict, key: str, minimum: int) -> np.ndarray:
+    """[[lat, lng], ...] from a zone field as an (n, 2) float64 array."""
+    try:
+        points = np.asarray(zone[key], dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Zone '{zone.get('id')}': {key} must be a list of [lat, lng] pairs.") from e
+    if points.ndim != 2 or points.shape[1] != 2 or len(points) < minimum:
+        raise ValueError(f"Zone '{zone.get('id')}': {key} needs at least {minimum} [lat, lng] point(s).")
+    if not np.isfinite(points).all():
+        raise ValueError(f"Zone '{zone.get('id')}': {key} contains non-numeric coordinates.")
+    return points
+
+
+def _segment_distance(lat: float, lng: float, a_lat, a_lng, b_lat, b_lng) -> float:
+    """Metres from a point to the nearest of the segments a→b (local projection at `lat`)."""
+    m_lat, m_lng = meters_per_deg(lat)
+    ax, ay = (a_lng - lng) * m_lng, (a_lat - lat) * m_lat
+    dx, dy = (b_lng - a_lng) * m_lng, (b_lat - a_lat) * m_lat
+    len2 = dx * dx + dy * dy
+    t = np.clip(-(ax * dx + ay * dy) / np.where(len2 > 0, len2, 1.0), 0.0, 1.0)
+    return float(np.hypot(ax + t * dx, ay + t * dy).min())
+
+
+class _Shape(ABC):
+    """Common bbox / bounding-circle handling for prepared shapes."""
+
+    bbox = (0.0, 0.0, 0.0, 0.0)   # (lat_lo, lat_hi, lng_lo, lng_hi)
+
+    def bounding_circle(self) -> tuple:
+        """(lat, lng, radius_m) of a circle enclosing the shape's bbox."""
+        lat_lo, lat_hi, lng_lo, lng_hi = self.bbox
+        lat_c, lng_c = (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
+        radius = 0.0
+        for lat in (lat_lo, lat_hi):
+            m_lat, m_lng = meters_per_deg(lat)
+            radius = max(radius, math.hypot((lat - lat_c) * m_lat, (lng_hi - lng_c) * m_lng))
+        return lat_c, lng_c, radius * 1.01 + 1.0
+
+    def _in_bbox(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        lat_lo, lat_hi, lng_lo, lng_hi = self.bbox
+        return (lats >= lat_lo) & (lats <= lat_hi) & (lngs >= lng_lo) & (lngs <= lng_hi)
+
+    @abstractmethod
+    def distances_within(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Per point: ranking distance (metres) if inside the zone, else inf."""
+
+    def distance_within(self, lat: float, lng: float):
+        """Ranking distance (metres) if the point is inside the zone, else None."""
+        d = float(self.distances_within(np.array([lat]), np.array([lng]))[0])
+        return d if math.isfinite(d) else None
+
+    def contains(self, lat: float, lng: float) -> bool:
+        return self.distance_within(lat, lng) is not None
+
+    @abstractmethod
+    def boundary_distance(self, lat: float, lng: float) -> float:
+        """Metres from the point to the zone's edge (inside or outside)."""
+
+
+class PreparedPolygon(_Shape):
+    """
+    Simple polygon (`"polygon": [[lat, lng], ...]`), even-odd rule.
+
+    Edges are stored as arrays with precomputed inverse slopes and bucketed
+    into latitude bands, so a test only ray-casts the edges spanning the
+    point's band. Inside points rank at distance 0 — a polygon is treated
+    as more specific than any circle or corridor covering the same spot.
+    """
+
+    def __init__(self, zone: dict):
+        pts = _vertices(zone, "polygon", 3)
+        if (pts[0] == pts[-1]).all():
+            pts = pts[:-1]
+        if len(pts) < 3:
+            raise ValueError(f"Zone '{zone.get('id')}': polygon needs at least 3 distinct vertices.")
+
+        y1, x1 = pts[:, 0], pts[:, 1]
+        y2, x2 = np.roll(y1, -1), np.roll(x1, -1)
+        self.edges = (y1, x1, y2, x2)         # all edges, for boundary_distance()
+        keep = y1 != y2                       # horizontal edges never cross a ray
+        self.y1, self.x1, self.y2 = y1[keep], x1[keep], y2[keep]
+        self.inv_slope = (x2[keep] - x1[keep]) / (y2[keep] - y1[keep])
+        self.bbox = (float(y1.min()), float(y1.max()), float(x1.min()), float(x1.max()))
+
+        lat_lo, lat_hi = self.bbox[0], self.bbox[1]
+        self.n_bands = max(1, min(_MAX_BANDS, len(self.y1) // _EDGES_PER_BAND))
+        self.band_height = (lat_hi - lat_lo) / self.n_bands or 1.0
+        lo = self._band(np.minimum(self.y1, self.y2))
+        hi = self._band(np.maximum(self.y1, self.y2))
+        members = [[] for _ in range(self.n_bands)]
+        for e, (b_lo, b_hi) in enumerate(zip(lo.tolist(), hi.tolist())):
+            for b in range(b_lo, b_hi + 1):
+                members[b].append(e)
+        self.band_offsets = np.cumsum([0] + [len(m) for m in members])
+        self.band_edges = np.array([e for m in members for e in m], dtype=np.int64)
+
+    def _band(self, lats: np.ndarray) -> np.ndarray:
+        return np.clip(np.floor((lats - self.bbox[0]) / self.band_height), 0, self.n_bands - 1).astype(np.int64)
+
+    def distances_within(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """0.0 for points inside the polygon, inf elsewhere."""
+        out = np.full(len(lats), np.inf)
+        rows = np.flatnonzero(self._in_bbox(lats, lngs))
+        if len(rows) == 0:
+            return out
+        bands = self._band(lats[rows])
+        for b in np.unique(bands).tolist():
+            edges = self.band_edges[self.band_offsets[b]:self.band_offsets[b + 1]]
+            if len(edges) == 0:
+                continue
+            sel = rows[bands == b]
+            step = max(1, _MAX_PAIRS // len(edges))
+            for s in range(0, len(sel), step):
+                pts = sel[s:s + step]
+                plat, plng = lats[pts][:, None], lngs[pts][:, None]
+                y1, y2 = self.y1[edges], self.y2[edges]
+                crosses = ((y1 > plat) != (y2 > plat)) & (
+                    plng < self.x1[edges] + (plat - y1) * self.inv_slope[edges]
+                )
+                inside = (np.count_nonzero(crosses, axis=1) & 1).astype(bool)
+                out[pts[inside]] = 0.0
+        return out
+
+    def boundary_distance(self, lat: float, lng: float) -> float:
+        y1, x1, y2, x2 = self.edges
+        return _segment_distance(lat, lng, y1, x1, y2, x2)
+
+
+class PreparedCorridor(_Shape):
+    """
+    Buffered polyline (`"corridor": [[lat, lng], ...]`, `"buffer_m": 40`).
+
+    A point is inside when its distance to the centreline is at most
+    buffer_m; that distance is also its ranking distance, matching how
+    circles rank by distance to their centre. Segment distances use a local
+    equirectangular projection at the query latitude.
+    """
+
+    def __init__(self, zone: dict):
+        pts = _vertices(zone, "corridor", 1)
+        try:
+            self.buffer_m = float(zone["buffer_m"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Zone '{zone.get('id')}': corridor needs a numeric buffer_m.") from e
+        if not self.buffer_m > 0:
+            raise ValueError(f"Zone '{zone.get('id')}': buffer_m must be positive.")
+
+        if len(pts) == 1:
+            pts = np.vstack([pts, pts])
+        self.a_lat, self.a_lng = pts[:-1, 0], pts[:-1, 1]
+        self.b_lat, self.b_lng = pts[1:, 0], pts[1:, 1]
+
+        dlat = self.buffer_m / MIN_METERS_PER_DEG_LAT
+        cos_lat = max(math.cos(math.radians(min(float(np.abs(pts[:, 0]).max()) + dlat, 89.9))), 1e-6)
+        dlng = self.buffer_m / (MIN_METERS_PER_DEG_LNG_EQUATOR * cos_lat)
+        self.bbox = (float(pts[:, 0].min()) - dlat, float(pts[:, 0].max()) + dlat,
+                     float(pts[:, 1].min()) - dlng, float(pts[:, 1].max()) + dlng)
+
+    def distances_within(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Distance to the centreline for points within buffer_m, inf elsewhere."""
+        out = np.full(len(lats), np.inf)
+        rows = np.flatnonzero(self._in_bbox(lats, lngs))
+        step = max(1, _MAX_PAIRS // len(self.a_lat))
+        for s in range(0, len(rows), step):
+            pts = rows[s:s + step]
+            plat, plng = lats[pts][:, None], lngs[pts][:, None]
+            m_lat, m_lng = meters_per_deg(plat)
+            ax, ay = (self.a_lng - plng) * m_lng, (self.a_lat - plat) * m_lat
+            dx, dy = (self.b_lng - self.a_lng) * m_lng, (self.b_lat - self.a_lat) * m_lat
+            len2 = dx * dx + dy * dy
+            t = np.clip(-(ax * dx + ay * dy) / np.where(len2 > 0, len2, 1.0), 0.0, 1.0)
+            dist = np.hypot(ax + t * dx, ay + t * dy).min(axis=1)
+            hit = dist <= self.buffer_m
+            out[pts[hit]] = dist[hit]
+        return out
+
+    def boundary_distance(self, lat: float, lng: float) -> float:
+        centreline = _segment_distance(lat, lng, self.a_lat, self.a_lng, self.b_lat, self.b_lng)
+        return abs(centreline - self.buffer_m)
+
+
+def prepare(zone: dict) -> _Shape:
+    """Build the prepared shape for a polygon or corridor zone (ValueError if malformed)."""
+    if "polygon" in zone:
+        return PreparedPolygon(zone)
+    return PreparedCorridor(zone)
+
+
+def shape_of(zone: dict) -> _Shape:
+    """Prepared shape for a zone, built on first use and kept on the zone dict."""
+    shape = zone.get(PREPARED_KEY)
+    if shape is None:
+        shape = zone[PREPARED_KEY] = prepare(zone)
+    return shape
@@ -0,0 +1,314 @@
+# =============================================================================
+# zone_stats.py — ZeroPenalty Risk Zone Intelligence Module
+# Per-zone traffic counters — evaluations, overspeed events, penalties (INR)
+# and approximate unique vehicles (HyperLogLog) — kept in lock-sharded
+# in-memory tables, served at GET /zones/stats and flushed to disk as
+# per-worker JSON snapshots.
+# =============================================================================
+
+import base64
+import hashlib
+import itertools
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+from config import ZONE_STATS_SHARDS, ZONE_STATS_DIR, ZONE_STATS_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# 2^11 one-byte registers (2 KiB) per zone → ≈2.3% standard error.
+HLL_PRECISION = 11
+
+# Row layout of a shard entry: [evaluations, overspeed, penalty_inr, zone_name]
+_EVALUATIONS, _OVERSPEED, _PENALTY, _NAME = range(4)
+
+SORT_KEYS = ("overspeed", "evaluations", "penalty", "vehicles", "overspeed_rate")
+
+
+# ---------------------------------------------------------------------------
+# HyperLogLog
+# ---------------------------------------------------------------------------
+
+class HyperLogLog:
+    """
+    Cardinality sketch over string items (Flajolet et al., with the
+    small-range linear-counting correction).
+
+    add() is not locked: concurrent adds may lose a register update, which
+    only ever lowers the estimate marginally — acceptable for a dashboard
+    figure and far cheaper than a lock on every evaluation.
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION, registers: bytes = None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+        if len(self.registers) != self.m:
+            raise ValueError(f"HyperLogLog needs {self.m} registers, got {len(self.registers)}.")
+
+    def add(self, item: str):
+        h = int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+        idx = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision.")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_base64(self) -> str:
+        return base64.b64encode(bytes(self.registers)).decode("ascii")
+
+    @classmethod
+    def from_base64(cls, data: str, precision: int = HLL_PRECISION) -> "HyperLogLog":
+        return cls(precision, base64.b64decode(data))
+
+
+def _pid_alive(pid) -> bool:
+    """True if a process with this pid exists (the snapshot's writer may still run)."""
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Sharded Counters
+# ---------------------------------------------------------------------------
+
+class ZoneStats:
+    """
+    Per-zone counters for this process.
+
+    Each request thread is pinned (round robin) to one of `shards` tables,
+    each with its own lock, so concurrent apply_rules() calls rarely contend
+    and never serialise on a global lock. snapshot() sums the shards.
+    """
+
+    def __init__(self, shards: int = ZONE_STATS_SHARDS, directory: str = ZONE_STATS_DIR,
+                 flush_interval: float = ZONE_STATS_FLUSH_INTERVAL):
+        self.shard_count = max(1, shards)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        # Shared by the workers of one server.py run (set before the fork):
+        # snapshots from other runs in the same directory are not merged.
+        self.epoch = time.time()
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        """Fresh counters — also run in forked workers, which count only their own traffic."""
+        self.started = time.time()
+        self._shards = [(threading.Lock(), {}) for _ in range(self.shard_count)]
+        self._sketches = {}
+        self._next_shard = itertools.count()
+        self._local = threading.local()
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = self._shards[next(self._next_shard) % self.shard_count]
+        return shard
+
+    def record(self, zone_id: str, zone_name: str, overspeed: bool, penalty: float, vehicle_id: str = None):
+        """Count one evaluation (called by apply_rules())."""
+        lock, table = self._shard()
+        with lock:
+            row = table.get(zone_id)
+            if row is None:
+                row = table[zone_id] = [0, 0, 0.0, zone_name]
+            row[_EVALUATIONS] += 1
+            if overspeed:
+                row[_OVERSPEED] += 1
+                row[_PENALTY] += penalty
+
+        if vehicle_id is not None:
+            sketch = self._sketches.get(zone_id)
+            if sketch is None:
+                sketch = self._sketches.setdefault(zone_id, HyperLogLog())
+            sketch.add(str(vehicle_id))
+
+        if self._flusher is None and self.directory and self.flush_interval > 0:
+            self._start_flusher()
+
+    def snapshot(self) -> dict:
+        """{zone_id: {zone_name, evaluations, overspeed, penalty_inr, sketch}} for this process."""
+        zones = {}
+        for lock, table in self._shards:
+            with lock:
+                rows = [(zone_id, list(row)) for zone_id, row in table.items()]
+            for zone_id, row in rows:
+                entry = zones.setdefault(zone_id, {"zone_name": row[_NAME], "evaluations": 0,
+                                                   "overspeed": 0, "penalty_inr": 0.0})
+                entry["evaluations"] += row[_EVALUATIONS]
+                entry["overspeed"] += row[_OVERSPEED]
+                entry["penalty_inr"] += row[_PENALTY]
+        for zone_id, sketch in list(self._sketches.items()):
+            if zone_id in zones:
+                zones[zone_id]["sketch"] = HyperLogLog(sketch.precision, sketch.registers)
+        return zones
+
+    # --- Disk snapshots -----------------------------------------------------
+
+    def _path(self, pid: int = None) -> str:
+        return os.path.join(self.directory, f"worker-{pid or os.getpid()}.json")
+
+    def _start_flusher(self):
+        with self._flusher_lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="zone-stats-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write this process's snapshot to ZONE_STATS_DIR (atomic rename); errors are logged."""
+        if not self.directory:
+            return
+        zones = self.snapshot()
+        if not zones:
+            return
+        document = {
+            "pid": os.getpid(),
+            "epoch": self.epoch,
+            "started": self.started,
+            "updated": time.time(),
+            "hll_precision": HLL_PRECISION,
+            "zones": {
+                zone_id: {**{k: v for k, v in entry.items() if k != "sketch"},
+                          "vehicles_hll": entry["sketch"].to_base64() if "sketch" in entry else None}
+                for zone_id, entry in zones.items()
+            },
+        }
+        path = self._path()
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(document, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write zone stats snapshot {path}: {e}")
+
+    def _peer_snapshots(self) -> list:
+        """
+        Flushed snapshots of the other live workers of this run. Snapshots
+        of earlier runs and of workers that have exited are deleted.
+        """
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        own = os.path.basename(self._path())
+        snapshots = []
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith("worker-") and name.endswith(".json")) or name == own:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    document = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable zone stats snapshot {name}: {e}")
+                continue
+            if (document.get("epoch") != self.epoch or document.get("hll_precision") != HLL_PRECISION
+                    or not _pid_alive(document.get("pid"))):
+                self._prune(path)
+                continue
+            snapshots.append(document)
+        return snapshots
+
+    def _prune(self, path: str):
+        try:
+            os.remove(path)
+            logger.info(f"Removed stale zone stats snapshot {os.path.basename(path)}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove stale zone stats snapshot {path}: {e}")
+
+    def merged(self) -> tuple:
+        """
+        (zones, workers): this process's live counters plus the last flushed
+        snapshot of every other live worker of this run — so peers lag by up
+        to ZONE_STATS_FLUSH_INTERVAL, and a worker's counts drop out once it
+        has exited (e.g. was respawned by server.py).
+        """
+        zones = self.snapshot()
+        peers = self._peer_snapshots()
+        for document in peers:
+            for zone_id, entry in document.get("zones", {}).items():
+                target = zones.setdefault(zone_id, {"zone_name": entry.get("zone_name"), "evaluations": 0,
+                                                    "overspeed": 0, "penalty_inr": 0.0})
+                target["evaluations"] += entry.get("evaluations", 0)
+                target["overspeed"] += entry.get("overspeed", 0)
+                target["penalty_inr"] += entry.get("penalty_inr", 0.0)
+                if entry.get("vehicles_hll"):
+                    sketch = HyperLogLog.from_base64(entry["vehicles_hll"])
+                    if "sketch" in target:
+                        target["sketch"].merge(sketch)
+                    else:
+                        target["sketch"] = sketch
+        return zones, 1 + len(peers)
+
+    def report(self, sort: str = "overspeed", limit: int = None) -> dict:
+        """GET /zones/stats payload: zones ranked by `sort` (descending), plus totals."""
+        zones, workers = self.merged()
+        rows = []
+        for zone_id, entry in zones.items():
+            evaluations = entry["evaluations"]
+            rows.append({
+                "zone_id": zone_id,
+                "zone_name": entry["zone_name"],
+                "evaluations": evaluations,
+                "overspeed": entry["overspeed"],
+                "overspeed_rate": round(entry["overspeed"] / evaluations, 4) if evaluations else 0.0,
+                "penalty_inr": round(entry["penalty_inr"], 2),
+                "unique_vehicles": entry["sketch"].count() if "sketch" in entry else 0,
+            })
+        key = {"penalty": "penalty_inr", "vehicles": "unique_vehicles"}.get(sort, sort)
+        rows.sort(key=lambda r: (r[key], r["evaluations"]), reverse=True)
+        return {
+            "since": self.epoch,
+            "workers": workers,
+            "totals": {
+                "zones": len(rows),
+                "evaluations": sum(r["evaluations"] for r in rows),
+                "overspeed": sum(r["overspeed"] for r in rows),
+                "penalty_inr": round(sum(r["penalty_inr"] for r in rows), 2),
+            },
+            "sort": sort,
+            "zones": rows[:limit] if limit is not None else rows,
+        }
+
+
+# Process-wide counters updated by apply_rules()
+ZONE_STATS = ZoneStats()